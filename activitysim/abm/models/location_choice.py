@@ -15,7 +15,7 @@ from activitysim.core.configuration.logit import (
     TourLocationComponentSettings,
     TourModeComponentSettings,
 )
-from activitysim.core.interaction_sample import interaction_sample
+from activitysim.core.interaction_sample import alias_sample, interaction_sample
 from activitysim.core.interaction_sample_simulate import interaction_sample_simulate
 from activitysim.core.util import reindex
 
@@ -116,6 +116,8 @@ def _location_sample(
     chunk_tag,
     trace_label,
     zone_layer=None,
+    size_terms_only=False,
+    candidates=None,
 ):
     """
     select a sample of alternative locations.
@@ -152,6 +154,17 @@ def _location_sample(
             f"SAMPLE_SIZE set to 0 for {trace_label} because disable_destination_sampling is set"
         )
 
+    if size_terms_only and sample_size > 0:
+        return alias_sample(
+            state,
+            choosers,
+            alternatives,
+            tour_destination.presample_size_weights(alternatives),
+            sample_size=sample_size,
+            alt_col_name=alt_dest_col_name,
+            trace_label=trace_label,
+        )
+
     locals_d = {
         "skims": skims,
         "segment_size": segment_name,
@@ -194,6 +207,7 @@ def _location_sample(
         compute_settings=model_settings.compute_settings.subcomponent_settings(
             "sample"
         ),
+        candidates=candidates,
     )
 
     return choices
@@ -210,6 +224,7 @@ def location_sample(
     chunk_size,
     chunk_tag,
     trace_label,
+    candidates_cache=None,
 ):
     # FIXME - MEMORY HACK - only include columns actually used in spec
     chooser_columns = model_settings.SIMULATE_CHOOSER_COLUMNS
@@ -224,6 +239,18 @@ def location_sample(
 
     alt_dest_col_name = model_settings.ALT_DEST_COL_NAME
 
+    candidates = None
+    if model_settings.SAMPLE_PRUNING is not None and estimator is None:
+        candidates = tour_destination.sample_candidates(
+            skim_dict,
+            choosers["home_zone_id"],
+            dest_size_terms,
+            model_settings.SAMPLE_PRUNING,
+            "home_zone_id",
+            cache=candidates_cache,
+            cache_key=(segment_name, "sample"),
+        )
+
     choices = _location_sample(
         state,
         segment_name,
@@ -236,6 +263,7 @@ def location_sample(
         chunk_size,
         chunk_tag,
         trace_label,
+        candidates=candidates,
     )
 
     return choices
@@ -345,6 +373,7 @@ def location_presample(
     chunk_size,
     chunk_tag,
     trace_label,
+    candidates_cache=None,
 ):
     trace_label = tracing.extend_trace_label(trace_label, "presample")
 
@@ -377,6 +406,18 @@ def location_presample(
     skim_dict = network_los.get_skim_dict("taz")
     skims = skim_dict.wrap(HOME_TAZ, DEST_TAZ)
 
+    candidates = None
+    if model_settings.SAMPLE_PRUNING is not None and estimator is None:
+        candidates = tour_destination.sample_candidates(
+            skim_dict,
+            choosers[HOME_TAZ],
+            TAZ_size_terms,
+            model_settings.SAMPLE_PRUNING,
+            HOME_TAZ,
+            cache=candidates_cache,
+            cache_key=(segment_name, "presample"),
+        )
+
     taz_sample = _location_sample(
         state,
         segment_name,
@@ -390,6 +431,8 @@ def location_presample(
         chunk_tag,
         trace_label,
         zone_layer="taz",
+        size_terms_only=model_settings.PRESAMPLE_SIZE_TERMS_ONLY,
+        candidates=candidates,
     )
 
     # print(f"taz_sample\n{taz_sample}")
@@ -422,6 +465,7 @@ def run_location_sample(
     chunk_size,
     chunk_tag,
     trace_label,
+    candidates_cache=None,
 ):
     """
     select a sample of alternative locations.
@@ -475,6 +519,7 @@ def run_location_sample(
             chunk_size,
             chunk_tag=f"{chunk_tag}.presample",
             trace_label=trace_label,
+            candidates_cache=candidates_cache,
         )
 
     else:
@@ -489,6 +534,7 @@ def run_location_sample(
             chunk_size,
             chunk_tag=f"{chunk_tag}.sample",
             trace_label=trace_label,
+            candidates_cache=candidates_cache,
         )
 
     # adding observed choice to alt set when running in estimation mode
@@ -536,6 +582,7 @@ def run_location_logsums(
     chunk_size,
     chunk_tag,
     trace_label,
+    logsums_cache=None,
 ):
     """
     add logsum column to existing location_sample table
@@ -556,10 +603,36 @@ def run_location_logsums(
     +-----------+--------------+----------------+------------+----------------+
     | 23751     | 14           | 0.972732479292 | 2          |  1.44009018355 |
     +-----------+--------------+----------------+------------+----------------+
+
+    If logsums_cache is given, logsums are looked up in it by segment_name and
+    (chooser, dest_zone_id) pair, and only the missing ones are computed and added
+    to it.  Logsums don't depend on shadow prices, so this lets later shadow pricing
+    iterations skip the mode choice model for pairs already sampled.
     """
 
     assert not location_sample_df.empty
 
+    cached = None
+    if logsums_cache is not None:
+        cached = logsums_cache.get(segment_name)
+        pairs = pd.MultiIndex.from_arrays(
+            [
+                location_sample_df.index,
+                location_sample_df[model_settings.ALT_DEST_COL_NAME],
+            ]
+        )
+        if cached is not None:
+            is_cached = pairs.isin(cached.index)
+            logger.info(
+                f"{trace_label} reusing {is_cached.sum()} of {len(pairs)} cached logsums"
+            )
+            if is_cached.all():
+                location_sample_df[ALT_LOGSUM] = cached.reindex(pairs).values
+                return location_sample_df
+            cached_logsums = cached.reindex(pairs[is_cached]).values
+            full_sample_df = location_sample_df
+            location_sample_df = location_sample_df[~is_cached]
+
     logsum_settings = TourModeComponentSettings.read_settings_file(
         state.filesystem,
         str(model_settings.LOGSUM_SETTINGS),
@@ -591,6 +664,25 @@ def run_location_logsums(
         trace_label,
     )
 
+    if logsums_cache is not None:
+        new_pairs = pd.MultiIndex.from_arrays(
+            [
+                location_sample_df.index,
+                location_sample_df[model_settings.ALT_DEST_COL_NAME],
+            ]
+        )
+        new_logsums = pd.Series(np.asarray(logsums), index=new_pairs)
+        if cached is not None:
+            # put computed and cached logsums back in the order of the full sample
+            logsums = np.empty(len(is_cached), dtype=new_logsums.dtype)
+            logsums[is_cached] = cached_logsums
+            logsums[~is_cached] = new_logsums.values
+            location_sample_df = full_sample_df
+            new_logsums = pd.concat([cached, new_logsums])
+        logsums_cache[segment_name] = new_logsums[
+            ~new_logsums.index.duplicated(keep="first")
+        ]
+
     # "add_column series should have an index matching the table to which it is being added"
     # when the index has duplicates, however, in the special case that the series index exactly
     # matches the table index, then the series value order is preserved
@@ -727,6 +819,8 @@ def run_location_choice(
     chunk_tag,
     trace_label,
     skip_choice=False,
+    candidates_cache=None,
+    logsums_cache=None,
 ):
     """
     Run the three-part location choice algorithm to generate a location choice for each chooser
@@ -746,6 +840,10 @@ def run_location_choice(
     model_settings : dict
     chunk_size : int
     trace_label : str
+    candidates_cache : dict, optional
+        pruned sample candidates by segment, reused across shadow pricing iterations
+    logsums_cache : dict, optional
+        sample logsums by segment, reused across shadow pricing iterations
 
     Returns
     -------
@@ -793,6 +891,7 @@ def run_location_choice(
             trace_label=tracing.extend_trace_label(
                 trace_label, "sample.%s" % segment_name
             ),
+            candidates_cache=candidates_cache,
         )
 
         # - location_logsums
@@ -808,6 +907,7 @@ def run_location_choice(
             trace_label=tracing.extend_trace_label(
                 trace_label, "logsums.%s" % segment_name
             ),
+            logsums_cache=logsums_cache,
         )
 
         # - location_simulate
@@ -1004,6 +1104,10 @@ def iterate_location_choice(
         choices_df
     ) = None  # initialize to None, will be populated in first iteration
 
+    # pruned sample candidates and logsums don't depend on shadow prices, so reuse them
+    candidates_cache = {}
+    logsums_cache = {} if model_settings.REUSE_LOGSUMS else None
+
     for iteration in range(1, max_iterations + 1):
         persons_merged_df_ = persons_merged_df.copy()
 
@@ -1029,6 +1133,8 @@ def iterate_location_choice(
             chunk_size=chunk_size,
             chunk_tag=chunk_tag,
             trace_label=tracing.extend_trace_label(trace_label, "i%s" % iteration),
+            candidates_cache=candidates_cache,
+            logsums_cache=logsums_cache,
         )
 
         # choices_df is a pandas DataFrame with columns "choice" and (optionally) "logsum"
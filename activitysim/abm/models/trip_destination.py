@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import logging
+import re
 import warnings
+from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
@@ -23,6 +25,8 @@ from activitysim.core import (
     config,
     estimation,
     expressions,
+    interaction_simulate,
+    logit,
     los,
     simulate,
     tracing,
@@ -32,6 +36,7 @@ from activitysim.core.configuration.base import PreprocessorSettings
 from activitysim.core.configuration.logit import LocationComponentSettings
 from activitysim.core.interaction_sample import interaction_sample
 from activitysim.core.interaction_sample_simulate import interaction_sample_simulate
+from activitysim.core.logsum_cache import LogsumCache, logsum_key_columns
 from activitysim.core.skim_dictionary import DataFrameMatrix
 from activitysim.core.tracing import print_elapsed_time
 from activitysim.core.util import assign_in_place, reindex
@@ -65,6 +70,19 @@ class TripDestinationSettings(LocationComponentSettings, extra="forbid"):
     CLEANUP: bool
     fail_some_trips_for_testing: bool = False
     """This setting is used by testing code to force failed trip_destination."""
+    reuse_fixed_sample_utilities: bool = False
+    """Reuse the sample utility terms that do not depend on the trip origin.
+
+    Sample spec terms that use neither the trip origin column nor skims keyed
+    on it (e.g. size terms, or distances from the alternatives to the tour
+    primary destination) are evaluated once for each distinct combination of
+    the trip columns they use, and reused for later trips with the same
+    values, including trips on later trip_num iterations and trips rerun by
+    trip_purpose_and_destination.  Only the remaining terms are evaluated for
+    every trip.  Not used in estimation mode, or for traced trips.
+
+    .. versionadded:: 1.3
+    """
 
     @root_validator(pre=True)
     def deprecated_destination_prefix(cls, values):
@@ -131,6 +149,218 @@ class TripDestinationSettings(LocationComponentSettings, extra="forbid"):
         return self.SPEC
 
 
+def split_fixed_sample_spec(spec, skims, trip_origin):
+    """
+    Split a sample spec into terms that do and do not depend on the trip origin.
+
+    A term depends on the trip origin if it names the trip origin column, a skim
+    wrapper with the trip origin as its origin or destination key, or a temp
+    that depends on the trip origin.  Temps are kept in the delta spec too, so
+    its terms can still use the fixed ones.
+
+    Parameters
+    ----------
+    spec : pandas.DataFrame
+        one row per spec expression and one col with utility coefficient
+    skims : dict
+        skim wrappers, by name
+    trip_origin : str
+        name of the trip origin column
+
+    Returns
+    -------
+    fixed_spec, delta_spec : pandas.DataFrame
+        row subsets of spec
+    """
+    pattern = r"[a-zA-Z_][a-zA-Z0-9_]*"
+
+    origin_names = {trip_origin}
+    for name, skim in skims.items():
+        keys = (getattr(skim, "orig_key", None), getattr(skim, "dest_key", None))
+        if trip_origin in keys:
+            origin_names.add(name)
+
+    if isinstance(spec.index, pd.MultiIndex):
+        exprs = spec.index.get_level_values(simulate.SPEC_EXPRESSION_NAME)
+    else:
+        exprs = spec.index
+
+    is_temp = np.zeros(len(spec), dtype=bool)
+    is_delta = np.zeros(len(spec), dtype=bool)
+    for n, expr in enumerate(exprs):
+        is_delta[n] = not origin_names.isdisjoint(re.findall(pattern, expr))
+        if expr.startswith("_"):
+            is_temp[n] = True
+            if is_delta[n]:
+                origin_names.add(expr[: expr.index("@")])
+
+    return spec[~is_delta], spec[is_delta | is_temp]
+
+
+class FixedSampleUtilities:
+    """
+    Utilities of the trip destination sample terms that do not depend on the trip origin.
+
+    For each segment (primary purpose and zone layer), the utilities of the
+    fixed terms (see `split_fixed_sample_spec`) of every alternative are kept
+    in a table with one row for each distinct combination of the trip columns
+    the fixed terms use.  Rows are only evaluated for trips with combinations
+    that are not in the table yet, so trips on the same tour leg share them
+    across trip_num iterations.
+
+    The tables are only kept for one model step (the caller makes a new
+    FixedSampleUtilities for each step), and hold at most `max_utilities`
+    utilities in all.  When they would hold more, the tables of the least
+    recently used segments are dropped, and if the table of the current
+    segment is still too large, it only keeps the rows of the current trips.
+    """
+
+    def __init__(self, max_utilities: int = 50_000_000):
+        self.max_utilities = max_utilities
+        self._tables = OrderedDict()
+
+    def lookup(
+        self,
+        state: workflow.State,
+        segment,
+        trips,
+        alternatives,
+        fixed_spec,
+        skims,
+        locals_dict,
+        model_settings: TripDestinationSettings,
+        chunk_tag: str,
+        trace_label: str,
+    ):
+        """
+        Get the fixed utilities of trips, evaluating those not known yet.
+
+        Returns
+        -------
+        rows : pandas.Series
+            row of table for each trip, indexed like trips
+        table : numpy.ndarray
+            fixed utilities, one column per alternative
+        """
+        fixed_skims = {
+            name: skim
+            for name, skim in skims.items()
+            if any(name in str(expr) for expr in fixed_spec.index)
+        }
+        key_columns = logsum_key_columns(trips, fixed_spec, None, fixed_skims)
+        # chooser columns are renamed in the interaction dataset if alternatives have them
+        key_columns += [
+            c for c in trips.columns if c in alternatives and c not in key_columns
+        ]
+        if key_columns:
+            keys = LogsumCache.row_keys(trips[key_columns])
+        else:
+            keys = np.zeros(len(trips), dtype=np.uint64)
+
+        known, table = self._tables.get(
+            segment,
+            (pd.Index([], dtype=np.uint64), np.zeros((0, len(alternatives)))),
+        )
+        positions = known.get_indexer(keys)
+        new = positions < 0
+        if new.any():
+            new_keys, first = np.unique(keys[new], return_index=True)
+            logger.info(
+                f"{trace_label} evaluating fixed sample utilities "
+                f"for {len(new_keys)} of {len(trips)} trips"
+            )
+            utilities = self._evaluate(
+                state,
+                trips[new].iloc[first],
+                alternatives,
+                fixed_spec,
+                fixed_skims,
+                locals_dict,
+                model_settings,
+                chunk_tag,
+                trace_label,
+            )
+            known = known.append(pd.Index(new_keys))
+            table = np.concatenate([table, utilities])
+            positions = known.get_indexer(keys)
+            if table.size > self.max_utilities:
+                needed = np.unique(positions)
+                known, table = known[needed], table[needed]
+                positions = known.get_indexer(keys)
+            self._tables[segment] = (known, table)
+            self._tables.move_to_end(segment)
+            self._evict()
+        elif segment in self._tables:
+            self._tables.move_to_end(segment)
+
+        return pd.Series(positions, index=trips.index), table
+
+    def _evict(self):
+        """Drop the tables of the least recently used segments to fit the limit."""
+        total = sum(table.size for _, table in self._tables.values())
+        while total > self.max_utilities and len(self._tables) > 1:
+            segment, (_, table) = self._tables.popitem(last=False)
+            total -= table.size
+            logger.debug(f"dropped fixed sample utilities of {segment}")
+
+    @staticmethod
+    def _evaluate(
+        state,
+        trips,
+        alternatives,
+        fixed_spec,
+        skims,
+        locals_dict,
+        model_settings,
+        chunk_tag,
+        trace_label,
+    ):
+        if alternatives.index.name not in alternatives:
+            alternatives = alternatives.copy()
+            alternatives[alternatives.index.name] = alternatives.index
+        compute_settings = model_settings.compute_settings.subcomponent_settings(
+            "sample"
+        ).model_copy(update={"sharrow_skip": True})
+
+        utilities = []
+        for (
+            _i,
+            trips_chunk,
+            chunk_trace_label,
+            chunk_sizer,
+        ) in chunk.adaptive_chunked_choosers(
+            state,
+            trips,
+            tracing.extend_trace_label(trace_label, "fixed_utilities"),
+            f"{chunk_tag}.fixed_utilities",
+            explicit_chunk_size=model_settings.explicit_chunk,
+        ):
+            interaction_df = logit.interaction_dataset(
+                state, trips_chunk, alternatives, sample_size=len(alternatives)
+            )
+            chunk_sizer.log_df(chunk_trace_label, "interaction_df", interaction_df)
+            simulate.set_skim_wrapper_targets(interaction_df, skims)
+            chunk_utilities, _ = interaction_simulate.eval_interaction_utilities(
+                state,
+                fixed_spec,
+                interaction_df,
+                locals_dict,
+                chunk_trace_label,
+                None,
+                compute_settings=compute_settings,
+            )
+            utilities.append(
+                chunk_utilities.utility.to_numpy().reshape(
+                    len(trips_chunk), len(alternatives)
+                )
+            )
+            chunk_sizer.log_df(chunk_trace_label, "fixed_utilities", utilities)
+            del interaction_df
+            chunk_sizer.log_df(chunk_trace_label, "interaction_df", None)
+
+        return np.concatenate(utilities)
+
+
 @workflow.func
 def _destination_sample(
     state: workflow.State,
@@ -145,6 +375,7 @@ def _destination_sample(
     chunk_tag: str,
     trace_label: str,
     zone_layer=None,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     """
 
@@ -212,6 +443,30 @@ def _destination_sample(
             trace_label=tracing.extend_trace_label(trace_label, "alts"),
         )
 
+    fixed_utilities = None
+    if (
+        fixed_sample_utilities is not None
+        and not estimator
+        and not state.tracing.has_trace_targets(trips)
+    ):
+        fixed_spec, delta_spec = split_fixed_sample_spec(
+            spec, skims, model_settings.TRIP_ORIGIN
+        )
+        if len(fixed_spec) > 0:
+            fixed_utilities = fixed_sample_utilities.lookup(
+                state,
+                (primary_purpose, zone_layer),
+                trips,
+                alternatives,
+                fixed_spec,
+                skims,
+                locals_dict,
+                model_settings,
+                chunk_tag=chunk_tag,
+                trace_label=trace_label,
+            )
+            spec = delta_spec
+
     choices = interaction_sample(
         state,
         choosers=trips,
@@ -231,6 +486,7 @@ def _destination_sample(
         compute_settings=model_settings.compute_settings.subcomponent_settings(
             "sample"
         ),
+        fixed_utilities=fixed_utilities,
     )
 
     return choices
@@ -248,6 +504,7 @@ def destination_sample(
     estimator,
     chunk_size,
     trace_label,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     chunk_tag = "trip_destination.sample"
 
@@ -266,6 +523,7 @@ def destination_sample(
         estimator,
         chunk_tag=chunk_tag,
         trace_label=trace_label,
+        fixed_sample_utilities=fixed_sample_utilities,
     )
 
     return choices
@@ -552,6 +810,7 @@ def destination_presample(
     network_los,
     estimator,
     trace_label,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     trace_label = tracing.extend_trace_label(trace_label, "presample")
     chunk_tag = "trip_destination.presample"  # distinguish from trip_destination.sample
@@ -592,6 +851,7 @@ def destination_presample(
         chunk_tag=chunk_tag,
         trace_label=trace_label,
         zone_layer="taz",
+        fixed_sample_utilities=fixed_sample_utilities,
     )
 
     # choose a MAZ for each DEST_TAZ choice, choice probability based on MAZ size_term fraction of TAZ total
@@ -621,6 +881,7 @@ def trip_destination_sample(
     estimator,
     chunk_size,
     trace_label,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     """
 
@@ -670,6 +931,7 @@ def trip_destination_sample(
             network_los,
             estimator,
             trace_label,
+            fixed_sample_utilities=fixed_sample_utilities,
         )
 
     else:
@@ -684,6 +946,7 @@ def trip_destination_sample(
             estimator,
             chunk_size,
             trace_label,
+            fixed_sample_utilities=fixed_sample_utilities,
         )
 
     return choices
@@ -1018,6 +1281,7 @@ def choose_trip_destination(
     estimator,
     chunk_size,
     trace_label,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     logger.info("choose_trip_destination %s with %d trips", trace_label, trips.shape[0])
 
@@ -1035,6 +1299,7 @@ def choose_trip_destination(
         estimator=estimator,
         chunk_size=chunk_size,
         trace_label=trace_label,
+        fixed_sample_utilities=fixed_sample_utilities,
     )
 
     dropped_trips = ~trips.index.isin(destination_sample.index.unique())
@@ -1239,6 +1504,7 @@ def run_trip_destination(
     fail_some_trips_for_testing: bool = False,
     model_settings: TripDestinationSettings | None = None,
     model_settings_file_name: str = "trip_destination.yaml",
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     """
     trip destination - main functionality separated from model step so it can be called iteratively
@@ -1260,6 +1526,9 @@ def run_trip_destination(
     fail_some_trips_for_testing : bool, default False
     model_settings : TripDestinationSettings, optional
     model_settings_file_name : str, default "trip_destination.yaml"
+    fixed_sample_utilities : FixedSampleUtilities, optional
+        fixed sample utilities to reuse, e.g. from earlier calls for the same
+        trips, if the reuse_fixed_sample_utilities setting is enabled
 
     Returns
     -------
@@ -1362,6 +1631,11 @@ def run_trip_destination(
 
     alternatives.index.name = model_settings.ALT_DEST_COL_NAME
 
+    if not model_settings.reuse_fixed_sample_utilities or estimator:
+        fixed_sample_utilities = None
+    elif fixed_sample_utilities is None:
+        fixed_sample_utilities = FixedSampleUtilities()
+
     sample_list = []
 
     # - process intermediate trips in ascending trip_num order
@@ -1437,6 +1711,7 @@ def run_trip_destination(
                     trace_label=tracing.extend_trace_label(
                         nth_trace_label, primary_purpose
                     ),
+                    fixed_sample_utilities=fixed_sample_utilities,
                 )
 
                 choices_list.append(choices)
@@ -6,7 +6,10 @@ import logging
 
 import pandas as pd
 
-from activitysim.abm.models.trip_destination import run_trip_destination
+from activitysim.abm.models.trip_destination import (
+    FixedSampleUtilities,
+    run_trip_destination,
+)
 from activitysim.abm.models.trip_purpose import run_trip_purpose
 from activitysim.abm.models.util.trip import (
     cleanup_failed_trips,
@@ -26,6 +29,7 @@ def run_trip_purpose_and_destination(
     tours_merged_df,
     chunk_size,
     trace_label,
+    fixed_sample_utilities: FixedSampleUtilities | None = None,
 ):
     assert not trips_df.empty
     trace_hh_id = state.settings.trace_hh_id
@@ -46,6 +50,7 @@ def run_trip_purpose_and_destination(
         estimator=None,
         chunk_size=chunk_size,
         trace_label=tracing.extend_trace_label(trace_label, "destination"),
+        fixed_sample_utilities=fixed_sample_utilities,
     )
 
     return trips_df, save_sample_df
@@ -141,6 +146,8 @@ def trip_purpose_and_destination(
 
     processed_trips = []
     save_samples = []
+    # reruns of failed trips reuse their fixed trip destination sample utilities
+    fixed_sample_utilities = FixedSampleUtilities()
     i = 0
     TRIP_RESULT_COLUMNS = ["purpose", "destination", "origin", "failed"]
     while True:
@@ -156,6 +163,7 @@ def trip_purpose_and_destination(
             tours_merged_df,
             chunk_size=state.settings.chunk_size,
             trace_label=tracing.extend_trace_label(trace_label, "i%s" % i),
+            fixed_sample_utilities=fixed_sample_utilities,
         )
 
         # # if testing, make sure at least one trip fails
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 
+import numpy as np
 import pandas as pd
 
 from activitysim.core import config, expressions, los, simulate, tracing, workflow
@@ -51,6 +52,39 @@ def filter_chooser_columns(
     return choosers
 
 
+def dedupe_logsum_choosers(choosers, exclude_columns=()):
+    """
+    Drop choosers that would have the same logsums as an earlier chooser.
+
+    Choosers are duplicates if they have the same values in all columns except
+    exclude_columns (e.g. sample probabilities and pick counts), which includes
+    origin, destination, time periods and all the chooser attributes used by the
+    logsum spec.
+
+    Parameters
+    ----------
+    choosers : pandas.DataFrame
+    exclude_columns : list of str
+        columns that don't affect the logsums
+
+    Returns
+    -------
+    unique_choosers : pandas.DataFrame
+        the first chooser with each unique set of values
+    redupe : numpy.ndarray
+        for each row of choosers, the position of its row in unique_choosers
+    """
+    key_columns = [c for c in choosers.columns if c not in exclude_columns]
+    redupe = (
+        choosers.groupby(key_columns, sort=False, observed=True, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+    # groups are numbered in order of first appearance
+    _, first = np.unique(redupe, return_index=True)
+    return choosers.iloc[first], redupe
+
+
 def compute_location_choice_logsums(
     state: workflow.State,
     choosers: pd.DataFrame,
@@ -157,6 +191,18 @@ def compute_location_choice_logsums(
     else:
         logger.error("Choosers table already has column 'duration'.")
 
+    redupe = None
+    if model_settings.DEDUPE_LOGSUMS and not state.tracing.has_trace_targets(choosers):
+        full_index = choosers.index
+        choosers, redupe = dedupe_logsum_choosers(
+            choosers,
+            exclude_columns=["prob", "pick_count", model_settings.CHOOSER_ID_COLUMN],
+        )
+        logger.info(
+            f"{trace_label} computing logsums for {len(choosers)} unique "
+            f"of {len(redupe)} choosers"
+        )
+
     logsum_spec = state.filesystem.read_model_spec(file_name=logsum_settings.SPEC)
     coefficients = state.filesystem.get_segment_coefficients(
         logsum_settings, tour_purpose
@@ -265,4 +311,7 @@ def compute_location_choice_logsums(
         compute_settings=logsum_settings.compute_settings,
     )
 
+    if redupe is not None:
+        logsums = pd.Series(logsums.to_numpy()[redupe], index=full_index)
+
     return logsums
@@ -0,0 +1,35 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from activitysim.abm.models.util.logsums import dedupe_logsum_choosers
+
+
+def test_dedupe_logsum_choosers():
+    choosers = pd.DataFrame(
+        {
+            "home_zone_id": [1, 1, 2, 1, 1],
+            "alt_dest": [5, 6, 5, 5, 6],
+            "income_segment": [1, 1, 1, 1, 2],
+            "prob": [0.1, 0.2, 0.3, 0.4, 0.5],
+            "pick_count": [1, 2, 1, 3, 1],
+        },
+        index=pd.Index([10, 10, 11, 12, 12], name="person_id"),
+    )
+
+    unique_choosers, redupe = dedupe_logsum_choosers(
+        choosers, exclude_columns=["prob", "pick_count"]
+    )
+
+    assert list(unique_choosers.index) == [10, 10, 11, 12]
+    np.testing.assert_array_equal(redupe, [0, 1, 2, 0, 3])
+
+    # scattering back restores the full set of choosers
+    key_columns = ["home_zone_id", "alt_dest", "income_segment"]
+    pd.testing.assert_frame_equal(
+        unique_choosers[key_columns].iloc[redupe].reset_index(drop=True),
+        choosers[key_columns].reset_index(drop=True),
+    )
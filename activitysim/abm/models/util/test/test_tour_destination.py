@@ -0,0 +1,70 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from activitysim.abm.models.util.tour_destination import sample_candidates
+from activitysim.core.configuration.logit import SamplePruningSettings
+
+
+class DistanceSkims:
+    """Distance between zones on a line, counting lookups."""
+
+    def __init__(self):
+        self.lookups = 0
+
+    def lookup(self, orig, dest, key):
+        assert key == "DIST"
+        self.lookups += 1
+        return np.abs(np.asarray(orig) - np.asarray(dest)).astype(float)
+
+
+def test_sample_candidates():
+    skims = DistanceSkims()
+    size_terms = pd.DataFrame(
+        {"size_term": [1.0, 1.0, 1.0, 1.0, 1000.0]},
+        index=pd.Index([1, 2, 3, 4, 5], name="zone_id"),
+    )
+    pruning = SamplePruningSettings(COEFFICIENT=-5.0, MASS=0.95)
+    cache = {}
+
+    candidates = sample_candidates(
+        skims,
+        [1, 1, 3],
+        size_terms,
+        pruning,
+        "home_zone_id",
+        cache=cache,
+        cache_key="work",
+    )
+    assert candidates.index.name == "home_zone_id"
+    assert list(candidates.columns) == [1, 2, 3, 4, 5]
+    # the origin zone is always a candidate, distant small zones are pruned
+    assert list(candidates.loc[1]) == [True, False, False, False, False]
+    assert list(candidates.loc[3]) == [False, False, True, False, True]
+    assert skims.lookups == 1
+
+    # cached origins are not looked up again
+    candidates = sample_candidates(
+        skims,
+        [1, 3],
+        size_terms,
+        pruning,
+        "home_zone_id",
+        cache=cache,
+        cache_key="work",
+    )
+    assert skims.lookups == 1
+    candidates = sample_candidates(
+        skims,
+        [1, 5],
+        size_terms,
+        pruning,
+        "home_zone_id",
+        cache=cache,
+        cache_key="work",
+    )
+    assert skims.lookups == 2
+    assert set(candidates.index) == {1, 3, 5}
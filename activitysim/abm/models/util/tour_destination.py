@@ -10,8 +10,11 @@ import pandas as pd
 from activitysim.abm.models.util import logsums as logsum
 from activitysim.abm.tables.size_terms import tour_destination_size_terms
 from activitysim.core import config, los, simulate, tracing, workflow
-from activitysim.core.configuration.logit import TourLocationComponentSettings
-from activitysim.core.interaction_sample import interaction_sample
+from activitysim.core.configuration.logit import (
+    SamplePruningSettings,
+    TourLocationComponentSettings,
+)
+from activitysim.core.interaction_sample import alias_sample, interaction_sample
 from activitysim.core.interaction_sample_simulate import interaction_sample_simulate
 from activitysim.core.util import reindex
 
@@ -73,6 +76,8 @@ def _destination_sample(
     chunk_tag,
     trace_label: str,
     zone_layer=None,
+    size_terms_only=False,
+    candidates=None,
 ):
     model_spec = simulate.spec_for_segment(
         state,
@@ -109,6 +114,21 @@ def _destination_sample(
 
     log_alt_losers = state.settings.log_alt_losers
 
+    if size_terms_only and sample_size > 0:
+        choices = alias_sample(
+            state,
+            choosers,
+            destination_size_terms,
+            presample_size_weights(destination_size_terms),
+            sample_size=sample_size,
+            alt_col_name=alt_dest_col_name,
+            trace_label=trace_label,
+        )
+        choices[model_settings.CHOOSER_ID_COLUMN] = choosers[
+            model_settings.CHOOSER_ID_COLUMN
+        ]
+        return choices
+
     choices = interaction_sample(
         state,
         choosers,
@@ -127,6 +147,7 @@ def _destination_sample(
         compute_settings=model_settings.compute_settings.subcomponent_settings(
             "sample"
         ),
+        candidates=candidates,
     )
 
     # if special person id is passed
@@ -166,6 +187,16 @@ def destination_sample(
     # the name of the dest column to be returned in choices
     alt_dest_col_name = model_settings.ALT_DEST_COL_NAME
 
+    candidates = None
+    if model_settings.SAMPLE_PRUNING is not None and estimator is None:
+        candidates = sample_candidates(
+            skim_dict,
+            choosers[model_settings.CHOOSER_ORIG_COL_NAME],
+            destination_size_terms,
+            model_settings.SAMPLE_PRUNING,
+            model_settings.CHOOSER_ORIG_COL_NAME,
+        )
+
     choices = _destination_sample(
         state,
         spec_segment_name,
@@ -177,6 +208,7 @@ def destination_sample(
         alt_dest_col_name,
         chunk_tag=chunk_tag,
         trace_label=trace_label,
+        candidates=candidates,
     )
 
     return choices
@@ -232,6 +264,111 @@ def aggregate_size_terms(dest_size_terms, network_los):
     return MAZ_size_terms, TAZ_size_terms
 
 
+def presample_size_weights(TAZ_size_terms):
+    """
+    Size-term-only TAZ presample weights, including any shadow price adjustments.
+
+    Parameters
+    ----------
+    TAZ_size_terms : pandas.DataFrame
+        with a size_term column, and optionally shadow_price_size_term_adjustment
+        and shadow_price_utility_adjustment columns
+
+    Returns
+    -------
+    numpy.ndarray with one weight per TAZ
+    """
+    weights = TAZ_size_terms["size_term"].to_numpy(dtype=np.float64)
+    if "shadow_price_size_term_adjustment" in TAZ_size_terms:
+        weights = weights * TAZ_size_terms["shadow_price_size_term_adjustment"].values
+    if "shadow_price_utility_adjustment" in TAZ_size_terms:
+        weights = weights * np.exp(TAZ_size_terms["shadow_price_utility_adjustment"])
+    return np.clip(weights, 0, None)
+
+
+def sample_candidates(
+    skim_dict,
+    origins,
+    dest_size_terms,
+    pruning: SamplePruningSettings,
+    orig_col_name,
+    cache=None,
+    cache_key=None,
+):
+    """
+    Candidate destinations of each origin zone, for pruned destination sampling.
+
+    The candidates of an origin are the destinations with the largest weights
+    (size_term * exp(COEFFICIENT * SKIM)) that together cover MASS of the total
+    weight of all destinations.
+
+    Parameters
+    ----------
+    skim_dict : SkimDict or SkimDataset
+        skims with the origin and destination zones
+    origins : array-like
+        origin zone ids of the choosers
+    dest_size_terms : pandas.DataFrame
+        one row per destination, with a size_term column
+    pruning : SamplePruningSettings
+    orig_col_name : str
+        name of the chooser column with the origin zones
+    cache : dict, optional
+        candidates already found, by cache_key, are reused and updated with new origins
+    cache_key : hashable, optional
+
+    Returns
+    -------
+    candidates : pandas.DataFrame
+        boolean, indexed by origin zone (named orig_col_name) with one column
+        per destination in dest_size_terms
+    """
+    origins = np.unique(np.asanyarray(origins))
+    known = cache.get(cache_key) if cache is not None else None
+    if known is not None:
+        origins = origins[~np.isin(origins, known.index)]
+
+    if len(origins) > 0:
+        dests = dest_size_terms.index.values
+        size_terms = dest_size_terms.size_term.values
+
+        # look up the skims for blocks of origins, to limit the size of temporaries
+        block_size = max(1, 2**22 // len(dests))
+        masks = []
+        for start in range(0, len(origins), block_size):
+            orig = origins[start : start + block_size]
+            impedance = skim_dict.lookup(
+                np.repeat(orig, len(dests)), np.tile(dests, len(orig)), pruning.SKIM
+            ).reshape(len(orig), len(dests))
+            weights = size_terms * np.exp(pruning.COEFFICIENT * impedance)
+
+            # keep the largest weights until they cover MASS of the total
+            order = np.argsort(-weights, axis=1)
+            sorted_weights = np.take_along_axis(weights, order, axis=1)
+            cum_weights = sorted_weights.cumsum(axis=1)
+            keep = (cum_weights - sorted_weights) < pruning.MASS * cum_weights[:, -1:]
+            mask = np.zeros(weights.shape, dtype=bool)
+            np.put_along_axis(mask, order, keep, axis=1)
+            masks.append(mask)
+
+        new = pd.DataFrame(
+            np.concatenate(masks),
+            index=pd.Index(origins, name=orig_col_name),
+            columns=dest_size_terms.index,
+        )
+        logger.info(
+            f"found {new.values.sum(axis=1).mean():.1f} candidates of "
+            f"{len(dests)} destinations for {len(new)} origins"
+        )
+        known = new if known is None else pd.concat([known, new])
+        if cache is not None:
+            cache[cache_key] = known
+
+    # destinations may differ from those of the cached candidates
+    candidates = known.reindex(columns=dest_size_terms.index, fill_value=False)
+    return candidates.rename_axis(orig_col_name)
+
+
 def choose_MAZ_for_TAZ(state: workflow.State, taz_sample, MAZ_size_terms, trace_label):
     """
     Convert taz_sample table with TAZ zone sample choices to a table with a MAZ zone chosen for each TAZ
@@ -496,6 +633,16 @@ def destination_presample(
     skim_dict = network_los.get_skim_dict("taz")
     skims = skim_dict.wrap(ORIG_TAZ, DEST_TAZ)
 
+    candidates = None
+    if model_settings.SAMPLE_PRUNING is not None and estimator is None:
+        candidates = sample_candidates(
+            skim_dict,
+            choosers[ORIG_TAZ],
+            TAZ_size_terms,
+            model_settings.SAMPLE_PRUNING,
+            ORIG_TAZ,
+        )
+
     taz_sample = _destination_sample(
         state,
         spec_segment_name,
@@ -508,6 +655,8 @@ def destination_presample(
         chunk_tag=chunk_tag,
         trace_label=trace_label,
         zone_layer="taz",
+        size_terms_only=model_settings.PRESAMPLE_SIZE_TERMS_ONLY,
+        candidates=candidates,
     )
 
     # choose a MAZ for each DEST_TAZ choice, choice probability based on MAZ size_term fraction of TAZ total
@@ -588,24 +588,9 @@ def tdd_interaction_dataset(
         window_row_ids = np.repeat(tours[window_id_col], len(alts.index))
         chunk_sizer.log_df(trace_label, "window_row_ids", window_row_ids)
 
-        alt_tdd = alts.take(alts_ids)
-
-        alt_tdd.index = tour_ids
-
-        import xarray as xr
-
-        alt_tdd_ = xr.Dataset.from_dataframe(alt_tdd)
-        dimname = alt_tdd.index.name or "index"
-        # alt_tdd_[window_id_col] = xr.DataArray(window_row_ids, dims=(dimname,))
-        alt_tdd_[choice_column] = xr.DataArray(
-            alts_ids, dims=(dimname,), coords=alt_tdd_.coords
-        )
-
-        # add tdd alternative id
-        # by convention, the choice column is the first column in the interaction dataset
-        # alt_tdd.insert(loc=0, column=choice_column, value=alts_ids)
-
-        # slice out all non-available tours
+        # find the available alternatives first, so the alternatives are only
+        # ever repeated for the (ragged) set of tdds available to each tour,
+        # instead of for every tdd
         available = timetable.tour_available(window_row_ids, alts_ids)
 
         del window_row_ids
@@ -616,17 +601,17 @@ def tdd_interaction_dataset(
         )
         assert available.any()
 
-        chunk_sizer.log_df(
-            trace_label, "alt_tdd_", alt_tdd_
-        )  # catch this before we slice on available
+        alts_ids = alts_ids[available]
+        chunk_sizer.log_df(trace_label, "alts_ids", alts_ids)
+
+        alt_tdd = alts.take(alts_ids)
+        alt_tdd.index = tour_ids[available]
 
-        alt_tdd = alt_tdd_.isel({dimname: available}).to_dataframe()
+        # add tdd alternative id
+        alt_tdd[choice_column] = alts_ids
 
         chunk_sizer.log_df(trace_label, "alt_tdd", alt_tdd)
 
-        # FIXME - don't need this any more after slicing
-        # del alt_tdd[window_id_col]
-
     return alt_tdd
 
 
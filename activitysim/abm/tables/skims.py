@@ -1,9 +1,12 @@
 # ActivitySim
 # See full license in LICENSE.txt.
 
+import hashlib
 import logging
+import os
 
 from activitysim.core import los, workflow
+from activitysim.core.logsum_cache import LogsumCache
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,32 @@ def skim_dict(
     return result
 
 
+@workflow.cached_object
+def logsum_cache(
+    state: workflow.State,
+    network_los: los.Network_LOS,
+) -> LogsumCache:
+    # skims are identified by the names, sizes and modification times of the
+    # skim files, so persisted logsums are not reused after skims are rebuilt
+    h = hashlib.sha256()
+    for skim_tag in network_los.skim_dicts:
+        file_names = network_los.omx_file_names(skim_tag)
+        for file_path in state.filesystem.expand_input_file_list(file_names):
+            stat = os.stat(file_path)
+            h.update(f"{file_path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    cache_dir = None
+    if state.settings.persist_logsum_cache:
+        cache_dir = state.filesystem.get_cache_dir().joinpath("logsums")
+
+    logger.debug("loading logsum_cache injectable")
+    return LogsumCache(
+        state.settings.logsum_cache_size,
+        cache_dir=cache_dir,
+        fingerprint=h.hexdigest(),
+    )
+
+
 @workflow.cached_object
 def log_settings(
     state: workflow.State,  # noqa: F841
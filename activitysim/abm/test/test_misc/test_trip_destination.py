@@ -0,0 +1,157 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+import pandas.testing as pdt
+
+from activitysim.abm.models.trip_destination import (
+    FixedSampleUtilities,
+    TripDestinationSettings,
+    split_fixed_sample_spec,
+)
+from activitysim.core import interaction_sample, logit, workflow
+from activitysim.core.interaction_simulate import eval_interaction_utilities
+
+
+class SkimWrapper:
+    def __init__(self, orig_key, dest_key):
+        self.orig_key = orig_key
+        self.dest_key = dest_key
+
+
+def test_split_fixed_sample_spec():
+    skims = {
+        "od_skims": SkimWrapper("origin", "dest_taz"),
+        "dp_skims": SkimWrapper("dest_taz", "tour_leg_dest"),
+    }
+    expressions = [
+        "_od_DIST@od_skims['DIST']",
+        "_dp_DIST@dp_skims['DIST']",
+        "@np.log1p(size_terms.get(df.dest_taz, df.purpose))",
+        "@df.outbound * _dp_DIST",
+        "@df.outbound * _od_DIST",
+        "@_od_DIST + _dp_DIST",
+        "@df.origin == df.dest_taz",
+    ]
+    spec = pd.DataFrame(
+        {"coefficient": 1.0},
+        index=pd.Index(expressions, name="Expression"),
+    )
+
+    fixed_spec, delta_spec = split_fixed_sample_spec(spec, skims, "origin")
+
+    assert list(fixed_spec.index) == expressions[1:4]
+    assert list(delta_spec.index) == expressions[:2] + expressions[4:]
+
+
+def test_fixed_sample_utilities_limit():
+    class IncomeUtilities(FixedSampleUtilities):
+        @staticmethod
+        def _evaluate(state, trips, alternatives, *args):
+            return np.repeat(trips[["income"]].to_numpy(float), len(alternatives), 1)
+
+    alternatives = pd.DataFrame({"size": [1.0, 2.0]}, index=[10, 20])
+    spec = pd.DataFrame(
+        {"coefficient": 1.0}, index=pd.Index(["@df.income"], name="Expression")
+    )
+    fixed = IncomeUtilities(max_utilities=8)
+
+    def lookup(segment, income):
+        trips = pd.DataFrame({"income": income})
+        rows, table = fixed.lookup(
+            None, segment, trips, alternatives, spec, {}, None, None, "t", "t"
+        )
+        npt.assert_array_equal(table[rows.to_numpy(), 1], income)
+        return len(table)
+
+    assert lookup("a", [1, 1, 2]) == 2
+    assert lookup("b", [3, 4]) == 2
+    assert list(fixed._tables) == ["a", "b"]
+
+    # least recently used segments are dropped first
+    assert lookup("a", [1, 5]) == 3
+    assert list(fixed._tables) == ["a"]
+
+    # then the rows of other trips
+    assert lookup("a", [6, 7, 7, 8]) == 3
+
+
+def test_fixed_sample_utilities_equivalence():
+    state = workflow.State().default_settings()
+    trips = pd.DataFrame(
+        {"origin": [10, 30, 30, 20], "income": [1.0, 2.0, 2.0, 3.0]},
+        index=pd.Index([5, 6, 7, 8], name="trip_id"),
+    )
+    # not sorted, so columns of the fixed utilities must follow this order
+    alternatives = pd.DataFrame(
+        {"size_term": [4.0, 1.0, 9.0], "dest_taz": [30, 10, 20]},
+        index=pd.Index([30, 10, 20], name="dest_taz"),
+    )
+    expressions = [
+        # temp shared by the fixed and delta terms
+        "_size@np.log1p(df.size_term)",
+        "_od_dist@np.abs(df.origin - df.dest_taz)",
+        "@_size * df.income",
+        "@df.income * df.dest_taz / 100",
+        "@_size * _od_dist",
+        "@df.origin == df.dest_taz",
+    ]
+    spec = pd.DataFrame(
+        {"coefficient": [1.0, 1.0, 0.5, 1.0, -0.1, 2.0]},
+        index=pd.Index(expressions, name="Expression"),
+    )
+    fixed_spec, delta_spec = split_fixed_sample_spec(spec, {}, "origin")
+    assert list(fixed_spec.index) == [expressions[0]] + expressions[2:4]
+    assert list(delta_spec.index) == expressions[:2] + expressions[4:]
+
+    model_settings = TripDestinationSettings(
+        SAMPLE_SPEC="sample.csv",
+        SPEC="spec.csv",
+        SAMPLE_SIZE=len(alternatives),
+        LOGSUM_SETTINGS="logsum.yaml",
+        CLEANUP=False,
+    )
+    rows, table = FixedSampleUtilities().lookup(
+        state,
+        "segment",
+        trips,
+        alternatives,
+        fixed_spec,
+        {},
+        {},
+        model_settings,
+        chunk_tag="test",
+        trace_label="test",
+    )
+    # trips 6 and 7 share a row
+    assert table.shape == (3, len(alternatives))
+    assert rows[6] == rows[7]
+
+    interaction_df = logit.interaction_dataset(
+        state, trips, alternatives, sample_size=len(alternatives)
+    )
+    full, _ = eval_interaction_utilities(state, spec, interaction_df, {}, "full", None)
+    delta, _ = eval_interaction_utilities(
+        state, delta_spec, interaction_df, {}, "delta", None
+    )
+    full = full.utility.to_numpy().reshape(len(trips), len(alternatives))
+    delta = delta.utility.to_numpy().reshape(len(trips), len(alternatives))
+    npt.assert_allclose(delta + table[rows.to_numpy()], full)
+
+    # and the same sample probabilities through interaction_sample
+    kwargs = dict(
+        choosers=trips,
+        alternatives=alternatives,
+        sample_size=0,
+        alt_col_name="dest_taz",
+        allow_zero_probs=True,
+        locals_d={},
+    )
+    expected = interaction_sample.interaction_sample(state, spec=spec, **kwargs)
+    sample = interaction_sample.interaction_sample(
+        state, spec=delta_spec, fixed_utilities=(rows, table), **kwargs
+    )
+    pdt.assert_frame_equal(sample, expected)
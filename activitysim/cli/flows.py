@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+# ActivitySim
+# See full license in LICENSE.txt.
+import logging
+
+from activitysim.cli import run
+from activitysim.core import workflow
+
+logger = logging.getLogger(__name__)
+
+# households to simulate when compiling flows, unless given on the command line
+PRECOMPILE_HOUSEHOLDS_SAMPLE_SIZE = 100
+
+
+def add_flows_args(parser):
+    """Flows command args"""
+    run.add_run_args(parser)
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="list the compiled flows recorded for this model config "
+        "instead of compiling them",
+    )
+
+
+def flows(args):
+    """
+    Compile the sharrow flows for a model config ahead of time.
+
+    The model is run with sharrow on a small sample of households (unless
+    '--households_sample_size' is given), which compiles every flow the model
+    uses into the sharrow cache directory, and records them in the flow cache
+    index.  Later runs of the same config on any machine that shares the cache
+    directory (see '--persist-sharrow-cache') then load the compiled flows
+    instead of compiling them.  With '--list', the recorded flows are listed
+    instead, along with whether their compiled code is in the cache directory.
+
+    returns:
+        int: sys.exit exit code
+    """
+    from activitysim import abm  # noqa: F401
+    from activitysim.core import flow
+
+    state = workflow.State()
+    state.logging.config_logger(basic=True)
+    state = run.handle_standard_args(state, args)
+
+    index = flow.flow_cache_index(state)
+    config_key = flow.flow_config_key(state)
+
+    if args.list:
+        recorded = index.flows(config_key)
+        print(f"{len(recorded)} flows recorded in {index.path} for this config")
+        for flow_hash, record in sorted(
+            recorded.items(), key=lambda x: (str(x[1].get("step")), x[0])
+        ):
+            status = "compiled" if index.flow_is_compiled(flow_hash) else "missing"
+            print(
+                f"  {flow_hash} {status:8s} "
+                f"{record.get('step')} {record.get('trace_label')}"
+            )
+        return 0
+
+    if not state.settings.sharrow:
+        state.settings.sharrow = True
+    if args.households_sample_size is None:
+        state.settings.households_sample_size = PRECOMPILE_HOUSEHOLDS_SAMPLE_SIZE
+    # flows are the same in every process, so compile them in just one
+    state.settings.multiprocess = False
+
+    run.cleanup_output_files(state)
+    state.logging.config_logger(basic=False)
+
+    state.run(models=state.settings.models)
+    state.checkpoint.close_store()
+
+    index.save()
+    index.report()
+    n_flows = len(index.flows(config_key))
+    logger.info(f"{n_flows} flows recorded in {index.path} for this config")
+    return 0
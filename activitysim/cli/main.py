@@ -8,7 +8,7 @@ import sys
 def prog():
 
     from activitysim import __doc__, __version__, workflows
-    from activitysim.cli import CLI, benchmark, create, exercise, run
+    from activitysim.cli import CLI, benchmark, create, exercise, flows, run
 
     asim = CLI(version=__version__, description=__doc__)
     asim.add_subcommand(
@@ -23,6 +23,12 @@ def prog():
         exec_func=create.create,
         description=create.create.__doc__,
     )
+    asim.add_subcommand(
+        name="flows",
+        args_func=flows.add_flows_args,
+        exec_func=flows.flows,
+        description=flows.flows.__doc__,
+    )
     asim.add_subcommand(
         name="benchmark",
         args_func=benchmark.make_asv_argparser,
@@ -2,6 +2,7 @@
 # See full license in LICENSE.txt.
 from __future__ import annotations
 
+import functools
 import logging
 from builtins import object, zip
 from collections import OrderedDict
@@ -13,6 +14,9 @@ from activitysim.core import chunk, util, workflow
 
 logger = logging.getLogger(__name__)
 
+# number of distinct expression strings to keep compiled code objects for
+EXPRESSION_CACHE_SIZE = 8192
+
 
 def uniquify_key(dict, key, template="{} ({})"):
     """
@@ -162,6 +166,59 @@ def local_utilities(state):
     return utility_dict
 
 
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(expression):
+    """
+    Compile a python expression string to a code object, caching the result
+
+    Spec expressions are evaluated once per chunk, per segment and per iteration,
+    so re-parsing the same strings each time adds up. The code object only depends
+    on the expression text (not on the spec file or the chooser columns), so it
+    can be shared by every caller that evaluates the same expression.
+
+    Parameters
+    ----------
+    expression : str
+        python expression, without any leading "@"
+
+    Returns
+    -------
+    code : code object
+        suitable for passing to builtin eval
+    """
+    return compile(expression, "<expression>", "eval")
+
+
+def eval_df_expression(df, expression, resolvers=None):
+    """
+    Evaluate a pandas-style expression in the context of df
+
+    Expressions that are just the name of a column of df are looked up directly,
+    bypassing the expression parser in pandas.eval, which otherwise dominates the
+    cost of evaluating them.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    expression : str
+    resolvers : list of dict, optional
+        passed on to df.eval; names found here take precedence over columns of df
+
+    Returns
+    -------
+    values : pandas.Series or scalar
+    """
+    if (
+        expression in df.columns
+        and df.columns.is_unique
+        and not any(expression in r for r in (resolvers or ()))
+    ):
+        return df[expression]
+    if resolvers is None:
+        return df.eval(expression)
+    return df.eval(expression, resolvers=resolvers)
+
+
 def is_throwaway(target):
     return target == "_"
 
@@ -328,7 +385,7 @@ def assign_variables(
 
         if is_temp_singular(target) or is_throwaway(target):
             try:
-                x = eval(expression, globals(), _locals_dict)
+                x = eval(compile_expression(expression), globals(), _locals_dict)
             except Exception as err:
                 logger.error(
                     "assign_variables error: %s: %s", type(err).__name__, str(err)
@@ -356,7 +413,9 @@ def assign_variables(
 
             # FIXME should whitelist globals for security?
             globals_dict = {}
-            expr_values = to_series(eval(expression, globals_dict, _locals_dict))
+            expr_values = to_series(
+                eval(compile_expression(expression), globals_dict, _locals_dict)
+            )
 
             if sharrow_enabled:
                 if isinstance(expr_values.dtype, pd.api.types.CategoricalDtype):
@@ -1,6 +1,6 @@
 import numpy as np
 import pandas as pd
-from numba import njit
+from numba import njit, prange
 
 
 @njit
@@ -200,3 +200,373 @@ def sample_choices_maker_preserve_ordering(
         out_choices=out_choices,
         out_choice_probs=out_choice_probs,
     )
+
+
+@njit(parallel=True)
+def fused_utils_to_choices(utils, rands, exp_util_min, out_choices, out_logsums):
+    """
+    Convert utilities to probabilities in place, and make one choice per row.
+
+    This is a single parallel pass over each row, combining the overflow
+    protection shift, exponentiation, normalization, logsum calculation and
+    the choice itself, without allocating any full size temporary arrays.
+
+    Rows where the maximum utility is not finite (i.e. all alternatives are
+    unavailable, or some utility is infinite or NaN) are left untouched in
+    `utils`, so they can be reported by the caller, and get a choice of -1.
+
+    Parameters
+    ----------
+    utils : array of float, shape (n_choosers, n_alts)
+        Utilities, overwritten in place with probabilities.
+    rands : array of float, shape (n_choosers,)
+        One random draw per chooser.  If empty, no choices are made.
+    exp_util_min : float
+        Exponentiated utilities at or below this value are treated as zero.
+    out_choices : array of int, shape (n_choosers,)
+    out_logsums : array of float, shape (n_choosers,)
+
+    Returns
+    -------
+    status : array of int8, shape (n_choosers,)
+        0 for good rows, 1 if all probabilities would be zero, 2 if there are
+        infinite or NaN utilities.
+    """
+    n_choosers, n_alts = utils.shape
+    want_choices = rands.shape[0] > 0
+    log_exp_util_min = np.log(exp_util_min)
+    status = np.zeros(n_choosers, dtype=np.int8)
+    for row in prange(n_choosers):
+        shift = -np.inf
+        for col in range(n_alts):
+            u = utils[row, col]
+            if np.isnan(u) or u == np.inf:
+                shift = np.nan
+                break
+            if u > shift:
+                shift = u
+        if np.isnan(shift):
+            status[row] = 2
+            out_choices[row] = -1
+            out_logsums[row] = np.nan
+            continue
+        if shift == -np.inf:
+            status[row] = 1
+            out_choices[row] = -1
+            out_logsums[row] = -np.inf
+            continue
+
+        total = 0.0
+        for col in range(n_alts):
+            u = utils[row, col] - shift
+            if u < log_exp_util_min:
+                # skip the exp for unavailable alternatives
+                e = 0.0
+            else:
+                e = np.exp(u)
+                if e <= exp_util_min:
+                    e = 0.0
+            utils[row, col] = e
+            total += e
+        out_logsums[row] = np.log(total) + shift
+
+        z = rands[row] if want_choices else 0.0
+        choice = -1
+        max_pr = 0.0
+        max_col = 0
+        for col in range(n_alts):
+            pr = utils[row, col] / total
+            utils[row, col] = pr
+            if choice < 0:
+                z -= pr
+                if z <= 0:
+                    choice = col
+            if pr > max_pr:
+                max_pr = pr
+                max_col = col
+        if choice < 0:
+            # rare condition, only if a random point is greater than the sum of
+            # probabilities, which due to the limits of numerical precision can
+            # technically happen
+            choice = max_col
+        out_choices[row] = choice
+    return status
+
+
+@njit(parallel=True)
+def fused_utils_to_choices_without_probs(
+    utils, rands, exp_util_min, out_choices, out_logsums
+):
+    """
+    Make one choice per row directly from utilities, without writing probabilities.
+
+    Like `fused_utils_to_choices`, but `utils` is only read.  After the row
+    maximum and the sum of exponentiated utilities (the logsum) are found, the
+    choice is made by walking the cumulative probabilities until they pass the
+    random draw, recomputing each exponentiated utility as it goes, so it stops
+    at the chosen alternative.  The choices are the same as those made from the
+    probabilities (for float32 utilities, up to rounding of the probabilities).
+
+    Parameters
+    ----------
+    utils : array of float, shape (n_choosers, n_alts)
+        Utilities, not modified.
+    rands : array of float, shape (n_choosers,)
+        One random draw per chooser.
+    exp_util_min : float
+        Exponentiated utilities at or below this value are treated as zero.
+    out_choices : array of int, shape (n_choosers,)
+    out_logsums : array of float, shape (n_choosers,)
+
+    Returns
+    -------
+    status : array of int8, shape (n_choosers,)
+        0 for good rows, 1 if all probabilities would be zero, 2 if there are
+        infinite or NaN utilities.
+    """
+    n_choosers, n_alts = utils.shape
+    log_exp_util_min = np.log(exp_util_min)
+    status = np.zeros(n_choosers, dtype=np.int8)
+    for row in prange(n_choosers):
+        shift = -np.inf
+        max_col = 0
+        for col in range(n_alts):
+            u = utils[row, col]
+            if np.isnan(u) or u == np.inf:
+                shift = np.nan
+                break
+            if u > shift:
+                shift = u
+                max_col = col
+        if np.isnan(shift):
+            status[row] = 2
+            out_choices[row] = -1
+            out_logsums[row] = np.nan
+            continue
+        if shift == -np.inf:
+            status[row] = 1
+            out_choices[row] = -1
+            out_logsums[row] = -np.inf
+            continue
+
+        total = 0.0
+        for col in range(n_alts):
+            u = utils[row, col] - shift
+            if u >= log_exp_util_min:
+                e = np.exp(u)
+                if e > exp_util_min:
+                    total += e
+        out_logsums[row] = np.log(total) + shift
+
+        z = rands[row]
+        # the alternative with the maximum utility also has the maximum probability,
+        # which is chosen in the rare case that the random point is greater than the
+        # sum of probabilities due to the limits of numerical precision
+        choice = max_col
+        for col in range(n_alts):
+            u = utils[row, col] - shift
+            if u < log_exp_util_min:
+                continue
+            e = np.exp(u)
+            if e <= exp_util_min:
+                continue
+            z -= e / total
+            if z <= 0:
+                choice = col
+                break
+        out_choices[row] = choice
+    return status
+
+
+@njit(parallel=True)
+def ragged_utils_to_choices(
+    utils, offsets, rands, exp_util_min, overflow_protection, out_choices, out_logsums
+):
+    """
+    Make one choice per chooser from ragged utilities, without padding.
+
+    The utilities of chooser `row` are `utils[offsets[row]:offsets[row + 1]]`,
+    so choosers can have different numbers of alternatives.  Like
+    `fused_utils_to_choices_without_probs`, the logsum is computed first and
+    the choice is then made by walking the cumulative probabilities, so no
+    probabilities array is written and `utils` is only read.
+
+    Parameters
+    ----------
+    utils : array of float, shape (n_utils,)
+    offsets : array of int, shape (n_choosers + 1,)
+        Position of the first utility of each chooser, and the total count.
+    rands : array of float, shape (n_choosers,)
+        One random draw per chooser.  If empty, no choices are made.
+    exp_util_min : float
+        Exponentiated utilities at or below this value are treated as zero.
+    overflow_protection : bool
+        Shift each chooser's utilities so the maximum is zero before they are
+        exponentiated.  If False, choosers whose exponentiated utilities are
+        all zero get a status of 1.
+    out_choices : array of int, shape (n_choosers,)
+        Position of the chosen alternative among each chooser's alternatives.
+    out_logsums : array of float, shape (n_choosers,)
+
+    Returns
+    -------
+    status : array of int8, shape (n_choosers,)
+        0 for good rows, 1 if all probabilities would be zero, 2 if there are
+        infinite or NaN utilities.
+    """
+    n_choosers = offsets.shape[0] - 1
+    want_choices = rands.shape[0] > 0
+    log_exp_util_min = np.log(exp_util_min)
+    status = np.zeros(n_choosers, dtype=np.int8)
+    for row in prange(n_choosers):
+        start = offsets[row]
+        end = offsets[row + 1]
+        shift = -np.inf
+        max_i = start
+        for i in range(start, end):
+            u = utils[i]
+            if np.isnan(u) or u == np.inf:
+                shift = np.nan
+                break
+            if u > shift:
+                shift = u
+                max_i = i
+        if np.isnan(shift):
+            status[row] = 2
+            out_choices[row] = -1
+            out_logsums[row] = np.nan
+            continue
+        if not overflow_protection and shift > -np.inf:
+            shift = 0.0
+
+        total = 0.0
+        for i in range(start, end):
+            u = utils[i] - shift
+            if u >= log_exp_util_min:
+                e = np.exp(u)
+                if e > exp_util_min:
+                    total += e
+        if total == 0.0:
+            status[row] = 1
+            out_choices[row] = -1
+            out_logsums[row] = -np.inf
+            continue
+        out_logsums[row] = np.log(total) + shift
+
+        if not want_choices:
+            continue
+        z = rands[row]
+        # the alternative with the maximum utility is chosen in the rare case
+        # that the random point is greater than the sum of probabilities
+        choice = max_i - start
+        for i in range(start, end):
+            u = utils[i] - shift
+            if u < log_exp_util_min:
+                continue
+            e = np.exp(u)
+            if e <= exp_util_min:
+                continue
+            z -= e / total
+            if z <= 0:
+                choice = i - start
+                break
+        out_choices[row] = choice
+    return status
+
+
+@njit
+def alias_table(weights):
+    """
+    Build a Vose alias table for sampling alternatives with fixed probabilities.
+
+    Parameters
+    ----------
+    weights : array of float, shape (n_alts,)
+        Non-negative weights, proportional to the probability of each alternative.
+
+    Returns
+    -------
+    prob : array of float, shape (n_alts,)
+        Probability of keeping each column rather than taking its alias.
+    alias : array of int, shape (n_alts,)
+    """
+    n_alts = weights.shape[0]
+    scaled = weights * (n_alts / weights.sum())
+    prob = np.zeros(n_alts, dtype=np.float64)
+    alias = np.empty(n_alts, dtype=np.int64)
+    small = np.empty(n_alts, dtype=np.int64)
+    large = np.empty(n_alts, dtype=np.int64)
+    n_small = 0
+    n_large = 0
+    for a in range(n_alts):
+        alias[a] = a
+        if scaled[a] < 1.0:
+            small[n_small] = a
+            n_small += 1
+        else:
+            large[n_large] = a
+            n_large += 1
+    while n_small > 0 and n_large > 0:
+        n_small -= 1
+        s = small[n_small]
+        n_large -= 1
+        g = large[n_large]
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] = (scaled[g] + scaled[s]) - 1.0
+        if scaled[g] < 1.0:
+            small[n_small] = g
+            n_small += 1
+        else:
+            large[n_large] = g
+            n_large += 1
+    biggest = np.argmax(weights)
+    while n_large > 0:
+        n_large -= 1
+        prob[large[n_large]] = 1.0
+    while n_small > 0:
+        # only left over due to the limits of numerical precision, but
+        # alternatives with zero weight must never be chosen
+        n_small -= 1
+        s = small[n_small]
+        if weights[s] > 0:
+            prob[s] = 1.0
+        else:
+            alias[s] = biggest
+    return prob, alias
+
+
+@njit(parallel=True)
+def alias_choices(prob, alias, random_array, out_choices=None):
+    """
+    Sample alternatives from an alias table, in constant time per sample.
+
+    Each random point in [0, 1) picks a column of the alias table from its
+    integer part when scaled by the number of alternatives, and the column
+    or its alias from the fractional part.
+
+    Parameters
+    ----------
+    prob : array of float, shape (n_alts,)
+    alias : array of int, shape (n_alts,)
+    random_array : array of float, shape (n_choosers, n_samples)
+    out_choices : array of int, shape (n_choosers, n_samples), optional
+
+    Returns
+    -------
+    out_choices : array of int, shape (n_choosers, n_samples)
+        Positions of the sampled alternatives.
+    """
+    n_choosers, sample_size = random_array.shape
+    n_alts = prob.shape[0]
+    if out_choices is None:
+        out_choices = np.empty((n_choosers, sample_size), dtype=np.int64)
+    for c in prange(n_choosers):
+        for s in range(sample_size):
+            x = random_array[c, s] * n_alts
+            col = min(int(x), n_alts - 1)
+            if x - col < prob[col]:
+                out_choices[c, s] = col
+            else:
+                out_choices[c, s] = alias[col]
+    return out_choices
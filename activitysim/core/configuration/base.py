@@ -4,6 +4,7 @@ from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, Literal, TypeVar, Union  # noqa: F401
 
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel as PydanticBase
 
@@ -211,6 +212,147 @@ class ComputeSettings(PydanticBase):
     protect_columns: list[str] = []
     """Protect these columns from being dropped from the chooser table."""
 
+    accumulate_utilities: bool = False
+    """Accumulate utilities as each spec expression is evaluated.
+
+    When evaluating utilities without sharrow, the default is to store the
+    values of every spec expression for every chooser, and then compute the
+    utilities with a single matrix multiplication against the coefficients.
+    When True, each expression value is instead multiplied into the utilities
+    as soon as it is computed and then discarded, so the peak memory for the
+    chunk is proportional to the number of alternatives instead of the number
+    of expressions.  Expression values are still kept for traced choosers,
+    and this setting is ignored in estimation mode and sharrow test mode,
+    which need all the expression values.
+
+    .. versionadded:: 1.3
+    """
+
+    sparse_availability: bool = False
+    """Only accumulate utilities for available alternatives.
+
+    When True (and `accumulate_utilities` is also set), spec rows whose non-zero
+    coefficients are all prohibitive (at or below -900, like the -999 terms that
+    mark alternatives unavailable) are evaluated first, and used to find which
+    alternatives are available to each chooser.  The remaining spec rows are
+    then only evaluated into the available (chooser, alternative) cells, which
+    saves a lot of work in models where most alternatives are unavailable to
+    most choosers, such as transit modes in mode choice.
+
+    The utilities of unavailable alternatives only include the prohibitive
+    terms, so they differ from the default method, but their probabilities are
+    zero either way.  Choosers with no available alternatives get their full
+    utilities.
+
+    .. versionadded:: 1.3
+    """
+
+    precision: Literal["float64", "float32"] = "float64"
+    """Floating point precision of utilities and probabilities.
+
+    With "float32", expression values, utilities, probabilities and logsums
+    are kept in single precision throughout simple and interaction simulation,
+    which halves the memory used by the largest arrays of each chunk (e.g. the
+    interaction utilities in destination choice), so the chunker can fit about
+    twice as many choosers in each chunk.
+
+    Single precision exponentials overflow for utilities above about 88, so
+    utilities are always shifted so the maximum utility of each chooser is zero
+    before they are exponentiated, unless zero probabilities are allowed, in
+    which case an error is raised if the utilities are too large.  Sums of
+    exponentiated utilities (for probabilities and logsums) are accumulated in
+    double precision in the fused logit kernels.
+
+    .. versionadded:: 1.3
+    """
+
+    fused_logit: bool = False
+    """Use a fused kernel to convert utilities to probabilities and choices.
+
+    When True, multinomial logit choices for this component are made with a
+    single parallel numba kernel that goes from utilities to probabilities,
+    logsums and choices in one pass per chooser, working in place on the
+    utilities array.  This avoids several full size temporary arrays for each
+    chunk, and gives the same choices as the default method.  Components that
+    use a custom chooser are not affected.
+
+    For nested logit models, the nest tree is flattened once per nest spec,
+    and leaf probabilities and root logsums are computed for all nest levels
+    in a single kernel, instead of building intermediate tables for each nest.
+
+    .. versionadded:: 1.3
+    """
+
+    @property
+    def float_dtype(self) -> np.dtype:
+        """The numpy dtype for utilities and probabilities, from `precision`."""
+        return np.dtype(self.precision)
+
+    keep_probabilities: bool = True
+    """Compute multinomial logit probabilities when making fused logit choices.
+
+    When False (and `fused_logit` is True), multinomial logit choices are drawn
+    directly from the utilities: each row's logsum is computed, and then the
+    cumulative probabilities are walked until they pass the random draw,
+    without ever writing a probabilities array.  The random draws and choices
+    are the same.  Probabilities are still computed for chunks with traced
+    choosers.
+
+    .. versionadded:: 1.3
+    """
+
+    factorize_interaction: bool = False
+    """Evaluate chooser-only and alternative-only interaction terms separately.
+
+    Interaction models evaluate every spec expression on the cross join of
+    choosers and alternatives.  When True, spec rows that are plain pandas
+    expressions of only chooser columns (or only alternative columns) are
+    instead evaluated once per chooser (or once per alternative), and added
+    to the utilities of the cross join at the end.  Only the remaining
+    interaction terms, including all "@" expressions and temps, are evaluated
+    on the cross join, which then only needs the columns those terms use.
+
+    This is ignored when tracing, in estimation mode, when logging alternative
+    losers, and when sharrow is enabled for the component.
+
+    .. versionadded:: 1.3
+    """
+
+    ragged_alternatives: bool = False
+    """Make interaction sample simulate choices without padding the utilities.
+
+    Choosers in interaction sample simulate can have different numbers of
+    alternatives (e.g. sampled destinations, or the time windows available
+    for each tour in scheduling models).  By default the utilities are padded
+    with unavailable alternatives to a table with one row per chooser and as
+    many columns as the largest alternative set in the chunk.  When True,
+    utilities stay in a flat array with offsets to each chooser's
+    alternatives, and logsums and choices are computed from it directly by a
+    parallel numba kernel, with the same random numbers and choices.
+
+    This is ignored when tracing.
+
+    .. versionadded:: 1.3
+    """
+
+    precompute_alternatives: bool = False
+    """Evaluate alternative-only interaction simulate terms once per alternative.
+
+    When True, interaction simulate finds the spec rows that only depend on
+    the alternatives (e.g. size terms or land use densities), including "@"
+    expressions that use `df` only for alternative columns and no skims.
+    These are evaluated once on the alternatives table before choosers are
+    chunked, and their utilities are gathered by alternative id into the
+    utilities of each chunk.  The remaining terms are evaluated as usual,
+    either on the cross join or in the sharrow flow, which then does not
+    include the alternative-only terms.
+
+    This is ignored when tracing, in estimation mode, and when logging
+    alternative losers.
+
+    .. versionadded:: 1.3
+    """
+
     def should_skip(self, subcomponent: str) -> bool:
         """Check if sharrow should be skipped for a particular subcomponent."""
         if isinstance(self.sharrow_skip, dict):
@@ -244,6 +386,14 @@ class ComputeSettings(PydanticBase):
             use_numba=self.use_numba,
             drop_unused_columns=self.drop_unused_columns,
             protect_columns=self.protect_columns,
+            accumulate_utilities=self.accumulate_utilities,
+            sparse_availability=self.sparse_availability,
+            precision=self.precision,
+            fused_logit=self.fused_logit,
+            keep_probabilities=self.keep_probabilities,
+            factorize_interaction=self.factorize_interaction,
+            ragged_alternatives=self.ragged_alternatives,
+            precompute_alternatives=self.precompute_alternatives,
         )
 
 
@@ -176,6 +176,24 @@ class TemplatedLogitComponentSettings(LogitComponentSettings, extra="forbid"):
     """
 
 
+class SamplePruningSettings(PydanticBase):
+    """
+    Pruning of the destinations evaluated in location sampling.
+    """
+
+    SKIM: str = "DIST"
+    """Name of the skim used to measure the impedance from each origin."""
+
+    COEFFICIENT: float
+    """Coefficient on the SKIM impedance, approximating the distance terms of the sample spec.
+
+    This is usually negative, so the destination weights decay with the impedance.
+    """
+
+    MASS: float = 0.999
+    """Fraction of the approximate probability mass that the candidate set must cover."""
+
+
 class LocationComponentSettings(BaseLogitComponentSettings):
     """
     Base configuration class for components that are location choice models.
@@ -187,6 +205,34 @@ class LocationComponentSettings(BaseLogitComponentSettings):
     SAMPLE_SIZE: int
     """This many candidate alternatives will be sampled for each choice."""
 
+    SAMPLE_PRUNING: SamplePruningSettings | None = None
+    """Only evaluate candidate destinations in alternative sampling.
+
+    When set, a candidate set of destinations is found for each origin zone,
+    with approximate weights of size term times the exponentiated SKIM impedance
+    times the COEFFICIENT: the highest weight destinations that together cover
+    MASS of the total weight.  The sample spec is then only evaluated for the
+    candidates of each chooser's origin, and other destinations are not sampled.
+    Candidate sets do not depend on shadow prices, so they are computed once per
+    origin zone and segment, and reused in later shadow pricing iterations.
+
+    .. versionadded:: 1.3
+    """
+
+    PRESAMPLE_SIZE_TERMS_ONLY: bool = False
+    """Presample zones using only their size terms.
+
+    In two- and three-zone models, destinations are first presampled at the
+    TAZ level with the SAMPLE_SPEC, which evaluates every TAZ for every chooser.
+    When True, the TAZ presample probabilities are instead proportional to the
+    TAZ size terms (including any shadow price adjustments), which are the same
+    for all choosers in a segment, so the TAZs are drawn from a single alias
+    table in constant time per sample.  The sample probabilities are kept for
+    the sampling correction in the simulation step, as usual.
+
+    .. versionadded:: 1.3
+    """
+
     LOGSUM_SETTINGS: Path
     """Settings for the logsum computation."""
 
@@ -204,6 +250,29 @@ class TourLocationComponentSettings(LocationComponentSettings, extra="forbid"):
     IN_PERIOD: int | dict[str, int] | None = None
     OUT_PERIOD: int | dict[str, int] | None = None
     LOGSUM_PREPROCESSOR: str = "preprocessor"
+    REUSE_LOGSUMS: bool = False
+    """Reuse sample logsums in later shadow pricing iterations.
+
+    Mode choice logsums for the sampled (chooser, destination) pairs don't depend
+    on shadow prices.  When True, they are kept for the duration of the location
+    choice model, and each shadow pricing iteration only runs the logsum model
+    for the pairs not already sampled in an earlier iteration.  The sample and
+    simulation steps are still run on every iteration with the updated shadow
+    prices.
+
+    .. versionadded:: 1.3
+    """
+
+    DEDUPE_LOGSUMS: bool = False
+    """Compute sample logsums once for each unique chooser and destination.
+
+    Many sampled (chooser, destination) pairs share the same origin, destination
+    and logsum chooser attributes (LOGSUM_CHOOSER_COLUMNS).  When True, the mode
+    choice logsum is only computed for the first of each set of identical rows,
+    and copied to the others.  Logsum specs must not depend on the chooser ids.
+
+    .. versionadded:: 1.3
+    """
 
     SEGMENTS: list[str] | None = None
     SIZE_TERM_SELECTOR: str | None = None
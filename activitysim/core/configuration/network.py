@@ -246,6 +246,46 @@ class NetworkSettings(PydanticReadable, extra="forbid"):
     runs.
     """
 
+    skim_cache_compression: Union[str, dict[str, Any]] = None
+    """Compress the skim cache with this numcodecs codec.
+
+    Give the name of a codec, like "zstd" or "lz4", or a numcodecs codec
+    config such as `{id: blosc, cname: zstd, clevel: 5, shuffle: 1}`.  When
+    set, the skim cache used by `read_skim_cache`, `write_skim_cache` and the
+    `MemMapSkimFactory` is compressed in chunks of origin rows, so that only
+    the chunks holding skim values that are looked up need be read and
+    decompressed.  A manifest next to the cache records the contents hash of
+    the omx files it was made from, and the cache is rebuilt (or ignored) if
+    they change.  This requires the optional `numcodecs` package.
+
+    .. versionadded:: 1.3
+    """
+
+    skim_read_processes: int = 1
+    """Number of processes reading omx skims into shared memory.
+
+    When more than 1, skims loaded into the shared memory skim buffers of
+    multiprocess runs are read by this many processes in parallel, each
+    reading a range of the skims of one omx file straight into the shared
+    buffer.  Skims loaded by a single process are read one at a time.
+
+    .. versionadded:: 1.3
+    """
+
+    sorted_skim_lookups: bool = False
+    """Gather skim values for large lookups in origin order.
+
+    Skim values are otherwise gathered in the order of the choosers, which
+    jumps randomly about the (very large) skim arrays and is bound by memory
+    bandwidth for trip level lookups in big zone systems.  When enabled, the
+    od pairs of large lookups are sorted by skim and origin zone first, so
+    that each origin row of each skim is read together, and the values are
+    then put back in chooser order.  This applies to both legacy skims and
+    sharrow skim datasets.
+
+    .. versionadded:: 1.3
+    """
+
     network_cache_dir: str = None
     """alternate dir to read/write cache files (defaults to output_dir)"""
 
@@ -293,10 +333,19 @@ class NetworkSettings(PydanticReadable, extra="forbid"):
     skim_dict_factory: Literal[
         "NumpyArraySkimFactory",
         "MemMapSkimFactory",
+        "LazySkimFactory",
     ] = "NumpyArraySkimFactory"
     """The skim dict factory to use.
 
     The MemMapSkimFactory is strictly experimental.
+
+    The LazySkimFactory reads each skim from the omx files on its first
+    lookup, and records the skims looked up by each model step in a skim
+    usage manifest in the cache directory.  Later runs read the skims in the
+    manifest up front.  It is not used for sharrow skims.
+
+    .. versionadded:: 1.3
+        LazySkimFactory
     """
 
     source_file_paths: list[Path] = None
@@ -687,6 +687,23 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     rng_base_seed: Union[int, None] = 0
     """Base seed for pseudo-random number generator."""
 
+    rng_counter_based: bool = False
+    """
+    Use counter-based (Philox) random number streams for channels.
+
+    .. versionadded:: 1.3
+
+    By default, the random number stream for each row of a channel (households,
+    persons, tours, etc.) is generated by reseeding a numpy `RandomState` for
+    every row and fast-forwarding it past the rands already consumed in the
+    current step. When this setting is True, rands are instead computed directly
+    from the Philox4x32 counter-based generator, keyed on the same per-row seed
+    and using the number of rands already consumed as the counter, so all rows
+    are generated in a single vectorized call.  Results remain fully repeatable
+    and independent of chunking or multiprocessing, but they are not the same
+    draws as the default streams, so model results will differ.
+    """
+
     duplicate_step_execution: Literal["error", "allow"] = "error"
     """
     How activitysim should handle attempts to re-run a step with the same name.
@@ -720,6 +737,35 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     .. versionadded:: 1.3
     """
 
+    logsum_cache_size: int = 0
+    """
+    Maximum number of mode choice logsums to keep in the shared logsum cache.
+
+    .. versionadded:: 1.3
+
+    Destination, scheduling and trip destination models all compute mode
+    choice logsums, often for the same origin, destination, time period and
+    chooser segment.  When this is greater than zero, logsums are cached on
+    the state, keyed by the logsum spec, coefficients, nest spec, constants and
+    skims, and by the values of the chooser columns the logsums depend on, so
+    repeated choosers (in the same or a later component) are not recomputed.
+    When the cache is full, logsums for the least recently used spec are
+    evicted first.  The default of zero disables the cache.  Components whose
+    compute settings keep unused chooser columns do not use the cache.
+    """
+
+    persist_logsum_cache: bool = False
+    """
+    Save the shared logsum cache in the cache directory after each step.
+
+    .. versionadded:: 1.3
+
+    When True (and `logsum_cache_size` is greater than zero), cached logsums
+    are written to the "logsums" subdirectory of the cache directory, and are
+    reloaded by later runs that use the same logsum specs, coefficients and
+    skim files.
+    """
+
     other_settings: dict[str, Any] = None
 
     def _get_attr(self, attr):
@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import contextlib
 import glob
+import hashlib
+import importlib
+import json
 import logging
 import os
+import sys
+import threading
 import time
 from datetime import timedelta
 from functools import partial
 from numbers import Number
+from pathlib import Path
 from stat import ST_MTIME
 
 import numpy as np
@@ -220,6 +226,179 @@ def should_invalidate_cache_file(cache_filename, *source_filenames):
     return False
 
 
+FLOW_CACHE_INDEX_FILE = "flow_index.json"
+
+# flow cache indexes, keyed by sharrow cache directory
+_FLOW_INDEXES = {}
+
+
+def config_fingerprint(state: workflow.State) -> str:
+    """
+    Hash the contents of the model config files.
+
+    Flows compiled for a model config are recorded in the flow cache index
+    under this fingerprint.  File contents (not modification times) are used,
+    so a config copied to another machine has the same fingerprint.
+    """
+    h = hashlib.sha256(f"activitysim {__version__}".encode())
+    if sh is not None:
+        h.update(f"sharrow {sh.__version__}".encode())
+    for configs_dir in state.filesystem.get_configs_dir():
+        for filename in sorted(Path(configs_dir).rglob("*")):
+            if filename.suffix.lower() in (".yaml", ".yml", ".csv"):
+                h.update(str(filename.relative_to(configs_dir)).encode())
+                h.update(filename.read_bytes())
+    return h.hexdigest()[:32]
+
+
+class FlowCacheIndex:
+    """
+    Inventory of the compiled sharrow flows in a sharrow cache directory.
+
+    Sharrow writes each flow as a package named `flow_<flow_hash>` in the
+    cache directory, and numba caches the compiled code alongside it.  This
+    index records, for each model config (see `config_fingerprint`), which
+    flows were set up by which step, so that the flows for a step can be
+    imported when the step starts (see `preload`), flows can be compiled
+    ahead of time (see the `activitysim flows` command), and the cache can be
+    checked before a run.
+
+    The index also counts, for the current process, the flows found in
+    memory, found compiled in the cache directory, or compiled fresh.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir.joinpath(FLOW_CACHE_INDEX_FILE)
+        self.configs: dict[str, dict[str, dict]] = {}
+        self.memory_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self.configs = json.load(f).get("configs", {})
+        except (OSError, ValueError):
+            logger.warning(f"ignoring unreadable flow cache index {self.path}")
+
+    def flow_is_compiled(self, flow_hash: str) -> bool:
+        """Check if the code for a flow exists in the cache directory."""
+        return self.cache_dir.joinpath(f"flow_{flow_hash}", "__init__.py").exists()
+
+    def flows(self, config_key: str, step_name: str | None = None) -> dict:
+        """
+        Get the flows recorded for a config, optionally only for one step.
+
+        Returns
+        -------
+        dict
+            Maps flow hashes to records with the step name and trace label.
+        """
+        flows = self.configs.get(config_key, {})
+        if step_name is not None:
+            flows = {k: v for k, v in flows.items() if v.get("step") == step_name}
+        return flows
+
+    def record(
+        self, config_key: str, flow_hash: str, step_name, trace_label, memory_hit
+    ):
+        """Record a flow used by a step, and count it as a hit or miss."""
+        with self._lock:
+            flows = self.configs.setdefault(config_key, {})
+            if memory_hit:
+                self.memory_hits += 1
+            elif flow_hash in flows and self.flow_is_compiled(flow_hash):
+                self.cache_hits += 1
+            else:
+                self.misses += 1
+            if flow_hash not in flows:
+                flows[flow_hash] = {
+                    "step": step_name,
+                    "trace_label": trace_label,
+                    "activitysim_version": __version__,
+                }
+                self._dirty = True
+
+    def preload(self, config_key: str, step_name: str) -> int:
+        """
+        Import the compiled flow packages recorded for a step.
+
+        Sharrow finds packages that are already imported, so this moves the
+        import of each flow (but not the data setup) to the start of the step.
+
+        Returns
+        -------
+        int
+            number of flow packages imported
+        """
+        n = 0
+        cache_dir = str(self.cache_dir.absolute())
+        for flow_hash in self.flows(config_key, step_name):
+            name = f"flow_{flow_hash}"
+            if name in sys.modules or not self.flow_is_compiled(flow_hash):
+                continue
+            sys.path.insert(0, cache_dir)
+            try:
+                importlib.import_module(name)
+                n += 1
+            except Exception as err:
+                logger.warning(f"unable to preload flow {name}: {err}")
+            finally:
+                sys.path.remove(cache_dir)
+        if n:
+            logger.info(f"preloaded {n} compiled flows for {step_name}")
+        return n
+
+    def save(self):
+        """Write the index, merging flows recorded by other processes."""
+        with self._lock:
+            if not self._dirty:
+                return
+            configs = self.configs
+            self.configs = {}
+            self._load()
+            for config_key, flows in configs.items():
+                self.configs.setdefault(config_key, {}).update(flows)
+            temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, "w") as f:
+                json.dump({"configs": self.configs}, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+
+    def report(self, log=logger, level=logging.INFO):
+        """Log the hit and miss counts of flows in this process."""
+        log.log(
+            level,
+            f"sharrow flows: {self.memory_hits} found in memory, "
+            f"{self.cache_hits} found compiled in {self.cache_dir}, "
+            f"{self.misses} new",
+        )
+
+
+def flow_config_key(state: workflow.State) -> str:
+    """Get the config fingerprint of a state, computing it once."""
+    key = state.get("flow_config_key", None)
+    if key is None:
+        key = config_fingerprint(state)
+        state.set("flow_config_key", key)
+    return key
+
+
+def flow_cache_index(state: workflow.State) -> FlowCacheIndex:
+    """Get the flow cache index for the sharrow cache directory of a state."""
+    cache_dir = state.filesystem.get_sharrow_cache_dir()
+    index = _FLOW_INDEXES.get(cache_dir)
+    if index is None:
+        index = _FLOW_INDEXES[cache_dir] = FlowCacheIndex(cache_dir)
+    return index
+
+
 def scan_for_unused_names(state: workflow.State, tokens):
     """
     Scan all spec files to find unused skim variable names.
@@ -258,7 +437,10 @@ def scan_for_unused_names(state: workflow.State, tokens):
 def skim_dataset_dict(state: workflow.State, skim_dataset):
     from .skim_dataset import SkimDataset
 
-    return SkimDataset(skim_dataset)
+    network_los = state.get_injectable("network_los")
+    return SkimDataset(
+        skim_dataset, sorted_lookups=network_los.setting("sorted_skim_lookups", False)
+    )
 
 
 def skims_mapping(
@@ -702,7 +884,8 @@ def new_flow(
         extra_hash_data = ()
         if zone_layer:
             extra_hash_data += (zone_layer,)
-        return flow_tree.setup_flow(
+        n_flows = len(_FLOWS)
+        flow = flow_tree.setup_flow(
             defs,
             cache_dir=cache_dir,
             readme=readme[1:],  # remove leading newline
@@ -712,6 +895,14 @@ def new_flow(
             boundscheck=False,
             fastmath=compute_settings.fastmath,
         )
+        flow_cache_index(state).record(
+            flow_config_key(state),
+            flow.flow_hash,
+            state.current_model_name,
+            trace_label,
+            memory_hit=len(_FLOWS) == n_flows,
+        )
+        return flow
 
 
 def size_terms_on_flow(locals_d):
@@ -120,6 +120,40 @@ def make_sample_choices(
     return choices_df
 
 
+def candidate_interaction_dataset(
+    choosers, alternatives, chooser_pos, alt_pos, chooser_index_id=None
+):
+    """
+    Interaction dataset with only the candidate alternatives of each chooser.
+
+    Like `logit.interaction_dataset`, but instead of the full cross join, there is
+    one row for each (chooser, alternative) pair given by the positions, which
+    should be grouped by chooser, as returned by `np.nonzero` on a mask.
+
+    Parameters
+    ----------
+    choosers : pandas.DataFrame
+    alternatives : pandas.DataFrame
+    chooser_pos, alt_pos : array of int
+        positions of the choosers and alternatives of each row
+    chooser_index_id : str, optional
+        name of a column to add with the chooser index values
+
+    Returns
+    -------
+    interaction_df : pandas.DataFrame
+        index values (non-unique) are index values from alternatives df
+    """
+    interaction_df = alternatives.take(alt_pos).copy()
+    for c in choosers.columns:
+        c_chooser = (c + "_chooser") if c in interaction_df.columns else c
+        interaction_df[c_chooser] = choosers[c].values[chooser_pos]
+    if chooser_index_id:
+        assert chooser_index_id not in interaction_df
+        interaction_df[chooser_index_id] = choosers.index.values[chooser_pos]
+    return interaction_df
+
+
 def _interaction_sample(
     state: workflow.State,
     choosers,
@@ -135,6 +169,8 @@ def _interaction_sample(
     zone_layer=None,
     chunk_sizer=None,
     compute_settings: ComputeSettings | None = None,
+    candidates=None,
+    fixed_utilities=None,
 ):
     """
     Run a MNL simulation in the situation in which alternatives must
@@ -245,6 +281,20 @@ def _interaction_sample(
     if compute_settings is None:
         compute_settings = ComputeSettings()
 
+    if candidates is not None and (have_trace_targets or sample_size == 0):
+        # tracing and unsampled alternatives need the full cross join
+        candidates = None
+    candidate_mask = None
+    if candidates is not None:
+        # boolean mask with one row per chooser and one column per alternative,
+        # only candidate alternatives are evaluated, the others are unavailable
+        candidates = candidates.loc[choosers[candidates.index.name]]
+        assert (candidates.columns == alternatives.index).all()
+        candidate_mask = candidates.values
+        del candidates
+        chunk_sizer.log_df(trace_label, "candidate_mask", candidate_mask)
+        sharrow_enabled = False
+
     # drop variables before the interaction dataframe is created
 
     # check if tracing is enabled and if we have trace targets
@@ -293,17 +343,79 @@ def _interaction_sample(
                 trace_eval_results,
             )
     if not sharrow_enabled or (sharrow_enabled == "test"):
-        interaction_df = logit.interaction_dataset(
-            state,
-            choosers,
-            alternatives,
-            sample_size=alternative_count,
-            chooser_index_id=chooser_index_id,
+        factorize = (
+            compute_settings.factorize_interaction
+            and not sharrow_enabled
+            and not have_trace_targets
+            and not log_alt_losers
         )
+        if factorize:
+            # chooser-only and alternative-only terms are evaluated on the
+            # (much smaller) choosers and alternatives tables, and only the
+            # remaining interaction terms are evaluated on the cross join
+            (
+                chooser_spec,
+                alternative_spec,
+                interaction_spec,
+            ) = interaction_simulate.factorize_spec(
+                spec, choosers, alternatives, locals_d
+            )
+            (
+                chooser_utilities,
+                alternative_utilities,
+            ) = interaction_simulate.eval_factorized_utilities(
+                state,
+                chooser_spec,
+                alternative_spec,
+                choosers,
+                alternatives,
+                locals_d,
+                trace_label,
+                compute_settings=compute_settings,
+            )
+            if compute_settings.drop_unused_columns:
+                # the cross join only needs the columns of the interaction terms
+                choosers = util.drop_unused_columns(
+                    choosers,
+                    interaction_spec,
+                    locals_d,
+                    custom_chooser=None,
+                    additional_columns=compute_settings.protect_columns,
+                )
+                alternatives = util.drop_unused_columns(
+                    alternatives,
+                    interaction_spec,
+                    locals_d,
+                    custom_chooser=None,
+                    additional_columns=["tdd", alternatives.index.name]
+                    + compute_settings.protect_columns,
+                )
+        else:
+            interaction_spec = spec
+
+        if candidate_mask is not None:
+            chooser_pos, alt_pos = np.nonzero(candidate_mask)
+            interaction_df = candidate_interaction_dataset(
+                choosers,
+                alternatives,
+                chooser_pos,
+                alt_pos,
+                chooser_index_id=chooser_index_id,
+            )
+        else:
+            interaction_df = logit.interaction_dataset(
+                state,
+                choosers,
+                alternatives,
+                sample_size=alternative_count,
+                chooser_index_id=chooser_index_id,
+            )
 
         chunk_sizer.log_df(trace_label, "interaction_df", interaction_df)
 
-        assert alternative_count == len(interaction_df.index) / len(choosers.index)
+        assert candidate_mask is not None or (
+            alternative_count == len(interaction_df.index) / len(choosers.index)
+        )
 
         if skims is not None:
             simulate.set_skim_wrapper_targets(interaction_df, skims)
@@ -333,7 +445,7 @@ def _interaction_sample(
             trace_eval_results,
         ) = interaction_simulate.eval_interaction_utilities(
             state,
-            spec,
+            interaction_spec,
             interaction_df,
             locals_d,
             trace_label,
@@ -343,6 +455,15 @@ def _interaction_sample(
             zone_layer=zone_layer,
             compute_settings=ComputeSettings(sharrow_skip=True),
         )
+        if factorize and candidate_mask is not None:
+            interaction_utilities["utility"] += (
+                chooser_utilities[chooser_pos] + alternative_utilities.values[alt_pos]
+            )
+        elif factorize:
+            # broadcast the chooser and alternative terms only at the final sum
+            interaction_utilities["utility"] += np.repeat(
+                chooser_utilities, alternative_count
+            ) + np.tile(alternative_utilities.values, num_choosers)
         chunk_sizer.log_df(trace_label, "interaction_utilities", interaction_utilities)
 
         # ########### HWM - high water mark (point of max observed memory usage)
@@ -424,10 +545,29 @@ def _interaction_sample(
 
     # reshape utilities (one utility column and one row per row in interaction_utilities)
     # to a dataframe with one row per chooser and one column per alternative
-    utilities = pd.DataFrame(
-        interaction_utilities.values.reshape(len(choosers), alternative_count),
-        index=choosers.index,
-    )
+    if candidate_mask is not None:
+        # alternatives that are not candidates are unavailable
+        utilities_arr = np.full(
+            candidate_mask.shape, -np.inf, dtype=interaction_utilities.utility.dtype
+        )
+        utilities_arr[chooser_pos, alt_pos] = interaction_utilities.utility.values
+        utilities = pd.DataFrame(utilities_arr, index=choosers.index)
+        del utilities_arr
+    else:
+        utilities = pd.DataFrame(
+            interaction_utilities.values.reshape(len(choosers), alternative_count),
+            index=choosers.index,
+        )
+    if fixed_utilities is not None:
+        # add the terms the caller evaluated (and may reuse) outside the spec
+        fixed_rows, fixed_table = fixed_utilities
+        chooser_fixed_utilities = fixed_table[
+            fixed_rows.reindex(choosers.index).to_numpy()
+        ]
+        chunk_sizer.log_df(trace_label, "fixed_utilities", chooser_fixed_utilities)
+        utilities += chooser_fixed_utilities
+        del chooser_fixed_utilities
+        chunk_sizer.log_df(trace_label, "fixed_utilities", None)
     chunk_sizer.log_df(trace_label, "utilities", utilities)
 
     del interaction_utilities
@@ -546,6 +686,104 @@ def _interaction_sample(
     return choices_df
 
 
+def alias_sample(
+    state: workflow.State,
+    choosers: pd.DataFrame,
+    alternatives: pd.DataFrame,
+    weights,
+    sample_size: int,
+    alt_col_name: str,
+    trace_label: str | None = None,
+):
+    """
+    Sample alternatives with probabilities that are the same for every chooser.
+
+    This is a fast alternative to `interaction_sample` when the sample probabilities
+    do not depend on the chooser, e.g. when destinations are presampled using only
+    their size terms.  An alias table is built once from the weights, after which
+    each sample costs constant time, instead of time proportional to the number of
+    alternatives for every chooser.  The sample probabilities are recorded in the
+    result, so the sampling correction in the subsequent simulation is unchanged.
+
+    Parameters
+    ----------
+    state : State
+    choosers : pandas.DataFrame
+    alternatives : pandas.DataFrame
+        DataFrame of alternatives, with the alt ids in the index
+    weights : array-like
+        Non-negative weights for the alternatives, proportional to their
+        sample probabilities, in the same order as alternatives.
+    sample_size : int
+        number of samples for each chooser
+    alt_col_name: str
+        name to give the sampled_alternative column
+    trace_label: str
+
+    Returns
+    -------
+    choices_df : pandas.DataFrame
+        Like the result of `interaction_sample`, indexed by the choosers index
+        and with columns alt_col_name, prob, pick_count
+    """
+    from .choosing import alias_choices, alias_table
+
+    trace_label = tracing.extend_trace_label(trace_label, "alias_sample")
+
+    assert alt_col_name is not None
+    assert sample_size > 0
+
+    weights = np.asarray(weights, dtype=np.float64)
+    assert weights.shape == (len(alternatives),)
+    total = weights.sum()
+    if not total > 0:
+        raise RuntimeError(f"{trace_label}: no alternatives with positive weights")
+
+    logger.info(
+        "%s sampling %d of %d alternatives for %d choosers"
+        % (trace_label, sample_size, len(alternatives), len(choosers))
+    )
+
+    prob, alias = alias_table(weights)
+
+    # get sample_size rands for each chooser
+    rands = state.get_rn_generator().random_for_df(choosers, n=sample_size)
+    positions = alias_choices(prob, alias, rands)
+
+    chooser_id_col = choosers.index.name
+    choices_df = pd.DataFrame(
+        {
+            chooser_id_col: np.repeat(np.asanyarray(choosers.index), sample_size),
+            alt_col_name: alternatives.index.values[positions.ravel()],
+        }
+    )
+    choices_df = (
+        choices_df.groupby([chooser_id_col, alt_col_name])
+        .size()
+        .rename("pick_count")
+        .reset_index(level=alt_col_name)
+    )
+    choices_df.insert(
+        1,
+        "prob",
+        (weights / total)[alternatives.index.get_indexer(choices_df[alt_col_name])],
+    )
+
+    if state.tracing.has_trace_targets(choosers):
+        state.tracing.trace_df(
+            choices_df,
+            tracing.extend_trace_label(trace_label, "sampled_alternatives"),
+            transpose=False,
+            column_labels=["sample_alt", "alternative"],
+        )
+
+    # - NARROW
+    choices_df["prob"] = choices_df["prob"].astype(np.float32)
+    choices_df["pick_count"] = choices_df["pick_count"].astype(np.uint32)
+
+    return choices_df
+
+
 def interaction_sample(
     state: workflow.State,
     choosers: pd.DataFrame,
@@ -563,6 +801,8 @@ def interaction_sample(
     zone_layer: str | None = None,
     explicit_chunk_size: float = 0,
     compute_settings: ComputeSettings | None = None,
+    candidates: pd.DataFrame | None = None,
+    fixed_utilities: tuple[pd.Series, np.ndarray] | None = None,
 ):
     """
     Run a simulation in the situation in which alternatives must
@@ -611,6 +851,19 @@ def interaction_sample(
     explicit_chunk_size : float, optional
         If > 0, specifies the chunk size to use when chunking the interaction
         simulation. If < 1, specifies the fraction of the total number of choosers.
+    compute_settings : ComputeSettings, optional
+        Settings to use if compiling with sharrow
+    candidates : pandas.DataFrame, optional
+        Boolean DataFrame with one column per alternative (in the same order as
+        alternatives), indexed by the values of the choosers column named by its
+        index name (e.g. the origin zone).  If given, utilities are only evaluated
+        for the candidate alternatives of each chooser, and the others can not be
+        sampled.  Ignored when tracing or when sample_size is 0.
+    fixed_utilities : tuple of (pandas.Series, numpy.ndarray), optional
+        Utilities of terms evaluated by the caller instead of in spec, as a
+        table with one row per distinct set of terms and one column per
+        alternative, and a Series indexed like choosers giving the row of
+        the table to add to the utilities of each chooser.
 
     Returns
     -------
@@ -664,6 +917,8 @@ def interaction_sample(
             zone_layer=zone_layer,
             chunk_sizer=chunk_sizer,
             compute_settings=compute_settings,
+            candidates=candidates,
+            fixed_utilities=fixed_utilities,
         )
 
         if choices.shape[0] > 0:
@@ -237,6 +237,49 @@ def _interaction_sample_simulate(
             transpose=False,
         )
 
+    if compute_settings.ragged_alternatives and not have_trace_targets:
+        # make choices directly from the sparse utilities, without padding
+        sample_counts = (
+            interaction_utilities.groupby(interaction_utilities.index).size().values
+        )
+        offsets = np.zeros(len(sample_counts) + 1, dtype=np.int64)
+        np.cumsum(sample_counts, out=offsets[1:])
+        del sample_counts
+
+        positions, rands, logsums, zero_probs = logit.ragged_to_choices(
+            state,
+            interaction_utilities.utility.to_numpy(),
+            offsets,
+            choosers,
+            allow_zero_probs=allow_zero_probs,
+            trace_label=trace_label,
+            want_choices=not skip_choice,
+        )
+        chunk_sizer.log_df(trace_label, "logsums", logsums)
+
+        del interaction_utilities
+        chunk_sizer.log_df(trace_label, "interaction_utilities", None)
+
+        if skip_choice:
+            return choosers.join(logsums.to_frame("logsums"))
+
+        choices = alternatives[choice_column].take(positions + offsets[:-1])
+        choices = pd.Series(choices.to_numpy(), index=choosers.index)
+
+        if allow_zero_probs and zero_probs.any() and zero_prob_choice_val is not None:
+            choices.loc[zero_probs] = zero_prob_choice_val
+
+        if want_logsums:
+            choices = choices.to_frame("choice")
+            choices["logsum"] = logsums
+
+        chunk_sizer.log_df(trace_label, "choices", choices)
+
+        # handing this off to our caller
+        chunk_sizer.log_df(trace_label, "choices", None)
+
+        return choices
+
     # reshape utilities (one utility column and one row per row in model_design)
     # to a dataframe with one row per chooser and one column per alternative
     # interaction_utilities is sparse because duplicate sampled alternatives were dropped
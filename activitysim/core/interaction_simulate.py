@@ -12,7 +12,7 @@ from typing import Mapping
 import numpy as np
 import pandas as pd
 
-from activitysim.core import chunk, logit, simulate, tracing, util, workflow
+from activitysim.core import assign, chunk, logit, simulate, tracing, util, workflow
 from activitysim.core.configuration.base import ComputeSettings
 
 logger = logging.getLogger(__name__)
@@ -228,7 +228,10 @@ def eval_interaction_utilities(
             # need to be able to identify which variables causes an error, which keeps
             # this from being expressed more parsimoniously
 
-            utilities = pd.DataFrame({"utility": 0.0}, index=df.index)
+            float_dtype = compute_settings.float_dtype
+            utilities = pd.DataFrame(
+                {"utility": np.zeros(len(df), dtype=float_dtype)}, index=df.index
+            )
 
             chunk_sizer.log_df(trace_label, "eval.utilities", utilities)
 
@@ -269,7 +272,13 @@ def eval_interaction_utilities(
                         if expr.startswith("_"):
                             target = expr[: expr.index("@")]
                             rhs = expr[expr.index("@") + 1 :]
-                            v = to_series(eval(rhs, globals(), locals_d))
+                            v = to_series(
+                                eval(
+                                    assign.compile_expression(rhs),
+                                    globals(),
+                                    locals_d,
+                                )
+                            )
 
                             # update locals to allows us to ref previously assigned targets
                             locals_d[target] = v
@@ -285,9 +294,17 @@ def eval_interaction_utilities(
                             continue
 
                         if expr.startswith("@"):
-                            v = to_series(eval(expr[1:], globals(), locals_d))
+                            v = to_series(
+                                eval(
+                                    assign.compile_expression(expr[1:]),
+                                    globals(),
+                                    locals_d,
+                                )
+                            )
                         else:
-                            v = df.eval(expr, resolvers=[locals_d])
+                            v = assign.eval_df_expression(
+                                df, expr, resolvers=[locals_d]
+                            )
 
                         if check_for_variability and v.std() == 0:
                             logger.info(
@@ -314,7 +331,7 @@ def eval_interaction_utilities(
                                 value=v.values if isinstance(v, pd.Series) else v,
                             )
 
-                        utility = (v * coefficient).astype("float")
+                        utility = (v * coefficient).astype(float_dtype)
 
                         if log_alt_losers:
                             assert ALT_CHOOSER_ID in df
@@ -548,15 +565,29 @@ def eval_interaction_utilities(
                             if expr.startswith("_"):
                                 target = expr[: expr.index("@")]
                                 rhs = expr[expr.index("@") + 1 :]
-                                v = to_series(eval(rhs, globals(), locals_d))
+                                v = to_series(
+                                    eval(
+                                        assign.compile_expression(rhs),
+                                        globals(),
+                                        locals_d,
+                                    )
+                                )
                                 locals_d[target] = v
                                 if trace_eval_results is not None:
                                     trace_eval_results[expr] = v.iloc[re_trace]
                                 continue
                             if expr.startswith("@"):
-                                v = to_series(eval(expr[1:], globals(), locals_d))
+                                v = to_series(
+                                    eval(
+                                        assign.compile_expression(expr[1:]),
+                                        globals(),
+                                        locals_d,
+                                    )
+                                )
                             else:
-                                v = df.eval(expr, resolvers=[locals_d])
+                                v = assign.eval_df_expression(
+                                    df, expr, resolvers=[locals_d]
+                                )
                             if check_for_variability and v.std() == 0:
                                 logger.info(
                                     "%s: no variability (%s) in: %s"
@@ -622,6 +653,218 @@ def eval_interaction_utilities(
     return utilities, trace_eval_results
 
 
+EXPRESSION_KEYWORDS = {"and", "or", "not", "in", "is", "True", "False", "None"}
+
+
+def factorize_spec(spec, choosers, alternatives, locals_d=None):
+    """
+    Split an interaction spec into chooser-only, alternative-only and interaction terms.
+
+    A spec row is chooser-only (or alternative-only) if it is a plain pandas
+    expression whose variables are all columns of the choosers (or alternatives),
+    scalar constants from locals_d, or keywords.  Chooser columns that are also
+    alternative columns are renamed in the interaction dataset, so they are never
+    chooser-only.  Anything else, including "@" expressions and temps, is
+    conservatively treated as an interaction term.
+
+    Parameters
+    ----------
+    spec : pandas.DataFrame
+        one row per spec expression and one col with utility coefficient
+    choosers : pandas.DataFrame
+    alternatives : pandas.DataFrame
+    locals_d : Dict, optional
+
+    Returns
+    -------
+    chooser_spec, alternative_spec, interaction_spec : pandas.DataFrame
+        row subsets of spec
+    """
+    import re
+
+    pattern = r"[a-zA-Z_][a-zA-Z0-9_]*"
+
+    constants = {
+        k for k, v in (locals_d or {}).items() if np.isscalar(v) and not callable(v)
+    }
+    alternative_columns = set(alternatives.columns)
+    chooser_columns = set(choosers.columns) - alternative_columns
+
+    if isinstance(spec.index, pd.MultiIndex):
+        exprs = spec.index.get_level_values(simulate.SPEC_EXPRESSION_NAME)
+    else:
+        exprs = spec.index
+
+    side = np.zeros(len(spec), dtype=np.int8)  # 0: interaction, 1: chooser, 2: alt
+    for n, expr in enumerate(exprs):
+        if expr.startswith("_") or expr.startswith("@"):
+            continue
+        variables = set(re.findall(pattern, expr)) - EXPRESSION_KEYWORDS - constants
+        if not variables:
+            continue
+        if variables <= chooser_columns:
+            side[n] = 1
+        elif variables <= alternative_columns:
+            side[n] = 2
+
+    return spec[side == 1], spec[side == 2], spec[side == 0]
+
+
+def eval_factorized_utilities(
+    state,
+    chooser_spec,
+    alternative_spec,
+    choosers,
+    alternatives,
+    locals_d,
+    trace_label,
+    compute_settings: ComputeSettings | None = None,
+):
+    """
+    Evaluate the chooser-only and alternative-only terms of a factorized spec.
+
+    Each of these terms is evaluated once per chooser or once per alternative,
+    instead of once per row of the interaction dataset.  The results are
+    broadcast into the interaction utilities by the caller.
+
+    Returns
+    -------
+    chooser_utilities : numpy.ndarray
+        one utility per chooser, in the order of choosers
+    alternative_utilities : pandas.Series
+        one utility per alternative, indexed like alternatives
+    """
+    if compute_settings is None:
+        compute_settings = ComputeSettings()
+    compute_settings = compute_settings.model_copy(update={"sharrow_skip": True})
+
+    chooser_utilities, _ = eval_interaction_utilities(
+        state,
+        chooser_spec,
+        choosers,
+        locals_d,
+        tracing.extend_trace_label(trace_label, "choosers"),
+        None,
+        compute_settings=compute_settings,
+    )
+    alternative_utilities, _ = eval_interaction_utilities(
+        state,
+        alternative_spec,
+        alternatives,
+        locals_d,
+        tracing.extend_trace_label(trace_label, "alternatives"),
+        None,
+        compute_settings=compute_settings,
+    )
+    return chooser_utilities.utility.values, alternative_utilities.utility
+
+
+def _is_skim_wrapper(value):
+    """Check if a locals value looks up skims (and so depends on choosers)."""
+    if isinstance(value, dict):
+        return any(_is_skim_wrapper(v) for v in value.values())
+    if isinstance(value, list | tuple):
+        return any(_is_skim_wrapper(v) for v in value)
+    return hasattr(value, "set_df")
+
+
+def split_alternative_spec(spec, choosers, alternatives, locals_d=None):
+    """
+    Split an interaction spec into alternative-only terms and the remaining terms.
+
+    Plain pandas expressions are alternative-only if all their variables are
+    alternative columns or scalar constants (as in `factorize_spec`).  "@"
+    expressions are alternative-only if they use `df` only to get alternative
+    columns (as `df.name` or `df['name']`), and their other names are all
+    locals (other than skim wrappers) or globals available to expressions.
+    Chooser columns that are also alternative columns are renamed in the
+    interaction dataset, so alternative columns always refer to alternatives.
+    Temps, and anything that uses them, are never alternative-only.
+
+    Parameters
+    ----------
+    spec : pandas.DataFrame
+        one row per spec expression and one col with utility coefficient
+    choosers : pandas.DataFrame
+    alternatives : pandas.DataFrame
+    locals_d : Dict, optional
+
+    Returns
+    -------
+    alternative_spec, remaining_spec : pandas.DataFrame
+        row subsets of spec
+    """
+    import builtins
+    import re
+
+    locals_d = locals_d or {}
+    _, alternative_spec, _ = factorize_spec(spec, choosers, alternatives, locals_d)
+    alternative_columns = set(alternatives.columns)
+    known_names = (
+        {k for k, v in locals_d.items() if not _is_skim_wrapper(v)}
+        | set(globals())
+        | set(dir(builtins))
+        | EXPRESSION_KEYWORDS
+    )
+    df_access = r"\bdf(?:\.([a-zA-Z_][a-zA-Z0-9_]*)|\[\s*['\"]([^'\"]+)['\"]\s*\])"
+    free_name = r"(?<![\w.])[a-zA-Z_][a-zA-Z0-9_]*"
+
+    if isinstance(spec.index, pd.MultiIndex):
+        exprs = spec.index.get_level_values(simulate.SPEC_EXPRESSION_NAME)
+    else:
+        exprs = spec.index
+
+    is_alternative = spec.index.isin(alternative_spec.index)
+    for n, expr in enumerate(exprs):
+        if not expr.startswith("@"):
+            continue
+        # ignore comments, including sharrow versions of the expression
+        expr = expr[1:].split("#")[0]
+        columns = {a or b for a, b in re.findall(df_access, expr)}
+        rest = re.sub(r"'[^']*'|\"[^\"]*\"", "", re.sub(df_access, "", expr))
+        names = set(re.findall(free_name, rest))
+        is_alternative[n] = (
+            len(columns) > 0
+            and columns <= alternative_columns
+            and "df" not in names
+            and names <= known_names
+        )
+
+    return spec[is_alternative], spec[~is_alternative]
+
+
+def eval_alternative_utilities(
+    state,
+    alternative_spec,
+    alternatives,
+    locals_d,
+    trace_label,
+    compute_settings: ComputeSettings | None = None,
+):
+    """
+    Evaluate the alternative-only terms of a spec once per alternative.
+
+    Returns
+    -------
+    alternative_utilities : pandas.Series
+        one utility per alternative, indexed like alternatives
+    """
+    if compute_settings is None:
+        compute_settings = ComputeSettings()
+    compute_settings = compute_settings.model_copy(update={"sharrow_skip": True})
+
+    alternative_utilities, _ = eval_interaction_utilities(
+        state,
+        alternative_spec,
+        alternatives,
+        locals_d,
+        tracing.extend_trace_label(trace_label, "alternatives"),
+        None,
+        compute_settings=compute_settings,
+    )
+    return alternative_utilities.utility
+
+
 def _interaction_simulate(
     state: workflow.State,
     choosers: pd.DataFrame,
@@ -636,6 +879,7 @@ def _interaction_simulate(
     estimator=None,
     chunk_sizer=None,
     compute_settings: ComputeSettings | None = None,
+    precomputed_alternative_utilities: pd.Series | None = None,
 ):
     """
     Run a MNL simulation in the situation in which alternatives must
@@ -644,6 +888,10 @@ def _interaction_simulate(
 
     Parameters are same as for public function interaction_simulate
 
+    precomputed_alternative_utilities : series, optional
+        utilities of alternative-only terms that were removed from spec,
+        indexed like alternatives
+
     spec : dataframe
         one row per spec expression and one col with utility coefficient
 
@@ -799,6 +1047,33 @@ def _interaction_simulate(
         or (sharrow_enabled == "test")
         or interaction_utilities is None
     ):
+        factorize = (
+            compute_settings.factorize_interaction
+            and not sharrow_enabled
+            and not have_trace_targets
+            and estimator is None
+            and not log_alt_losers
+        )
+        if factorize:
+            # chooser-only and alternative-only terms are evaluated on the
+            # (much smaller) choosers and alternatives tables, and only the
+            # remaining interaction terms are evaluated on the cross join
+            chooser_spec, alternative_spec, interaction_spec = factorize_spec(
+                spec, choosers, alternatives, locals_d
+            )
+            chooser_utilities, alternative_utilities = eval_factorized_utilities(
+                state,
+                chooser_spec,
+                alternative_spec,
+                choosers,
+                alternatives,
+                locals_d,
+                trace_label,
+                compute_settings=compute_settings,
+            )
+        else:
+            interaction_spec = spec
+
         interaction_df = logit.interaction_dataset(
             state,
             choosers,
@@ -833,7 +1108,7 @@ def _interaction_simulate(
 
         interaction_utilities, trace_eval_results = eval_interaction_utilities(
             state,
-            spec,
+            interaction_spec,
             interaction_df,
             locals_d,
             trace_label,
@@ -842,6 +1117,13 @@ def _interaction_simulate(
             log_alt_losers=log_alt_losers,
             compute_settings=compute_settings,
         )
+        if factorize:
+            # broadcast the chooser and alternative terms only at the final sum
+            interaction_utilities["utility"] += np.repeat(
+                chooser_utilities, sample_size
+            ) + alternative_utilities.reindex(interaction_df.index).values.astype(
+                interaction_utilities.utility.dtype
+            )
         chunk_sizer.log_df(trace_label, "interaction_utilities", interaction_utilities)
         # mem.trace_memory_info(f"{trace_label}.init interaction_utilities", force_garbage_collect=True)
 
@@ -865,6 +1147,13 @@ def _interaction_simulate(
                 transpose=False,
             )
 
+    if precomputed_alternative_utilities is not None:
+        # gather the precomputed alternative-only terms by alternative id
+        interaction_utilities["utility"] += precomputed_alternative_utilities.reindex(
+            interaction_utilities.index
+        ).values.astype(interaction_utilities.utility.dtype)
+        chunk_sizer.log_df(trace_label, "interaction_utilities", interaction_utilities)
+
     # reshape utilities (one utility column and one row per row in model_design)
     # to a dataframe with one row per chooser and one column per alternative
     utilities = pd.DataFrame(
@@ -882,29 +1171,51 @@ def _interaction_simulate(
 
     state.tracing.dump_df(DUMP, utilities, trace_label, "utilities")
 
-    # convert to probabilities (utilities exponentiated and normalized to probs)
-    # probs is same shape as utilities, one row per chooser and one column for alternative
-    probs = logit.utils_to_probs(
-        state, utilities, trace_label=trace_label, trace_choosers=choosers
-    )
-    chunk_sizer.log_df(trace_label, "probs", probs)
+    if compute_settings.fused_logit:
+        # probs, logsums and choices in a single pass, overwriting utilities in place
+        positions, rands, probs, _ = logit.utils_to_choices(
+            state,
+            utilities,
+            trace_label=trace_label,
+            trace_choosers=choosers,
+            in_place=True,
+            want_probs=compute_settings.keep_probabilities or have_trace_targets,
+        )
+        chunk_sizer.log_df(trace_label, "probs", probs)
 
-    del utilities
-    chunk_sizer.log_df(trace_label, "utilities", None)
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
 
-    if have_trace_targets:
-        state.tracing.trace_df(
-            probs,
-            tracing.extend_trace_label(trace_label, "probs"),
-            column_labels=["alternative", "probability"],
+        if have_trace_targets:
+            state.tracing.trace_df(
+                probs,
+                tracing.extend_trace_label(trace_label, "probs"),
+                column_labels=["alternative", "probability"],
+            )
+    else:
+        # convert to probabilities (utilities exponentiated and normalized to probs)
+        # probs is same shape as utilities, one row per chooser and one column for alternative
+        probs = logit.utils_to_probs(
+            state, utilities, trace_label=trace_label, trace_choosers=choosers
         )
+        chunk_sizer.log_df(trace_label, "probs", probs)
 
-    # make choices
-    # positions is series with the chosen alternative represented as a column index in probs
-    # which is an integer between zero and num alternatives in the alternative sample
-    positions, rands = logit.make_choices(
-        state, probs, trace_label=trace_label, trace_choosers=choosers
-    )
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+
+        if have_trace_targets:
+            state.tracing.trace_df(
+                probs,
+                tracing.extend_trace_label(trace_label, "probs"),
+                column_labels=["alternative", "probability"],
+            )
+
+        # make choices
+        # positions is series with the chosen alternative represented as a column index in probs
+        # which is an integer between zero and num alternatives in the alternative sample
+        positions, rands = logit.make_choices(
+            state, probs, trace_label=trace_label, trace_choosers=choosers
+        )
     chunk_sizer.log_df(trace_label, "positions", positions)
     chunk_sizer.log_df(trace_label, "rands", rands)
 
@@ -1004,6 +1315,36 @@ def interaction_simulate(
 
     assert len(choosers) > 0
 
+    if compute_settings is None:
+        compute_settings = ComputeSettings()
+
+    precomputed_alternative_utilities = None
+    if (
+        compute_settings.precompute_alternatives
+        and estimator is None
+        and not log_alt_losers
+        and not state.tracing.has_trace_targets(choosers)
+    ):
+        # alternative-only terms are the same in every chunk, so they are
+        # evaluated just once, and removed from the spec used for the chunks
+        alternative_spec, remaining_spec = split_alternative_spec(
+            spec, choosers, alternatives, locals_d
+        )
+        if len(alternative_spec) > 0 and len(remaining_spec) > 0:
+            logger.info(
+                f"{trace_label} precomputing {len(alternative_spec)} "
+                f"alternative-only terms"
+            )
+            precomputed_alternative_utilities = eval_alternative_utilities(
+                state,
+                alternative_spec,
+                alternatives,
+                locals_d,
+                trace_label,
+                compute_settings=compute_settings,
+            )
+            spec = remaining_spec
+
     result_list = []
     for (
         i,
@@ -1027,6 +1368,7 @@ def interaction_simulate(
             estimator=estimator,
             chunk_sizer=chunk_sizer,
             compute_settings=compute_settings,
+            precomputed_alternative_utilities=precomputed_alternative_utilities,
         )
 
         result_list.append(choices)
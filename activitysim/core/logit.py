@@ -5,15 +5,24 @@ from __future__ import annotations
 import logging
 import warnings
 
+import numba as nb
 import numpy as np
 import pandas as pd
 
 from activitysim.core import tracing, workflow
-from activitysim.core.choosing import choice_maker
+from activitysim.core.choosing import (
+    choice_maker,
+    fused_utils_to_choices,
+    fused_utils_to_choices_without_probs,
+    ragged_utils_to_choices,
+)
 from activitysim.core.configuration.logit import LogitNestSpec
 
 logger = logging.getLogger(__name__)
 
+# flattened nest specs, keyed on the nest spec json and the alternatives order
+_FLAT_NESTS = {}
+
 EXP_UTIL_MIN = 1e-300
 EXP_UTIL_MAX = np.inf
 
@@ -332,6 +341,223 @@ def make_choices(
     return choices, rands
 
 
+def utils_to_choices(
+    state: workflow.State,
+    utils: pd.DataFrame,
+    trace_label: str = None,
+    trace_choosers=None,
+    in_place: bool = False,
+    want_choices: bool = True,
+    want_probs: bool = True,
+) -> tuple[pd.Series, pd.Series, pd.DataFrame, pd.Series]:
+    """
+    Convert utilities to probabilities, logsums and choices in one fused pass.
+
+    This gives the same results as `utils_to_probs` (with overflow protection)
+    followed by `make_choices`, but uses a single parallel numba kernel that
+    works row by row, so the exponentiated utilities, row sums, masks and
+    cumulative probabilities are never materialized as full size arrays.
+
+    Parameters
+    ----------
+    utils : pandas.DataFrame
+        Rows should be choosers and columns should be alternatives.
+    trace_label : str, optional
+        label for tracing bad utility or probability values
+    trace_choosers : pandas.dataframe
+        the choosers df (for interaction_simulate) to facilitate the reporting of hh_id
+        by report_bad_choices because it can't deduce hh_id from the interaction_dataset
+        which is indexed on index values from alternatives df
+    in_place : bool, default False
+        Overwrite the values of `utils` with the probabilities, instead of
+        copying them first.  Only set this if the caller does not need the
+        utilities after this call.
+    want_choices : bool, default True
+        Make choices.  If False, no random numbers are consumed and choices
+        and rands are returned as None.
+    want_probs : bool, default True
+        Compute the probabilities.  If False, choices are drawn directly from
+        the utilities (which are left unmodified, even if `in_place`), no
+        probabilities array is written, and probs is returned as None.
+        Choices must be wanted in this case.
+
+    Returns
+    -------
+    choices : pandas.Series
+        Maps chooser IDs (from `utils` index) to a choice, where the choice
+        is an index into the columns of `utils`.
+    rands : pandas.Series
+        The random numbers used to make the choices (for debugging, tracing)
+    probs : pandas.DataFrame or None
+        Will have the same index and columns as `utils`.  If `in_place` this
+        shares memory with `utils`.
+    logsums : pandas.Series
+        Will have the same index as `utils`.
+    """
+    trace_label = tracing.extend_trace_label(trace_label, "utils_to_choices")
+
+    assert want_choices or want_probs
+
+    utils_arr = utils.values
+    if utils_arr.dtype.kind != "f":
+        utils_arr = utils_arr.astype(np.float64)
+    elif want_probs and (not in_place or not utils_arr.flags.writeable):
+        utils_arr = utils_arr.copy()
+
+    if want_choices:
+        rands = state.get_rn_generator().random_for_df(utils)
+        rands = np.asanyarray(rands).reshape(-1)
+    else:
+        rands = np.empty(0, dtype=np.float64)
+
+    choices = np.empty(len(utils_arr), dtype=np.int32)
+    logsums = np.empty(len(utils_arr), dtype=utils_arr.dtype)
+
+    if want_probs:
+        status = fused_utils_to_choices(
+            utils_arr, rands, EXP_UTIL_MIN, choices, logsums
+        )
+    else:
+        status = fused_utils_to_choices_without_probs(
+            utils_arr, rands, EXP_UTIL_MIN, choices, logsums
+        )
+
+    if status.any():
+        # rows with bad status are left unmodified by the kernel
+        bad_utils = pd.DataFrame(utils_arr, columns=utils.columns, index=utils.index)
+        zero_probs = status == 1
+        if zero_probs.any():
+            report_bad_choices(
+                state,
+                zero_probs,
+                bad_utils,
+                trace_label=tracing.extend_trace_label(trace_label, "zero_prob_utils"),
+                msg="all probabilities are zero",
+                trace_choosers=trace_choosers,
+            )
+        report_bad_choices(
+            state,
+            status == 2,
+            bad_utils,
+            trace_label=tracing.extend_trace_label(trace_label, "inf_exp_utils"),
+            msg="infinite exponentiated utilities",
+            trace_choosers=trace_choosers,
+        )
+
+    if want_probs:
+        probs = pd.DataFrame(utils_arr, columns=utils.columns, index=utils.index)
+    else:
+        probs = None
+    logsums = pd.Series(logsums, index=utils.index)
+
+    if want_choices:
+        choices = pd.Series(choices, index=utils.index)
+        rands = pd.Series(rands, index=utils.index)
+    else:
+        choices = rands = None
+
+    return choices, rands, probs, logsums
+
+
+def ragged_to_choices(
+    state: workflow.State,
+    utils: np.ndarray,
+    offsets: np.ndarray,
+    choosers: pd.DataFrame,
+    allow_zero_probs: bool = False,
+    trace_label: str = None,
+    want_choices: bool = True,
+) -> tuple[pd.Series, pd.Series, pd.Series, np.ndarray]:
+    """
+    Make choices for choosers with varying numbers of alternatives.
+
+    The utilities are a flat array holding the alternatives of each chooser in
+    turn, and are never padded to the largest number of alternatives.  This
+    gives the same choices as padding the utilities with unavailable
+    alternatives and calling `utils_to_probs` and `make_choices`, and uses the
+    same random numbers.
+
+    Parameters
+    ----------
+    utils : numpy.ndarray
+        The utilities of chooser i are `utils[offsets[i]:offsets[i + 1]]`.
+    offsets : numpy.ndarray
+        One more than the number of choosers.
+    choosers : pandas.DataFrame
+        Only the index is used, for random numbers and reporting.
+    allow_zero_probs : bool
+        If True, utilities are not shifted to protect against overflow, and
+        choosers whose probabilities are all zero are reported in `zero_probs`
+        (and choose their first alternative) instead of raising an error.
+    trace_label : str, optional
+    want_choices : bool, default True
+        Make choices.  If False, no random numbers are consumed and positions
+        and rands are returned as None.
+
+    Returns
+    -------
+    positions : pandas.Series
+        Position of the chosen alternative among each chooser's alternatives.
+    rands : pandas.Series
+    logsums : pandas.Series
+    zero_probs : numpy.ndarray of bool
+    """
+    trace_label = tracing.extend_trace_label(trace_label, "ragged_to_choices")
+
+    if utils.dtype.kind != "f":
+        utils = utils.astype(np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    assert len(offsets) == len(choosers) + 1
+
+    if want_choices:
+        rands = state.get_rn_generator().random_for_df(choosers)
+        rands = np.asanyarray(rands).reshape(-1)
+    else:
+        rands = np.empty(0, dtype=np.float64)
+
+    positions = np.zeros(len(choosers), dtype=np.int32)
+    logsums = np.empty(len(choosers), dtype=utils.dtype)
+    status = ragged_utils_to_choices(
+        utils,
+        offsets,
+        rands,
+        EXP_UTIL_MIN,
+        not allow_zero_probs,
+        positions,
+        logsums,
+    )
+
+    zero_probs = status == 1
+    bad_rows = (status == 2) | (zero_probs & (not allow_zero_probs))
+    if bad_rows.any():
+        # pad only the bad rows, so they can be reported
+        rows = np.flatnonzero(bad_rows)
+        counts = offsets[rows + 1] - offsets[rows]
+        bad_utils = np.full((len(rows), max(counts.max(), 1)), np.nan)
+        for r, row in enumerate(rows):
+            bad_utils[r, : counts[r]] = utils[offsets[row] : offsets[row + 1]]
+        bad_utils = pd.DataFrame(bad_utils, index=choosers.index[rows])
+        report_bad_choices(
+            state,
+            np.ones(len(rows), dtype=bool),
+            bad_utils,
+            trace_label=trace_label,
+            msg="all probabilities are zero or utilities are not finite",
+            trace_choosers=choosers,
+        )
+    # the first alternative is chosen when all probabilities are zero
+    positions[zero_probs] = 0
+
+    logsums = pd.Series(logsums, index=choosers.index)
+    if want_choices:
+        positions = pd.Series(positions, index=choosers.index)
+        rands = pd.Series(rands, index=choosers.index)
+    else:
+        positions = rands = None
+
+    return positions, rands, logsums, zero_probs
+
+
 def interaction_dataset(
     state: workflow.State,
     choosers,
@@ -598,3 +824,216 @@ def count_nests(nest_spec):
             return 1
 
     return count_each_nest(nest_spec, 0) if nest_spec is not None else 0
+
+
+class FlatNestSpec:
+    """
+    Nest tree compiled into flat arrays for use by the fused nested logit kernel
+
+    Nodes (both nests and leaves) are stored in post-order, so every node comes
+    after all of its alternatives and the root is the last node.
+
+    Attributes
+    ----------
+    names : list of str
+        name of each node
+    parent : array of int, shape (n_nodes,)
+        position of the parent of each node, or -1 for the root
+    coefficient : array of float, shape (n_nodes,)
+        nest coefficient for nest nodes (zero for leaves)
+    product_of_coefficients : array of float, shape (n_nodes,)
+        product of the coefficients of the ancestors of each node
+    leaf_column : array of int, shape (n_nodes,)
+        position of each leaf in the alternatives (utility columns), or -1 for nests
+    """
+
+    def __init__(self, nest_spec: LogitNestSpec, alternatives):
+        nests = list(each_nest(nest_spec, post_order=True))
+        position = {nest.name: i for i, nest in enumerate(nests)}
+        alt_column = {alt: i for i, alt in enumerate(alternatives)}
+
+        self.names = [nest.name for nest in nests]
+        self.parent = np.full(len(nests), -1, dtype=np.int32)
+        self.coefficient = np.zeros(len(nests), dtype=np.float64)
+        self.product_of_coefficients = np.ones(len(nests), dtype=np.float64)
+        self.leaf_column = np.full(len(nests), -1, dtype=np.int32)
+
+        for i, nest in enumerate(nests):
+            if len(nest.ancestors) > 1:
+                self.parent[i] = position[nest.ancestors[-2]]
+            self.product_of_coefficients[i] = nest.product_of_coefficients
+            if nest.is_leaf:
+                if nest.name not in alt_column:
+                    raise RuntimeError(
+                        f"nest spec leaf '{nest.name}' is not one of the alternatives"
+                    )
+                self.leaf_column[i] = alt_column[nest.name]
+            else:
+                self.coefficient[i] = nest.coefficient
+
+        assert self.parent[-1] == -1, "root should be the last node in post-order"
+
+        leaves = set(self.names[i] for i in np.flatnonzero(self.leaf_column >= 0))
+        if leaves != set(alternatives):
+            raise RuntimeError(
+                f"nest spec leaves do not match alternatives: "
+                f"{sorted(set(alternatives) ^ leaves)}"
+            )
+
+
+def flatten_nest_spec(nest_spec: dict | LogitNestSpec, alternatives) -> FlatNestSpec:
+    """
+    Return the (cached) FlatNestSpec for nest_spec with leaves in alternatives order
+
+    Parameters
+    ----------
+    nest_spec : dict or LogitNestSpec
+        Nest tree with evaluated (numeric) coefficients
+    alternatives : list of str
+        alternative names in the order of the utility columns
+
+    Returns
+    -------
+    FlatNestSpec
+    """
+    if isinstance(nest_spec, dict):
+        nest_spec = LogitNestSpec.model_validate(nest_spec)
+    key = (nest_spec.model_dump_json(), tuple(alternatives))
+    flat = _FLAT_NESTS.get(key)
+    if flat is None:
+        flat = _FLAT_NESTS[key] = FlatNestSpec(nest_spec, alternatives)
+    return flat
+
+
+@nb.njit(parallel=True)
+def _nested_logit_kernel(
+    utils,
+    parent,
+    coefficient,
+    product_of_coefficients,
+    leaf_column,
+    exp_util_min,
+    out_probs,
+    out_logsums,
+):
+    n_choosers = utils.shape[0]
+    n_nodes = parent.shape[0]
+    status = np.zeros(n_choosers, dtype=np.int8)
+    for row in nb.prange(n_choosers):
+        exp_utils = np.empty(n_nodes)
+        # sum of exponentiated utilities of the alternatives of each nest
+        sums = np.zeros(n_nodes)
+        # as above, but ignoring exp utilities that are too small to count
+        prob_sums = np.zeros(n_nodes)
+        marginal = np.empty(n_nodes)
+
+        # post-order, so the alternatives of each nest are always done first
+        for i in range(n_nodes):
+            if leaf_column[i] >= 0:
+                e = np.exp(utils[row, leaf_column[i]] / product_of_coefficients[i])
+            else:
+                # log of zero sum is -inf, which becomes a zero exp utility
+                e = np.exp(coefficient[i] * np.log(sums[i]))
+            exp_utils[i] = e
+            p = parent[i]
+            if p >= 0:
+                sums[p] += e
+                if e > exp_util_min:
+                    prob_sums[p] += e
+
+        root = n_nodes - 1
+        out_logsums[row] = np.log(exp_utils[root])
+
+        # reverse post-order, so each nest is done before its alternatives
+        marginal[root] = 1.0
+        for i in range(root - 1, -1, -1):
+            p = parent[i]
+            if np.isinf(prob_sums[p]):
+                status[row] = 2
+            e = exp_utils[i]
+            if e > exp_util_min and prob_sums[p] > 0:
+                conditional = min(e / prob_sums[p], 1.0)
+            else:
+                # nests with all zero probabilities give zero probabilities to alternatives
+                conditional = 0.0
+            if np.isnan(conditional):
+                conditional = 0.0
+            marginal[i] = marginal[p] * conditional
+            if leaf_column[i] >= 0:
+                out_probs[row, leaf_column[i]] = marginal[i]
+    return status
+
+
+def nested_logit_probabilities(
+    state: workflow.State,
+    raw_utilities: pd.DataFrame,
+    nest_spec: dict | LogitNestSpec,
+    trace_label: str = None,
+    trace_choosers=None,
+) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Compute nested logit leaf probabilities and root logsums in one fused pass.
+
+    This gives the same results as computing nested exponentiated utilities,
+    nested probabilities and then base probabilities one nest at a time, but
+    evaluates the whole nest tree (flattened once per nest spec) for each
+    chooser in a single parallel numba kernel, without creating intermediate
+    DataFrames for each nest level.
+
+    Parameters
+    ----------
+    raw_utilities : pandas.DataFrame
+        Rows should be choosers and columns should be (leaf) alternatives.
+    nest_spec : dict or LogitNestSpec
+        Nest tree with evaluated (numeric) coefficients
+    trace_label : str, optional
+        label for tracing bad utility values
+    trace_choosers : pandas.dataframe
+        the choosers df to facilitate the reporting of hh_id by report_bad_choices
+
+    Returns
+    -------
+    base_probabilities : pandas.DataFrame
+        Will have the same index and columns as `raw_utilities`.
+    logsums : pandas.Series
+        Logsum of the nest root, with the same index as `raw_utilities`.
+    """
+    trace_label = tracing.extend_trace_label(trace_label, "nested_logit")
+
+    flat = flatten_nest_spec(nest_spec, raw_utilities.columns)
+
+    utils_arr = raw_utilities.values
+    if utils_arr.dtype not in (np.float32, np.float64):
+        utils_arr = utils_arr.astype(np.float64)
+
+    # float32 utilities give float32 probabilities and logsums
+    probs = np.zeros(utils_arr.shape, dtype=utils_arr.dtype)
+    logsums = np.empty(len(utils_arr), dtype=utils_arr.dtype)
+
+    status = _nested_logit_kernel(
+        utils_arr,
+        flat.parent,
+        flat.coefficient,
+        flat.product_of_coefficients,
+        flat.leaf_column,
+        EXP_UTIL_MIN,
+        probs,
+        logsums,
+    )
+
+    if status.any():
+        report_bad_choices(
+            state,
+            status == 2,
+            raw_utilities,
+            trace_label=tracing.extend_trace_label(trace_label, "inf_exp_utils"),
+            msg="infinite exponentiated utilities",
+            trace_choosers=trace_choosers,
+        )
+
+    probs = pd.DataFrame(
+        probs, columns=raw_utilities.columns, index=raw_utilities.index
+    )
+    logsums = pd.Series(logsums, index=raw_utilities.index)
+
+    return probs, logsums
@@ -0,0 +1,283 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from activitysim.core import util
+
+logger = logging.getLogger(__name__)
+
+# attributes of skim wrappers naming the chooser columns used for skim lookups
+SKIM_KEY_ATTRIBUTES = (
+    "orig_key",
+    "dest_key",
+    "dim3_key",
+    "time_key",
+    "tod_key",
+    "segment_key",
+)
+
+CONSTANT_TYPES = (str, int, float, bool, np.generic, list, tuple, dict)
+
+
+def logsum_key_columns(
+    choosers,
+    spec,
+    locals_d=None,
+    skims=None,
+    *,
+    sharrow_enabled=False,
+    protect_columns=None,
+):
+    """
+    Find the chooser columns that logsums computed from spec can depend on.
+
+    These are the columns `util.drop_unused_columns` keeps for evaluating
+    spec (including protected columns and those used implicitly by sharrow or
+    the trip timeframe locals), and the columns the skim wrappers use to look
+    up skim values.
+
+    Parameters
+    ----------
+    choosers : pandas.DataFrame
+    spec : pandas.DataFrame
+        logsum spec, indexed by expression
+    locals_d : dict, optional
+    skims : dict or list of skim wrappers, optional
+    sharrow_enabled : bool, optional
+    protect_columns : list of str, optional
+
+    Returns
+    -------
+    list of str
+        key columns, in the order they appear in choosers
+    """
+    names = util.used_chooser_columns(
+        spec,
+        locals_d,
+        sharrow_enabled=sharrow_enabled,
+        additional_columns=protect_columns,
+    )
+
+    if isinstance(skims, dict):
+        skims = skims.values()
+    elif skims is not None and not isinstance(skims, list):
+        skims = [skims]
+    for skim in skims or []:
+        for attribute in SKIM_KEY_ATTRIBUTES:
+            column = getattr(skim, attribute, None)
+            if isinstance(column, str):
+                names.add(column)
+
+    return [c for c in choosers.columns if c in names]
+
+
+def _stable_repr(value):
+    """
+    A repr of value that is the same in every run.
+
+    Objects with a default repr (which has their memory address) are described
+    by their type, and by the chooser columns they look up if they are skim
+    wrappers.
+    """
+    if isinstance(value, CONSTANT_TYPES) or value is None:
+        return repr(value)
+    name = getattr(value, "__qualname__", None) or getattr(value, "__name__", None)
+    if name is not None:
+        # modules, classes and functions
+        return f"{getattr(value, '__module__', '')}:{name}"
+    keys = {a: getattr(value, a, None) for a in SKIM_KEY_ATTRIBUTES}
+    return f"{type(value).__module__}.{type(value).__qualname__}{keys}"
+
+
+class LogsumCache:
+    """
+    Bounded cache of logsums shared across model components.
+
+    Logsums are stored in namespaces, one for each combination of logsum spec,
+    nest spec, locals, protected columns and skims (see `namespace`), and within a namespace
+    they are keyed by a 64 bit hash of the values of the chooser columns the
+    logsums depend on (see `row_keys`).
+
+    The total number of cached logsums is limited to `max_entries`.  When the
+    cache is full, whole namespaces are evicted in least recently used order,
+    and if the most recently used namespace is still too large on its own,
+    its oldest entries are dropped.
+
+    If `cache_dir` is given, each namespace is saved there as a `.npz` file by
+    `flush`, and is loaded from there the first time it is used, so later runs
+    with the same specs and skims start with a warm cache.
+
+    Parameters
+    ----------
+    max_entries : int
+        maximum number of logsums kept in memory
+    cache_dir : Path-like, optional
+        directory to persist namespaces in
+    fingerprint : str, optional
+        identifies the skims, and is included in every namespace
+    """
+
+    def __init__(self, max_entries: int, cache_dir=None, fingerprint: str = ""):
+        self.max_entries = int(max_entries)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: OrderedDict[str, pd.Series] = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(len(s) for s in self._namespaces.values())
+
+    def namespace(self, *parts) -> str:
+        """
+        Name the namespace for logsums computed from parts.
+
+        Parts can be DataFrames or Series (e.g. the evaluated logsum spec),
+        numpy arrays, dicts (e.g. locals) or anything else with a repr that is
+        stable across runs (e.g. the nest spec or the protected columns).  Dict
+        values are hashed like parts, except that objects without a stable
+        repr, like skim wrappers and functions, are named by their type.
+        """
+        h = hashlib.sha256(self.fingerprint.encode())
+        for part in parts:
+            self._hash_part(h, part)
+        return h.hexdigest()[:32]
+
+    @classmethod
+    def _hash_part(cls, h, part):
+        if isinstance(part, pd.DataFrame | pd.Series):
+            h.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+            if isinstance(part, pd.DataFrame):
+                h.update(repr(list(part.columns)).encode())
+        elif isinstance(part, np.ndarray):
+            h.update(repr((part.dtype.str, part.shape)).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, dict):
+            for k in sorted(part, key=str):
+                v = part[k]
+                h.update(repr(str(k)).encode())
+                if isinstance(v, pd.DataFrame | pd.Series | np.ndarray | dict):
+                    cls._hash_part(h, v)
+                else:
+                    h.update(_stable_repr(v).encode())
+        else:
+            h.update(repr(part).encode())
+
+    @staticmethod
+    def row_keys(df: pd.DataFrame) -> np.ndarray:
+        """Hash each row of df (ignoring the index) to a uint64 key."""
+        return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    def get(self, namespace: str, keys: np.ndarray):
+        """
+        Look up cached logsums.
+
+        Returns
+        -------
+        found : numpy.ndarray of bool
+            which keys were in the cache
+        logsums : numpy.ndarray of float
+            cached logsums, NaN where not found
+        """
+        with self._lock:
+            cached = self._use(namespace)
+            logsums = np.full(len(keys), np.nan)
+            if cached is None:
+                found = np.zeros(len(keys), dtype=bool)
+            else:
+                positions = cached.index.get_indexer(keys)
+                found = positions >= 0
+                logsums[found] = cached.to_numpy()[positions[found]]
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found, logsums
+
+    def put(self, namespace: str, keys: np.ndarray, logsums: np.ndarray):
+        """Add logsums for keys to the cache."""
+        if self.max_entries <= 0:
+            return
+        new = pd.Series(np.asarray(logsums, dtype=np.float64), index=keys)
+        new = new[~new.index.duplicated()]
+        with self._lock:
+            cached = self._use(namespace)
+            if cached is not None:
+                new = pd.concat([cached, new[~new.index.isin(cached.index)]])
+            self._namespaces[namespace] = new
+            self._dirty.add(namespace)
+            self._evict()
+
+    def flush(self):
+        """Save namespaces that changed since they were loaded or saved."""
+        if self.cache_dir is None:
+            return
+        with self._lock:
+            for namespace in list(self._dirty):
+                self._save(namespace)
+
+    def _path(self, namespace):
+        return self.cache_dir.joinpath(f"{namespace}.npz")
+
+    def _use(self, namespace):
+        """Get a namespace (loading it if needed) and mark it most recently used."""
+        if namespace not in self._namespaces:
+            loaded = self._load(namespace)
+            if loaded is None:
+                return None
+            self._namespaces[namespace] = loaded
+            self._evict()
+        if namespace in self._namespaces:
+            self._namespaces.move_to_end(namespace)
+        return self._namespaces.get(namespace)
+
+    def _load(self, namespace):
+        if self.cache_dir is None or not self._path(namespace).exists():
+            return None
+        try:
+            with np.load(self._path(namespace)) as data:
+                loaded = pd.Series(data["logsums"], index=data["keys"])
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"ignoring unreadable logsum cache {self._path(namespace)}")
+            return None
+        logger.debug(f"loaded {len(loaded)} cached logsums for {namespace}")
+        return loaded
+
+    def _save(self, namespace):
+        cached = self._namespaces.get(namespace)
+        self._dirty.discard(namespace)
+        if cached is None or self.cache_dir is None:
+            return
+        # other processes may have saved other logsums for this namespace
+        on_disk = self._load(namespace)
+        if on_disk is not None:
+            cached = pd.concat([on_disk[~on_disk.index.isin(cached.index)], cached])
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_dir.joinpath(f"{namespace}.{os.getpid()}.tmp.npz")
+        np.savez(temp_path, keys=cached.index.to_numpy(), logsums=cached.to_numpy())
+        os.replace(temp_path, self._path(namespace))
+
+    def _evict(self):
+        total = len(self)
+        while total > self.max_entries and len(self._namespaces) > 1:
+            namespace = next(iter(self._namespaces))
+            if namespace in self._dirty:
+                self._save(namespace)
+            total -= len(self._namespaces.pop(namespace))
+            logger.debug(f"evicted cached logsums for {namespace}")
+        if total > self.max_entries:
+            namespace, cached = next(iter(self._namespaces.items()))
+            if namespace in self._dirty:
+                self._save(namespace)
+            self._namespaces[namespace] = cached.iloc[-self.max_entries :]
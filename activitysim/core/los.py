@@ -13,15 +13,21 @@ import numpy as np
 import pandas as pd
 from pydantic import ValidationError
 
-from activitysim.core import config, input, pathbuilder, skim_dictionary, tracing, util
+from activitysim.core import config, input, pathbuilder, skim_dictionary, tracing
 from activitysim.core.cleaning import recode_based_on_table
 from activitysim.core.configuration.network import NetworkSettings, TAZ_Settings
-from activitysim.core.skim_dict_factory import MemMapSkimFactory, NumpyArraySkimFactory
+from activitysim.core.skim_dict_factory import (
+    LazySkimFactory,
+    MemMapSkimFactory,
+    NumpyArraySkimFactory,
+)
 from activitysim.core.skim_dictionary import NOT_IN_SKIM_ZONE_ID
+from activitysim.core.sparse_skims import SparseMazSkims
 
 skim_factories = {
     "NumpyArraySkimFactory": NumpyArraySkimFactory,
     "MemMapSkimFactory": MemMapSkimFactory,
+    "LazySkimFactory": LazySkimFactory,
 }
 
 logger = logging.getLogger(__name__)
@@ -60,9 +66,9 @@ class Network_LOS(object):
 
       # TWO_ZONE and THREE_ZONE
       maz_taz_df: pandas.DataFrame        # DataFrame with two columns, MAZ and TAZ, mapping MAZ to containing TAZ
-      maz_to_maz_df: pandas.DataFrame     # maz_to_maz attributes for MazSkimDict sparse skims
-                                          # indexed by synthetic omaz/dmaz index for faster get_mazpairs lookup)
-      maz_ceiling: int                    # max maz_id + 1 (to compute synthetic omaz/dmaz index by get_mazpairs)
+      maz_to_maz_skims: SparseMazSkims    # maz_to_maz attributes for MazSkimDict sparse skims
+                                          # stored by origin maz for fast get_mazpairs lookup
+      maz_ceiling: int                    # max maz_id + 1
       max_blend_distance: dict            # dict of int maz_to_maz max_blend_distance values keyed by skim_tag
 
       # THREE_ZONE only
@@ -87,7 +93,7 @@ class Network_LOS(object):
 
         # TWO_ZONE and THREE_ZONE
         self.maz_taz_df = None
-        self.maz_to_maz_df = None
+        self.maz_to_maz_skims = None
         self.maz_ceiling = None
         self.max_blend_distance = {}
 
@@ -271,13 +277,14 @@ class Network_LOS(object):
 
             self.maz_ceiling = self.maz_taz_df.MAZ.max() + 1
 
-            # maz_to_maz_df
+            # maz_to_maz_skims
             maz_to_maz_tables = self.setting("maz_to_maz.tables")
             maz_to_maz_tables = (
                 [maz_to_maz_tables]
                 if isinstance(maz_to_maz_tables, str)
                 else maz_to_maz_tables
             )
+            maz_to_maz_dfs = []
             for file_name in maz_to_maz_tables:
                 df = input.read_input_file(
                     self.state.filesystem.get_data_file_path(
@@ -291,34 +298,16 @@ class Network_LOS(object):
                 df["OMAZ"] = recode_based_on_table(self.state, df["OMAZ"], "land_use")
                 df["DMAZ"] = recode_based_on_table(self.state, df["DMAZ"], "land_use")
 
-                if self.maz_ceiling > (1 << 31):
-                    raise ValueError("maz ceiling too high, will overflow int64")
-                elif self.maz_ceiling > 32767:
-                    # too many MAZs, or un-recoded MAZ ID's that are too large
-                    # will overflow a 32-bit index, so upgrade to 64bit.
-                    df["i"] = df.OMAZ.astype(np.int64) * np.int64(
-                        self.maz_ceiling
-                    ) + df.DMAZ.astype(np.int64)
-                else:
-                    df["i"] = df.OMAZ.astype(np.int32) * np.int32(
-                        self.maz_ceiling
-                    ) + df.DMAZ.astype(np.int32)
-                df.set_index("i", drop=True, inplace=True, verify_integrity=True)
                 logger.debug(
                     f"loading maz_to_maz table {file_name} with {len(df)} rows"
                 )
+                maz_to_maz_dfs.append(df)
 
-                # FIXME - don't really need these columns, but if we do want them,
-                #  we would need to merge them in since files may have different numbers of rows
-                df.drop(columns=["OMAZ", "DMAZ"], inplace=True)
-
-                # besides, we only want data columns so we can coerce to same type as skims
-                df = df.astype(np.dtype(self.skim_dtype_name))
-
-                if self.maz_to_maz_df is None:
-                    self.maz_to_maz_df = df
-                else:
-                    self.maz_to_maz_df = pd.concat([self.maz_to_maz_df, df], axis=1)
+            # we only want data columns so we can coerce to same type as skims
+            if maz_to_maz_dfs:
+                self.maz_to_maz_skims = SparseMazSkims.from_tables(
+                    maz_to_maz_dfs, dtype=self.skim_dtype_name
+                )
 
         # load tap tables
         if self.zone_system == THREE_ZONE:
@@ -457,7 +446,7 @@ class Network_LOS(object):
         if self.zone_system in [TWO_ZONE, THREE_ZONE]:
             if not self.sharrow_enabled:
                 # create MazSkimDict facade skim_dict
-                # (must have already loaded dependencies: taz skim_dict, maz_to_maz_df, and maz_taz_df)
+                # (must have already loaded dependencies: taz skim_dict, maz_to_maz_skims, and maz_taz_df)
                 assert "maz" not in self.skim_dicts
                 maz_skim_dict = self.create_skim_dict("maz")
                 self.skim_dicts["maz"] = maz_skim_dict
@@ -521,7 +510,7 @@ class Network_LOS(object):
 
         if skim_tag == "maz":
             # MazSkimDict gets a reference to self here, because it has dependencies on self.load_data
-            # (e.g. maz_to_maz_df, maz_taz_df...) We pass in taz_skim_dict as a parameter
+            # (e.g. maz_to_maz_skims, maz_taz_df...) We pass in taz_skim_dict as a parameter
             # to hilight the fact that we do not want two copies of its (very large) data array in memory
             assert (
                 "taz" in self.skim_dicts
@@ -704,6 +693,28 @@ class Network_LOS(object):
 
         return skim_buffers
 
+    def record_skim_usage(self, step_name):
+        """
+        Record the skims looked up by a model step in the skim usage manifest.
+
+        Only the LazySkimFactory keeps a manifest, which it uses to preload
+        the skims that later runs will look up.
+
+        Parameters
+        ----------
+        step_name : str
+        """
+        if not isinstance(self.skim_dict_factory, LazySkimFactory):
+            return
+        manifest = self.skim_dict_factory.manifest
+        for skim_dict in self.skim_dicts.values():
+            if isinstance(skim_dict, skim_dictionary.SkimDict):
+                manifest.record(
+                    skim_dict.skim_info.skim_tag, step_name, skim_dict.step_usage
+                )
+                skim_dict.step_usage.clear()
+        manifest.save()
+
     def get_skim_dict(self, skim_tag):
         """
         Get SkimDict for the specified skim_tag (e.g. 'taz', 'maz', or 'tap')
@@ -717,21 +728,25 @@ class Network_LOS(object):
             # non-global import avoids circular references
             from .skim_dataset import SkimDataset
 
+            sorted_lookups = self.setting("sorted_skim_lookups", False)
             skim_dataset = self.state.get_injectable("skim_dataset")
             if skim_tag == "maz":
-                return SkimDataset(skim_dataset)
+                return SkimDataset(skim_dataset, sorted_lookups=sorted_lookups)
             else:
                 dropdims = ["omaz", "dmaz"]
                 skim_dataset = skim_dataset.drop_dims(dropdims, errors="ignore")
                 for dd in dropdims:
                     if f"dim_redirection_{dd}" in skim_dataset.attrs:
                         del skim_dataset.attrs[f"dim_redirection_{dd}"]
-                return SkimDataset(skim_dataset)
+                return SkimDataset(skim_dataset, sorted_lookups=sorted_lookups)
         elif sharrow_enabled and skim_tag in ("tap"):
             tap_dataset = self.state.get_injectable("tap_dataset")
             from .skim_dataset import SkimDataset
 
-            return SkimDataset(tap_dataset)
+            return SkimDataset(
+                tap_dataset,
+                sorted_lookups=self.setting("sorted_skim_lookups", False),
+            )
         else:
             assert (
                 skim_tag in self.skim_dicts
@@ -754,37 +769,21 @@ class Network_LOS(object):
 
     def get_mazpairs(self, omaz, dmaz, attribute):
         """
-        look up attribute values of maz od pairs in sparse maz_to_maz df
+        look up attribute values of maz od pairs in sparse maz_to_maz skims
 
         Parameters
         ----------
         omaz: array-like list of omaz zone_ids
         dmaz: array-like list of omaz zone_ids
-        attribute: str name of attribute column in maz_to_maz_df
+        attribute: str name of maz_to_maz attribute, or list of names
 
         Returns
         -------
-        Numpy.ndarray: list of attribute values for od pairs
+        Numpy.ndarray: list of attribute values for od pairs (nan if not in maz_to_maz)
+            or, for a list of attributes, a row of values for each attribute
         """
 
-        # # this is slower
-        # s = pd.merge(pd.DataFrame({'OMAZ': omaz, 'DMAZ': dmaz}),
-        #              self.maz_to_maz_df,
-        #              how="left")[attribute]
-
-        # synthetic index method i : omaz_dmaz
-        if self.maz_ceiling > 32767:
-            # too many MAZs, or un-recoded MAZ ID's that are too large
-            # will overflow a 32-bit index, so upgrade to 64bit.
-            i = np.asanyarray(omaz, dtype=np.int64) * np.int64(
-                self.maz_ceiling
-            ) + np.asanyarray(dmaz, dtype=np.int64)
-        else:
-            i = np.asanyarray(omaz) * self.maz_ceiling + np.asanyarray(dmaz)
-        s = util.quick_loc_df(i, self.maz_to_maz_df, attribute)
-
-        # FIXME - no point in returning series?
-        return np.asanyarray(s)
+        return self.maz_to_maz_skims.lookup(omaz, dmaz, attribute)
 
     def get_tappairs3d(self, otap, dtap, dim3, key):
         """
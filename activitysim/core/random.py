@@ -6,6 +6,7 @@ import hashlib
 import logging
 from builtins import object, range
 
+import numba as nb
 import numpy as np
 import pandas as pd
 
@@ -36,6 +37,136 @@ def hash32(s):
     return int(h, base=16) & _SEED_MASK
 
 
+# Philox4x32-10 constants (Salmon et al., "Parallel Random Numbers: As Easy as 1, 2, 3")
+_PHILOX_M0 = np.uint64(0xD2511F53)
+_PHILOX_M1 = np.uint64(0xCD9E8D57)
+_PHILOX_W0 = np.uint64(0x9E3779B9)
+_PHILOX_W1 = np.uint64(0xBB67AE85)
+_PHILOX_MASK = np.uint64(_SEED_MASK)
+_PHILOX_SHIFT = np.uint64(32)
+
+
+@nb.njit(cache=True)
+def _philox4x32(c0, c1, c2, c3, k0, k1):
+    """
+    Philox4x32-10 block function, mapping a 128 bit counter and 64 bit key to 128 random bits.
+
+    All inputs and outputs are uint64 values holding 32 bit words.
+    """
+    for _ in range(10):
+        p0 = _PHILOX_M0 * c0
+        p1 = _PHILOX_M1 * c2
+        hi0 = p0 >> _PHILOX_SHIFT
+        lo0 = p0 & _PHILOX_MASK
+        hi1 = p1 >> _PHILOX_SHIFT
+        lo1 = p1 & _PHILOX_MASK
+        c0 = hi1 ^ c1 ^ k0
+        c1 = lo1
+        c2 = hi0 ^ c3 ^ k1
+        c3 = lo0
+        k0 = (k0 + _PHILOX_W0) & _PHILOX_MASK
+        k1 = (k1 + _PHILOX_W1) & _PHILOX_MASK
+    return c0, c1, c2, c3
+
+
+@nb.njit(cache=True)
+def _philox_doubles(row_seed, channel_key, counter):
+    """
+    Two uniform doubles in [0, 1) for the given row_seed at position counter in its stream.
+
+    Doubles are built from 53 random bits in the same way as numpy's RandomState.rand
+    """
+    r0, r1, r2, r3 = _philox4x32(
+        counter & _PHILOX_MASK,
+        counter >> _PHILOX_SHIFT,
+        np.uint64(0),
+        np.uint64(0),
+        row_seed,
+        channel_key,
+    )
+    u0 = ((r0 >> np.uint64(5)) * 67108864.0 + (r1 >> np.uint64(6))) / 9007199254740992.0
+    u1 = ((r2 >> np.uint64(5)) * 67108864.0 + (r3 >> np.uint64(6))) / 9007199254740992.0
+    return u0, u1
+
+
+@nb.njit(cache=True, parallel=True)
+def _philox_uniform(row_seeds, offsets, channel_key, n):
+    """
+    n uniform rands in [0, 1) per row, drawn from counters offset..offset+n of each row stream
+
+    Parameters
+    ----------
+    row_seeds : array of uint64, shape (n_rows,)
+    offsets : array of uint64, shape (n_rows,)
+    channel_key : uint64
+    n : int
+
+    Returns
+    -------
+    rands : array of float64, shape (n_rows, n)
+    """
+    out = np.empty((row_seeds.shape[0], n), dtype=np.float64)
+    for i in nb.prange(row_seeds.shape[0]):
+        for j in range(n):
+            u0, _ = _philox_doubles(
+                row_seeds[i], channel_key, offsets[i] + np.uint64(j)
+            )
+            out[i, j] = u0
+    return out
+
+
+@nb.njit(cache=True, parallel=True)
+def _philox_normal(row_seeds, offsets, channel_key, n):
+    """
+    n standard normal rands per row, one Box-Muller transform per stream counter
+
+    Returns
+    -------
+    rands : array of float64, shape (n_rows, n)
+    """
+    out = np.empty((row_seeds.shape[0], n), dtype=np.float64)
+    for i in nb.prange(row_seeds.shape[0]):
+        for j in range(n):
+            u0, u1 = _philox_doubles(
+                row_seeds[i], channel_key, offsets[i] + np.uint64(j)
+            )
+            # 1 - u0 is in (0, 1] so the log is always finite
+            out[i, j] = np.sqrt(-2.0 * np.log(1.0 - u0)) * np.cos(2.0 * np.pi * u1)
+    return out
+
+
+@nb.njit(cache=True, parallel=True)
+def _philox_choice(row_seeds, offsets, channel_key, n_alts, size, replace):
+    """
+    Sample size positions from range(n_alts) for each row, consuming size counters per row
+
+    Sampling without replacement is done with a partial Fisher-Yates shuffle.
+
+    Returns
+    -------
+    positions : array of int64, shape (n_rows, size)
+    """
+    n_rows = row_seeds.shape[0]
+    out = np.empty((n_rows, size), dtype=np.int64)
+    for i in nb.prange(n_rows):
+        if replace:
+            for j in range(size):
+                u0, _ = _philox_doubles(
+                    row_seeds[i], channel_key, offsets[i] + np.uint64(j)
+                )
+                out[i, j] = min(np.int64(u0 * n_alts), n_alts - 1)
+        else:
+            pool = np.arange(n_alts)
+            for j in range(size):
+                u0, _ = _philox_doubles(
+                    row_seeds[i], channel_key, offsets[i] + np.uint64(j)
+                )
+                k = j + min(np.int64(u0 * (n_alts - j)), n_alts - j - 1)
+                pool[j], pool[k] = pool[k], pool[j]
+                out[i, j] = pool[j]
+    return out
+
+
 class SimpleChannel(object):
     """
 
@@ -64,10 +195,20 @@ class SimpleChannel(object):
     We do read in the whole households and persons tables at start time, so we could note the
     max index values. But we might then want a way to ensure stability between the test, example,
     and full datasets. I am punting on this for now.
+
+    If counter_based is True, rands are not drawn from a reseeded RandomState at all. Instead
+    each draw is the output of the Philox4x32 counter-based generator keyed on (row_seed,
+    channel_seed) with counter offset, so all rows are generated in a single vectorized numba
+    call with no per-row reseeding or fast-forwarding. The stream for each row is still fully
+    determined by the base seed, channel, step and row index, so results remain repeatable,
+    but they are (of course) different from the default RandomState streams.
     """
 
-    def __init__(self, channel_name, base_seed, domain_df, step_name):
+    def __init__(
+        self, channel_name, base_seed, domain_df, step_name, counter_based=False
+    ):
         self.base_seed = base_seed
+        self.counter_based = counter_based
 
         # ensure that every channel is different, even for the same df index values and max_steps
         self.channel_name = channel_name
@@ -203,6 +344,38 @@ class SimpleChannel(object):
 
             yield prng
 
+    def _counter_states_for_df(self, df):
+        """
+        Return row_seeds, offsets (as uint64 arrays) and row positions in row_states for df rows
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            dataframe with index values for which random streams are to be generated
+            and well-known index name corresponding to the channel
+        """
+
+        # assert no dupes
+        assert len(df.index.unique()) == len(df.index)
+
+        positions = self.row_states.index.get_indexer(df.index)
+        if (positions < 0).any():
+            raise KeyError(
+                f"{(positions < 0).sum()} df index values not in channel {self.channel_name}"
+            )
+
+        row_seeds = self.row_states["row_seed"].to_numpy()[positions].astype(np.uint64)
+        offsets = self.row_states["offset"].to_numpy()[positions].astype(np.uint64)
+        return row_seeds, offsets, positions
+
+    def _advance_offsets(self, positions, n):
+        """
+        Increment offset of row_states rows at positions by n
+        """
+        offsets = self.row_states["offset"].to_numpy(dtype=np.int64)
+        offsets[positions] += n
+        self.row_states["offset"] = offsets
+
     def random_for_df(self, df, step_name, n=1):
         """
         Return n floating point random numbers in range [0, 1) for each row in df
@@ -236,6 +409,14 @@ class SimpleChannel(object):
         assert self.step_name
         assert self.step_name == step_name
 
+        if self.counter_based:
+            row_seeds, offsets, positions = self._counter_states_for_df(df)
+            rands = _philox_uniform(
+                row_seeds, offsets, np.uint64(self.channel_seed), int(n)
+            )
+            self._advance_offsets(positions, n)
+            return rands
+
         # - reminder: prng must be called when yielded as generated sequence, not serialized
         generators = self._generators_for_df(df)
 
@@ -284,6 +465,23 @@ class SimpleChannel(object):
                 return x.values
             return x
 
+        if self.counter_based:
+            row_seeds, offsets, positions = self._counter_states_for_df(df)
+            n = 1 if size is None else int(size)
+            rands = _philox_normal(row_seeds, offsets, np.uint64(self.channel_seed), n)
+            if size is None:
+                rands = rands[:, 0]
+                mu = np.asanyarray(to_series(mu))
+                sigma = np.asanyarray(to_series(sigma))
+            else:
+                mu = np.asanyarray(to_series(mu)).reshape(-1, 1)
+                sigma = np.asanyarray(to_series(sigma)).reshape(-1, 1)
+            rands = rands * sigma + mu
+            if lognormal:
+                rands = np.exp(rands)
+            self._advance_offsets(positions, n)
+            return rands
+
         # - reminder: prng must be called when yielded as generated sequence, not serialized
         generators = self._generators_for_df(df)
 
@@ -353,6 +551,27 @@ class SimpleChannel(object):
         assert self.step_name
         assert self.step_name == step_name
 
+        if self.counter_based:
+            row_seeds, offsets, positions = self._counter_states_for_df(df)
+            alts = np.arange(a) if np.isscalar(a) else np.asanyarray(a)
+            if not replace and size > len(alts):
+                raise ValueError(
+                    "Cannot take a larger sample than population when 'replace=False'"
+                )
+            sample = alts[
+                _philox_choice(
+                    row_seeds,
+                    offsets,
+                    np.uint64(self.channel_seed),
+                    len(alts),
+                    int(size),
+                    bool(replace),
+                ).reshape(-1)
+            ]
+            if not self.multi_choice_offset:
+                self._advance_offsets(positions, size)
+            return sample
+
         # initialize the generator iterator
         generators = self._generators_for_df(df)
 
@@ -371,9 +590,12 @@ class SimpleChannel(object):
 
 
 class Random(object):
-    def __init__(self):
+    def __init__(self, counter_based=False):
         self.channels = {}
 
+        # use vectorized counter-based (Philox) streams for channels instead of RandomState
+        self.counter_based = counter_based
+
         # dict mapping df index name to channel name
         self.index_to_channel = {}
 
@@ -484,7 +706,11 @@ class Random(object):
             )
 
             channel = SimpleChannel(
-                channel_name, self.base_seed, domain_df, self.step_name
+                channel_name,
+                self.base_seed,
+                domain_df,
+                self.step_name,
+                counter_based=self.counter_based,
             )
 
             self.channels[channel_name] = channel
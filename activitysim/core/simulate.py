@@ -2,6 +2,7 @@
 # See full license in LICENSE.txt.
 from __future__ import annotations
 
+import copy
 import logging
 import time
 import warnings
@@ -32,6 +33,7 @@ from activitysim.core.configuration.logit import (
     TemplatedLogitComponentSettings,
 )
 from activitysim.core.estimation import Estimator
+from activitysim.core.logsum_cache import logsum_key_columns
 from activitysim.core.simulate_consts import (
     ALT_LOSER_UTIL,
     SPEC_DESCRIPTION_NAME,
@@ -517,6 +519,92 @@ def eval_coefficients(
     return spec
 
 
+def accumulate_utilities(utilities, expression_value, coefficients, alt_rows=None):
+    """
+    Add the partial utilities of one spec expression to the utilities of all alternatives.
+
+    This is the same as adding the outer product of expression_value and coefficients
+    to utilities, but without allocating a (choosers x alternatives) temporary array.
+
+    Parameters
+    ----------
+    utilities : numpy.ndarray, shape (n_choosers, n_alts)
+        utilities accumulator, updated in place
+    expression_value : array-like or scalar, shape (n_choosers,)
+        values of a single spec expression
+    coefficients : numpy.ndarray, shape (n_alts,)
+        coefficients of the expression for each alternative
+    alt_rows : list of (numpy.ndarray or None), optional
+        for each alternative, the offsets of the choosers for which it is available
+        (as returned by `available_rows`), or None to update all choosers.  Only
+        these cells are updated.
+    """
+    expression_value = np.asarray(expression_value, dtype=utilities.dtype)
+    if np.isfinite(expression_value).all():
+        # zero coefficients contribute nothing, so we can skip them
+        alts = np.flatnonzero(coefficients)
+    else:
+        # keep nan for 0 * inf or 0 * nan, the same as np.dot
+        alts = range(len(coefficients))
+        alt_rows = None
+    if alt_rows is not None and expression_value.ndim == 0:
+        expression_value = np.broadcast_to(expression_value, (utilities.shape[0],))
+    for j in alts:
+        rows = None if alt_rows is None else alt_rows[j]
+        if rows is None:
+            utilities[:, j] += expression_value * coefficients[j]
+        else:
+            utilities[rows, j] += expression_value[rows] * coefficients[j]
+
+
+def unavailability_rows(coefficients):
+    """
+    Find spec rows that only mark alternatives as unavailable.
+
+    These are rows where every non-zero coefficient is a prohibitive utility
+    (at or below ALT_LOSER_UTIL), like the -999 terms used in mode choice specs.
+
+    Parameters
+    ----------
+    coefficients : numpy.ndarray, shape (n_expressions, n_alts)
+
+    Returns
+    -------
+    flagged : numpy.ndarray of bool, shape (n_expressions,)
+    """
+    nonzero = coefficients != 0
+    return nonzero.any(axis=1) & ((coefficients <= ALT_LOSER_UTIL) | ~nonzero).all(
+        axis=1
+    )
+
+
+def available_rows(unavailable, max_density=0.5):
+    """
+    Compress an unavailability mask into per-alternative offsets of available choosers.
+
+    Choosers with no available alternatives are treated as if every alternative
+    were available, so their utilities are computed in full.
+
+    Parameters
+    ----------
+    unavailable : numpy.ndarray of bool, shape (n_choosers, n_alts)
+    max_density : float
+        alternatives available to at least this share of choosers get None,
+        as updating them densely is cheaper than gathering the available rows
+
+    Returns
+    -------
+    alt_rows : list of (numpy.ndarray or None), length n_alts
+    """
+    unavailable = unavailable & ~unavailable.all(axis=1, keepdims=True)
+    n_choosers = unavailable.shape[0]
+    alt_rows = []
+    for j in range(unavailable.shape[1]):
+        rows = np.flatnonzero(~unavailable[:, j])
+        alt_rows.append(rows if len(rows) < max_density * n_choosers else None)
+    return alt_rows
+
+
 def eval_utilities(
     state,
     spec,
@@ -584,6 +672,7 @@ def eval_utilities(
     sharrow_enabled = state.settings.sharrow
 
     expression_values = None
+    traced_expression_values = None
 
     from .flow import TimeLogger
 
@@ -643,20 +732,72 @@ def eval_utilities(
         else:
             exprs = spec.index
 
-        expression_values = np.empty((spec.shape[0], choosers.shape[0]))
-        chunk_sizer.log_df(trace_label, "expression_values", expression_values)
+        # when accumulating, each expression is multiplied into the utilities as soon
+        # as it is evaluated, and only the values for traced rows are kept
+        accumulate = (
+            compute_settings.accumulate_utilities
+            and not estimator
+            and sharrow_enabled != "test"
+        )
+        float_dtype = compute_settings.float_dtype
+        coefficient_values = spec.astype(float_dtype).values
+
+        # with sparse availability, the rows that only flag unavailable alternatives
+        # are evaluated first, and the other rows only update the available cells
+        sparse = accumulate and compute_settings.sparse_availability
+        if sparse:
+            flagged = unavailability_rows(coefficient_values)
+            n_flagged = flagged.sum()
+            order = np.concatenate([np.flatnonzero(flagged), np.flatnonzero(~flagged)])
+            unavailable = np.zeros((choosers.shape[0], spec.shape[1]), dtype=bool)
+            chunk_sizer.log_df(trace_label, "unavailable", unavailable)
+        else:
+            n_flagged = 0
+            order = np.arange(spec.shape[0])
+        alt_rows = None
+
+        if accumulate:
+            utilities = np.zeros(
+                (choosers.shape[0], spec.shape[1]), dtype=float_dtype, order="F"
+            )
+            chunk_sizer.log_df(trace_label, "utilities", utilities)
+            if (trace_all_rows or have_trace_targets) and (len(choosers) > 0):
+                if trace_all_rows:
+                    trace_offsets = np.arange(len(choosers))
+                else:
+                    trace_offsets = np.nonzero(state.tracing.trace_targets(choosers))[0]
+                traced_expression_values = np.empty(
+                    (spec.shape[0], len(trace_offsets)), dtype=float_dtype
+                )
+            else:
+                trace_offsets = traced_expression_values = None
+        else:
+            expression_values = np.empty(
+                (spec.shape[0], choosers.shape[0]), dtype=float_dtype
+            )
+            chunk_sizer.log_df(trace_label, "expression_values", expression_values)
 
-        i = 0
+        spec_values = spec.values
         with compute_settings.pandas_option_context():
-            for expr, coefficients in zip(exprs, spec.values):
+            for n, i in enumerate(order):
+                expr = exprs[i]
+                coefficients = spec_values[i]
+                if sparse and n == n_flagged:
+                    alt_rows = available_rows(unavailable)
+                    del unavailable
+                    chunk_sizer.log_df(trace_label, "unavailable", None)
                 try:
                     with warnings.catch_warnings(record=True) as w:
                         # Cause all warnings to always be triggered.
                         warnings.simplefilter("always")
                         if expr.startswith("@"):
-                            expression_value = eval(expr[1:], globals_dict, locals_dict)
+                            expression_value = eval(
+                                assign.compile_expression(expr[1:]),
+                                globals_dict,
+                                locals_dict,
+                            )
                         else:
-                            expression_value = choosers.eval(expr)
+                            expression_value = assign.eval_df_expression(choosers, expr)
 
                         if len(w) > 0:
                             for wrn in w:
@@ -682,8 +823,23 @@ def eval_utilities(
                             f"with prohibitive utilities for all alternatives for expression: {expr}"
                         )
 
-                expression_values[i] = expression_value
-                i += 1
+                if accumulate:
+                    if sparse and n < n_flagged:
+                        flag_values = np.asarray(expression_value, dtype=np.float64)
+                        for j in np.flatnonzero(coefficients):
+                            unavailable[:, j] |= (
+                                flag_values * coefficient_values[i, j] <= ALT_LOSER_UTIL
+                            )
+                    accumulate_utilities(
+                        utilities, expression_value, coefficients, alt_rows
+                    )
+                    if traced_expression_values is not None:
+                        traced_expression_values[i] = np.broadcast_to(
+                            np.asarray(expression_value, dtype=float_dtype),
+                            (len(choosers),),
+                        )[trace_offsets]
+                else:
+                    expression_values[i] = expression_value
 
         chunk_sizer.log_df(trace_label, "expression_values", expression_values)
 
@@ -697,9 +853,8 @@ def eval_utilities(
             estimator.write_expression_values(df)
 
         # - compute_utilities
-        utilities = np.dot(
-            expression_values.transpose(), spec.astype(np.float64).values
-        )
+        if not accumulate:
+            utilities = np.dot(expression_values.transpose(), coefficient_values)
 
         timelogger.mark("simple flow", True, logger=logger, suffix=trace_label)
     else:
@@ -739,8 +894,11 @@ def eval_utilities(
         # get array of expression_values
         # expression_values.shape = (len(spec), len(choosers))
         # data.shape = (len(spec), len(offsets))
-        if expression_values is not None:
-            data = expression_values[:, offsets]
+        if expression_values is not None or traced_expression_values is not None:
+            if expression_values is not None:
+                data = expression_values[:, offsets]
+            else:
+                data = traced_expression_values
 
             # index is utility expressions (and optional label if MultiIndex)
             expression_values_df = pd.DataFrame(data=data, index=spec.index)
@@ -902,9 +1060,11 @@ def eval_variables(state: workflow.State, exprs, df, locals_d=None):
     for expr in exprs:
         try:
             if expr.startswith("@"):
-                expr_values = to_array(eval(expr[1:], globals_dict, locals_dict))
+                expr_values = to_array(
+                    eval(assign.compile_expression(expr[1:]), globals_dict, locals_dict)
+                )
             else:
-                expr_values = to_array(df.eval(expr))
+                expr_values = to_array(assign.eval_df_expression(df, expr))
             # read model spec should ensure uniqueness, otherwise we should uniquify
             assert expr not in values
             values[expr] = expr_values
@@ -1024,7 +1184,9 @@ def set_skim_wrapper_targets(df, skims):
 #         )
 
 
-def compute_nested_exp_utilities(raw_utilities, nest_spec):
+def compute_nested_exp_utilities(
+    raw_utilities, nest_spec, compute_settings: ComputeSettings | None = None
+):
     """
     compute exponentiated nest utilities based on nesting coefficients
 
@@ -1040,12 +1202,18 @@ def compute_nested_exp_utilities(raw_utilities, nest_spec):
         (what in non-nested logit would be the utilities of all the alternatives)
     nest_spec : dict
         Nest tree dict from the model spec yaml file
+    compute_settings : ComputeSettings, optional
+        utilities are computed in double precision, unless its `precision`
+        is float32
 
     Returns
     -------
     nested_utilities : pandas.DataFrame
         Will have the index of `raw_utilities` and columns for exponentiated leaf and node utilities
     """
+    if compute_settings is None:
+        compute_settings = ComputeSettings()
+
     nested_utilities = pd.DataFrame(index=raw_utilities.index)
 
     for nest in logit.each_nest(nest_spec, post_order=True):
@@ -1054,7 +1222,8 @@ def compute_nested_exp_utilities(raw_utilities, nest_spec):
         if nest.is_leaf:
             # leaf_utility = raw_utility / nest.product_of_coefficients
             nested_utilities[name] = (
-                raw_utilities[name].astype(float) / nest.product_of_coefficients
+                raw_utilities[name].astype(compute_settings.float_dtype)
+                / nest.product_of_coefficients
             )
 
         else:
@@ -1239,26 +1408,90 @@ def eval_mnl(
             column_labels=["alternative", "utility"],
         )
 
-    probs = logit.utils_to_probs(
-        state, utilities, trace_label=trace_label, trace_choosers=choosers
+    return _mnl_choices(
+        state,
+        utilities,
+        choosers,
+        spec,
+        custom_chooser,
+        have_trace_targets=have_trace_targets,
+        trace_label=trace_label,
+        trace_choice_name=trace_choice_name,
+        chunk_sizer=chunk_sizer,
+        compute_settings=compute_settings,
     )
-    chunk_sizer.log_df(trace_label, "probs", probs)
 
-    del utilities
-    chunk_sizer.log_df(trace_label, "utilities", None)
 
-    if have_trace_targets:
-        # report these now in case make_choices throws error on bad_choices
-        state.tracing.trace_df(
-            probs,
-            "%s.probs" % trace_label,
-            column_labels=["alternative", "probability"],
+def _mnl_choices(
+    state: workflow.State,
+    utilities,
+    choosers,
+    spec,
+    custom_chooser: CustomChooser_T,
+    have_trace_targets,
+    trace_label,
+    trace_choice_name=None,
+    *,
+    chunk_sizer,
+    compute_settings: ComputeSettings | None = None,
+):
+    """
+    Make multinomial logit choices from a table of utilities.
+
+    This is the part of eval_mnl that comes after the utilities are evaluated.
+
+    Returns
+    -------
+    choices : pandas.Series
+        Index will be that of `utilities`, values will match the columns
+        of `spec`.
+    """
+    if (
+        compute_settings is not None
+        and compute_settings.fused_logit
+        and not custom_chooser
+    ):
+        # utilities are not needed after this, so probs can overwrite them in place
+        choices, rands, probs, _ = logit.utils_to_choices(
+            state,
+            utilities,
+            trace_label=trace_label,
+            trace_choosers=choosers,
+            in_place=True,
+            want_probs=compute_settings.keep_probabilities or have_trace_targets,
         )
+        chunk_sizer.log_df(trace_label, "probs", probs)
 
-    if custom_chooser:
-        choices, rands = custom_chooser(state, probs, choosers, spec, trace_label)
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+
+        if have_trace_targets:
+            state.tracing.trace_df(
+                probs,
+                "%s.probs" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
     else:
-        choices, rands = logit.make_choices(state, probs, trace_label=trace_label)
+        probs = logit.utils_to_probs(
+            state, utilities, trace_label=trace_label, trace_choosers=choosers
+        )
+        chunk_sizer.log_df(trace_label, "probs", probs)
+
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+
+        if have_trace_targets:
+            # report these now in case make_choices throws error on bad_choices
+            state.tracing.trace_df(
+                probs,
+                "%s.probs" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
+
+        if custom_chooser:
+            choices, rands = custom_chooser(state, probs, choosers, spec, trace_label)
+        else:
+            choices, rands = logit.make_choices(state, probs, trace_label=trace_label)
 
     del probs
     chunk_sizer.log_df(trace_label, "probs", None)
@@ -1362,56 +1595,146 @@ def eval_nl(
             column_labels=["alternative", "utility"],
         )
 
-    # exponentiated utilities of leaves and nests
-    nested_exp_utilities = compute_nested_exp_utilities(raw_utilities, nest_spec)
-    chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
+    return _nl_choices(
+        state,
+        raw_utilities,
+        choosers,
+        spec,
+        nest_spec,
+        custom_chooser,
+        want_logsums=want_logsums,
+        have_trace_targets=have_trace_targets,
+        trace_label=trace_label,
+        trace_choice_name=trace_choice_name,
+        chunk_sizer=chunk_sizer,
+        compute_settings=compute_settings,
+    )
 
-    del raw_utilities
-    chunk_sizer.log_df(trace_label, "raw_utilities", None)
 
-    if have_trace_targets:
-        state.tracing.trace_df(
-            nested_exp_utilities,
-            "%s.nested_exp_utilities" % trace_label,
-            column_labels=["alternative", "utility"],
+def _nl_choices(
+    state: workflow.State,
+    raw_utilities,
+    choosers,
+    spec,
+    nest_spec,
+    custom_chooser: CustomChooser_T,
+    want_logsums,
+    have_trace_targets,
+    trace_label,
+    trace_choice_name=None,
+    *,
+    chunk_sizer: chunk.ChunkSizer,
+    compute_settings: ComputeSettings | None = None,
+):
+    """
+    Make nested logit choices from a table of raw utilities.
+
+    This is the part of eval_nl that comes after the utilities are evaluated.
+    `choosers` is only used for tracing and reporting bad choices, and must line
+    up with the rows of `raw_utilities` if `have_trace_targets`.
+
+    Returns
+    -------
+    choices : pandas.Series or pandas.DataFrame
+        Index will be that of `raw_utilities`, values will match the columns
+        of `spec`.  If `want_logsums`, a DataFrame with "choice" and "logsum"
+        columns.
+    """
+    if compute_settings is not None and compute_settings.fused_logit:
+        # leaf probabilities and root logsums from the flattened nest tree in one pass
+        base_probabilities, logsums = logit.nested_logit_probabilities(
+            state,
+            raw_utilities,
+            nest_spec,
+            trace_label=trace_label,
+            trace_choosers=choosers,
         )
+        base_probabilities = base_probabilities[spec.columns]
+        chunk_sizer.log_df(trace_label, "base_probabilities", base_probabilities)
+        if want_logsums:
+            chunk_sizer.log_df(trace_label, "logsums", logsums)
 
-    # probabilities of alternatives relative to siblings sharing the same nest
-    nested_probabilities = compute_nested_probabilities(
-        state, nested_exp_utilities, nest_spec, trace_label=trace_label
-    )
-    chunk_sizer.log_df(trace_label, "nested_probabilities", nested_probabilities)
+        if have_trace_targets:
+            # intermediate nest values are only computed for the traced rows
+            trace_utilities = raw_utilities[state.tracing.trace_targets(choosers)]
+            nested_exp_utilities = compute_nested_exp_utilities(
+                trace_utilities, nest_spec, compute_settings
+            )
+            state.tracing.trace_df(
+                nested_exp_utilities,
+                "%s.nested_exp_utilities" % trace_label,
+                column_labels=["alternative", "utility"],
+            )
+            state.tracing.trace_df(
+                compute_nested_probabilities(
+                    state, nested_exp_utilities, nest_spec, trace_label=trace_label
+                ),
+                "%s.nested_probabilities" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
+            state.tracing.trace_df(
+                base_probabilities,
+                "%s.base_probabilities" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
 
-    if want_logsums:
-        # logsum of nest root
-        logsums = pd.Series(np.log(nested_exp_utilities.root), index=choosers.index)
-        chunk_sizer.log_df(trace_label, "logsums", logsums)
+        del raw_utilities
+        chunk_sizer.log_df(trace_label, "raw_utilities", None)
+    else:
+        # exponentiated utilities of leaves and nests
+        nested_exp_utilities = compute_nested_exp_utilities(
+            raw_utilities, nest_spec, compute_settings
+        )
+        chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
 
-    del nested_exp_utilities
-    chunk_sizer.log_df(trace_label, "nested_exp_utilities", None)
+        del raw_utilities
+        chunk_sizer.log_df(trace_label, "raw_utilities", None)
 
-    if have_trace_targets:
-        state.tracing.trace_df(
-            nested_probabilities,
-            "%s.nested_probabilities" % trace_label,
-            column_labels=["alternative", "probability"],
+        if have_trace_targets:
+            state.tracing.trace_df(
+                nested_exp_utilities,
+                "%s.nested_exp_utilities" % trace_label,
+                column_labels=["alternative", "utility"],
+            )
+
+        # probabilities of alternatives relative to siblings sharing the same nest
+        nested_probabilities = compute_nested_probabilities(
+            state, nested_exp_utilities, nest_spec, trace_label=trace_label
         )
+        chunk_sizer.log_df(trace_label, "nested_probabilities", nested_probabilities)
 
-    # global (flattened) leaf probabilities based on relative nest coefficients (in spec order)
-    base_probabilities = compute_base_probabilities(
-        nested_probabilities, nest_spec, spec
-    )
-    chunk_sizer.log_df(trace_label, "base_probabilities", base_probabilities)
+        if want_logsums:
+            # logsum of nest root
+            logsums = pd.Series(
+                np.log(nested_exp_utilities.root), index=nested_exp_utilities.index
+            )
+            chunk_sizer.log_df(trace_label, "logsums", logsums)
 
-    del nested_probabilities
-    chunk_sizer.log_df(trace_label, "nested_probabilities", None)
+        del nested_exp_utilities
+        chunk_sizer.log_df(trace_label, "nested_exp_utilities", None)
 
-    if have_trace_targets:
-        state.tracing.trace_df(
-            base_probabilities,
-            "%s.base_probabilities" % trace_label,
-            column_labels=["alternative", "probability"],
+        if have_trace_targets:
+            state.tracing.trace_df(
+                nested_probabilities,
+                "%s.nested_probabilities" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
+
+        # global (flattened) leaf probabilities based on relative nest coefficients (in spec order)
+        base_probabilities = compute_base_probabilities(
+            nested_probabilities, nest_spec, spec
         )
+        chunk_sizer.log_df(trace_label, "base_probabilities", base_probabilities)
+
+        del nested_probabilities
+        chunk_sizer.log_df(trace_label, "nested_probabilities", None)
+
+        if have_trace_targets:
+            state.tracing.trace_df(
+                base_probabilities,
+                "%s.base_probabilities" % trace_label,
+                column_labels=["alternative", "probability"],
+            )
 
     # note base_probabilities could all be zero since we allowed all probs for nests to be zero
     # check here to print a clear message but make_choices will raise error if probs don't sum to 1
@@ -1726,6 +2049,271 @@ def simple_simulate_by_chunk_id(
     return choices
 
 
+def eval_segment_coefficients(
+    state: workflow.State,
+    spec: pd.DataFrame,
+    segment_coefficients: dict,
+) -> pd.DataFrame:
+    """
+    Evaluate the coefficients of a spec for several segments side by side.
+
+    Parameters
+    ----------
+    spec : pandas.DataFrame
+        spec with coefficient names, with a column for each alternative
+    segment_coefficients : dict
+        coefficients for each segment, as returned by get_segment_coefficients
+
+    Returns
+    -------
+    pandas.DataFrame
+        one column per (segment, alternative), with the columns of the first
+        segment first, then the second segment, and so on.  Columns are named
+        "<segment>.<alternative>".  Rows that are zero for every segment are
+        dropped, unless sharrow is enabled.
+    """
+    segment_specs = [
+        eval_coefficients(state, spec, coefficients, None)
+        for coefficients in segment_coefficients.values()
+    ]
+    wide_spec = pd.concat(segment_specs, axis=1, keys=range(len(segment_specs)))
+    wide_spec = wide_spec.reindex(spec.index[spec.index.isin(wide_spec.index)])
+    wide_spec = wide_spec.fillna(0)
+    wide_spec.columns = [
+        f"{segment}.{alt}" for segment in segment_coefficients for alt in spec.columns
+    ]
+    return wide_spec
+
+
+def simple_simulate_by_segment(
+    state: workflow.State,
+    choosers,
+    spec,
+    nest_spec,
+    segment_column,
+    segment_coefficients,
+    skims=None,
+    locals_d=None,
+    log_alt_losers=False,
+    want_logsums=False,
+    trace_label=None,
+    trace_choice_name=None,
+    trace_column_names=None,
+    compute_settings: ComputeSettings | None = None,
+):
+    """
+    Run an MNL or NL simulation for choosers in several segments with one shared spec.
+
+    This gives the same choices as slicing the choosers by segment and calling
+    simple_simulate on each slice with that segment's coefficients, but the spec
+    expressions (and any sharrow flow) are only evaluated once for all choosers.
+    The utilities for every segment are computed side by side, and each chooser's
+    own segment is then picked out with an index gather.  Only the nested logit
+    step is run separately for each segment, since the nesting coefficients may
+    differ.
+
+    Spec expressions must not depend on the segment, e.g. by referring to
+    coefficients in `locals_d`.  Estimation and custom choosers are not supported.
+
+    Parameters
+    ----------
+    choosers : pandas.DataFrame
+    spec : pandas.DataFrame
+        spec with coefficient names (not values) in the alternative columns
+    nest_spec:
+        for nested logit (nl): nesting structure with coefficient names
+        for multinomial logit (mnl): None
+    segment_column : str
+        column of `choosers` with the segment of each chooser
+    segment_coefficients : dict
+        coefficients for each segment, as returned by get_segment_coefficients,
+        keyed by the values in `segment_column`
+    skims, locals_d, log_alt_losers, want_logsums, trace_label,
+    trace_choice_name, trace_column_names, compute_settings :
+        as for simple_simulate
+
+    Returns
+    -------
+    choices : pandas.Series or pandas.DataFrame
+        Index will be that of `choosers`, values will match the columns
+        of `spec`.  If `want_logsums`, a DataFrame with "choice" and "logsum"
+        columns.
+    """
+    trace_label = tracing.extend_trace_label(trace_label, "simple_simulate_by_segment")
+
+    assert len(choosers) > 0
+
+    if compute_settings is None:
+        compute_settings = ComputeSettings()
+
+    segments = list(segment_coefficients)
+    n_alts = len(spec.columns)
+    wide_spec = eval_segment_coefficients(state, spec, segment_coefficients)
+
+    if nest_spec is not None:
+        # eval_nest_coefficients fills in the coefficients in place
+        segment_nest_specs = [
+            eval_nest_coefficients(
+                copy.deepcopy(nest_spec), segment_coefficients[segment], trace_label
+            )
+            for segment in segments
+        ]
+
+    result_list = []
+    for (
+        _i,
+        chooser_chunk,
+        chunk_trace_label,
+        chunk_sizer,
+    ) in chunk.adaptive_chunked_choosers(state, choosers, trace_label):
+        segment_codes = pd.Categorical(
+            chooser_chunk[segment_column], categories=segments
+        ).codes
+        if (segment_codes < 0).any():
+            unknown = chooser_chunk.loc[segment_codes < 0, segment_column].unique()
+            raise ValueError(
+                f"{chunk_trace_label}: no coefficients for segments {list(unknown)}"
+            )
+
+        if skims is not None:
+            set_skim_wrapper_targets(chooser_chunk, skims)
+
+        have_trace_targets = state.tracing.has_trace_targets(chooser_chunk)
+
+        if (not have_trace_targets) and compute_settings.drop_unused_columns:
+            chooser_chunk = util.drop_unused_columns(
+                chooser_chunk,
+                wide_spec,
+                locals_d,
+                None,
+                sharrow_enabled=state.settings.sharrow,
+                additional_columns=compute_settings.protect_columns,
+            )
+
+        if nest_spec is not None:
+            chooser_chunk, wide_spec_sh = _preprocess_tvpb_logsums_on_choosers(
+                chooser_chunk, wide_spec, locals_d or {}
+            )
+        else:
+            wide_spec_sh = wide_spec
+
+        if have_trace_targets:
+            state.tracing.trace_df(chooser_chunk, "%s.choosers" % chunk_trace_label)
+
+        wide_utilities = eval_utilities(
+            state,
+            wide_spec_sh,
+            chooser_chunk,
+            locals_d,
+            log_alt_losers=log_alt_losers,
+            trace_label=chunk_trace_label,
+            have_trace_targets=have_trace_targets,
+            trace_column_names=trace_column_names,
+            spec_sh=wide_spec_sh,
+            chunk_sizer=chunk_sizer,
+            compute_settings=compute_settings,
+        )
+        chunk_sizer.log_df(chunk_trace_label, "wide_utilities", wide_utilities)
+
+        # gather the utilities of each chooser's own segment
+        utilities = pd.DataFrame(
+            np.take_along_axis(
+                wide_utilities.values,
+                segment_codes[:, None] * n_alts + np.arange(n_alts),
+                axis=1,
+            ),
+            index=chooser_chunk.index,
+            columns=spec.columns,
+        )
+        chunk_sizer.log_df(chunk_trace_label, "utilities", utilities)
+
+        del wide_utilities
+        chunk_sizer.log_df(chunk_trace_label, "wide_utilities", None)
+
+        if have_trace_targets:
+            state.tracing.trace_df(
+                utilities,
+                "%s.utilities" % chunk_trace_label,
+                column_labels=["alternative", "utility"],
+            )
+
+        if nest_spec is None:
+            # before making choices, which may overwrite the utilities in place
+            if want_logsums:
+                logsums = logit.utils_to_logsums(utilities)
+                chunk_sizer.log_df(chunk_trace_label, "logsums", logsums)
+            choices = _mnl_choices(
+                state,
+                utilities,
+                chooser_chunk,
+                spec,
+                None,
+                have_trace_targets=have_trace_targets,
+                trace_label=chunk_trace_label,
+                trace_choice_name=trace_choice_name,
+                chunk_sizer=chunk_sizer,
+                compute_settings=compute_settings,
+            )
+            if want_logsums:
+                choices = choices.to_frame("choice")
+                choices["logsum"] = logsums
+        else:
+            if have_trace_targets:
+                trace_targets = state.tracing.trace_targets(chooser_chunk).values
+            choice_values = np.empty(len(utilities), dtype=np.int64)
+            logsum_values = np.empty(len(utilities)) if want_logsums else None
+            for code, segment in enumerate(segments):
+                rows = np.flatnonzero(segment_codes == code)
+                if len(rows) == 0:
+                    continue
+                segment_have_trace_targets = (
+                    have_trace_targets and trace_targets[rows].any()
+                )
+                segment_choices = _nl_choices(
+                    state,
+                    utilities.iloc[rows],
+                    # choosers only need to line up with the utilities for tracing
+                    chooser_chunk.iloc[rows]
+                    if segment_have_trace_targets
+                    else chooser_chunk,
+                    spec,
+                    segment_nest_specs[code],
+                    None,
+                    want_logsums=want_logsums,
+                    have_trace_targets=segment_have_trace_targets,
+                    trace_label=tracing.extend_trace_label(
+                        chunk_trace_label, str(segment)
+                    ),
+                    trace_choice_name=trace_choice_name,
+                    chunk_sizer=chunk_sizer,
+                    compute_settings=compute_settings,
+                )
+                if want_logsums:
+                    choice_values[rows] = segment_choices["choice"].values
+                    logsum_values[rows] = segment_choices["logsum"].values
+                else:
+                    choice_values[rows] = segment_choices.values
+
+            choices = pd.Series(choice_values, index=utilities.index)
+            if want_logsums:
+                choices = choices.to_frame("choice")
+                choices["logsum"] = logsum_values
+
+        del utilities
+        chunk_sizer.log_df(chunk_trace_label, "utilities", None)
+
+        result_list.append(choices)
+
+        chunk_sizer.log_df(trace_label, "result_list", result_list)
+
+    if len(result_list) > 1:
+        choices = pd.concat(result_list)
+
+    assert len(choices.index) == len(choosers.index)
+
+    return choices
+
+
 def eval_mnl_logsums(
     state: workflow.State,
     choosers,
@@ -1920,21 +2508,46 @@ def eval_nl_logsums(
             column_labels=["alternative", "utility"],
         )
 
-    # - exponentiated utilities of leaves and nests
-    nested_exp_utilities = compute_nested_exp_utilities(raw_utilities, nest_spec)
-    chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
+    if compute_settings is not None and compute_settings.fused_logit:
+        _, logsums = logit.nested_logit_probabilities(
+            state,
+            raw_utilities,
+            nest_spec,
+            trace_label=trace_label,
+            trace_choosers=choosers,
+        )
+        chunk_sizer.log_df(trace_label, "logsums", logsums)
 
-    del raw_utilities  # done with raw_utilities
-    chunk_sizer.log_df(trace_label, "raw_utilities", None)
+        if have_trace_targets:
+            # intermediate nest values are only computed for the traced rows
+            nested_exp_utilities = compute_nested_exp_utilities(
+                raw_utilities[state.tracing.trace_targets(choosers)],
+                nest_spec,
+                compute_settings,
+            )
+        else:
+            nested_exp_utilities = None
 
-    # - logsums
-    logsums = np.log(nested_exp_utilities.root)
-    logsums = pd.Series(logsums, index=choosers.index)
-    chunk_sizer.log_df(trace_label, "logsums", logsums)
+        del raw_utilities  # done with raw_utilities
+        chunk_sizer.log_df(trace_label, "raw_utilities", None)
+    else:
+        # - exponentiated utilities of leaves and nests
+        nested_exp_utilities = compute_nested_exp_utilities(
+            raw_utilities, nest_spec, compute_settings
+        )
+        chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
+
+        del raw_utilities  # done with raw_utilities
+        chunk_sizer.log_df(trace_label, "raw_utilities", None)
+
+        # - logsums
+        logsums = np.log(nested_exp_utilities.root)
+        logsums = pd.Series(logsums, index=choosers.index)
+        chunk_sizer.log_df(trace_label, "logsums", logsums)
 
     if have_trace_targets:
         # add logsum to nested_exp_utilities for tracing
-        nested_exp_utilities["logsum"] = logsums
+        nested_exp_utilities["logsum"] = logsums.reindex(nested_exp_utilities.index)
         state.tracing.trace_df(
             nested_exp_utilities,
             "%s.nested_exp_utilities" % trace_label,
@@ -2043,6 +2656,39 @@ def simple_simulate_logsums(
     assert len(choosers) > 0
     chunk_tag = chunk_tag or trace_label
 
+    # - look up logsums of repeated choosers in the shared logsum cache
+    # (only when unused columns are dropped, otherwise logsums may depend on
+    # any chooser column and the used columns are not a complete key)
+    logsum_cache = None
+    cache_settings = compute_settings or ComputeSettings()
+    if (
+        state.settings.logsum_cache_size > 0
+        and cache_settings.drop_unused_columns
+        and not state.tracing.has_trace_targets(choosers)
+    ):
+        logsum_cache = state.get_injectable("logsum_cache")
+        protect_columns = cache_settings.protect_columns
+        key_columns = logsum_key_columns(
+            choosers,
+            spec,
+            locals_d,
+            skims,
+            sharrow_enabled=state.settings.sharrow,
+            protect_columns=protect_columns,
+        )
+        namespace = logsum_cache.namespace(
+            spec, nest_spec, locals_d, key_columns, protect_columns
+        )
+        keys = logsum_cache.row_keys(choosers[key_columns])
+        found, cached_logsums = logsum_cache.get(namespace, keys)
+        logger.debug(
+            f"{trace_label} found {found.sum()} of {len(found)} logsums in cache"
+        )
+        if found.all():
+            return pd.Series(cached_logsums, index=choosers.index)
+        full_index = choosers.index
+        choosers = choosers[~found]
+
     result_list = []
     # segment by person type and pick the right spec for each person type
     for (
@@ -2079,4 +2725,9 @@ def simple_simulate_logsums(
 
     assert len(logsums.index == len(choosers.index))
 
+    if logsum_cache is not None:
+        logsum_cache.put(namespace, keys[~found], logsums.to_numpy())
+        cached_logsums[~found] = logsums.to_numpy()
+        logsums = pd.Series(cached_logsums, index=full_index)
+
     return logsums
@@ -0,0 +1,418 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from activitysim.core import skim_dictionary, util
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_SKIM_CACHE_FORMAT = 1
+
+# target uncompressed size of the row chunks of a skim that are compressed
+# (and decompressed on lookup) together
+COMPRESSED_CHUNK_BYTES = 1 << 20
+
+# decompressed chunks kept in memory by CompressedSkimData
+COMPRESSED_CHUNK_CACHE_BYTES = 1 << 28
+
+SOURCE_HASH_READ_BYTES = 1 << 24
+
+
+def file_hash(path):
+    """
+    Return the blake2b hash of the contents of a file.
+    """
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(SOURCE_HASH_READ_BYTES)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+
+def source_file_hashes(source_paths, known=None):
+    """
+    Return a record of the size, modification time and content hash of files.
+
+    The contents of a file are only hashed if its size or modification time
+    differ from its record in `known`, so checking unchanged sources is cheap.
+
+    Parameters
+    ----------
+    source_paths : Collection[Path-like]
+    known : list of dict, optional
+        records of the same files, as previously returned by this function
+
+    Returns
+    -------
+    list of dict
+    """
+    known = {r["name"]: r for r in known or []}
+    records = []
+    for path in source_paths:
+        stat = os.stat(path)
+        name = os.path.basename(path)
+        record = {"name": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        prior = known.get(name)
+        if (
+            prior is not None
+            and prior.get("size") == record["size"]
+            and prior.get("mtime_ns") == record["mtime_ns"]
+        ):
+            record["blake2b"] = prior["blake2b"]
+        else:
+            t0 = time.time()
+            record["blake2b"] = file_hash(path)
+            logger.info(f"hashed {path} in {time.time() - t0:.1f} seconds")
+        records.append(record)
+    return records
+
+
+def sources_match(recorded, source_paths):
+    """
+    Check whether files have the same contents as when recorded.
+
+    Parameters
+    ----------
+    recorded : list of dict or None
+        records of the sources, as returned by `source_file_hashes`
+    source_paths : Collection[Path-like]
+
+    Returns
+    -------
+    bool
+    """
+    if not recorded or len(recorded) != len(source_paths):
+        return False
+    current = source_file_hashes(source_paths, known=recorded)
+    return [(r["name"], r["blake2b"]) for r in current] == [
+        (r["name"], r["blake2b"]) for r in recorded
+    ]
+
+
+def _write_json(path, content):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def cache_sources_path(cache_path):
+    """
+    Path of the manifest of the source files of a cache file (or directory).
+    """
+    return f"{os.fspath(cache_path).rstrip(os.sep)}.sources.json"
+
+
+def write_cache_sources(cache_path, source_paths):
+    """
+    Record the source files a cache file was built from, next to it.
+    """
+    _write_json(
+        cache_sources_path(cache_path), {"sources": source_file_hashes(source_paths)}
+    )
+
+
+def cache_is_valid(cache_path, source_paths):
+    """
+    Check that a cache file exists and was built from the current source files.
+
+    Caches without a source manifest are not valid, so they get rebuilt.
+    """
+    if not os.path.exists(cache_path):
+        return False
+    try:
+        with open(cache_sources_path(cache_path)) as f:
+            recorded = json.load(f).get("sources")
+    except (FileNotFoundError, ValueError):
+        logger.info(f"no source manifest for cache {cache_path}")
+        return False
+    if not sources_match(recorded, source_paths):
+        logger.info(f"cache {cache_path} is out of date with its sources")
+        return False
+    return True
+
+
+def get_codec(codec):
+    """
+    Return a numcodecs codec for the skim_cache_compression setting.
+
+    Parameters
+    ----------
+    codec : str or dict
+        name of a codec (e.g. 'zstd' or 'lz4'), or a numcodecs codec config
+        (e.g. {'id': 'blosc', 'cname': 'zstd', 'clevel': 5, 'shuffle': 1})
+
+    Returns
+    -------
+    numcodecs.abc.Codec
+    """
+    try:
+        import numcodecs
+    except ModuleNotFoundError:
+        raise RuntimeError(
+            "the 'numcodecs' package is not installed, "
+            "cannot use compressed skim caches"
+        )
+    if isinstance(codec, str):
+        codec = {"id": codec}
+    return numcodecs.get_codec(dict(codec))
+
+
+class CompressedSkimCache:
+    """
+    On disk cache of skim data, compressed in chunks that can be read on their own.
+
+    Each skim (block) of the 3D skim data is split into chunks of origin rows,
+    and each chunk is compressed on its own and appended to the data file.  A
+    json manifest next to the data file records the shape and dtype of the
+    skim data, the codec, the offset and size of each chunk in the data file,
+    and the size, modification time and content hash of the omx files the
+    skims were read from.  A cache is only used while its omx files have the
+    same contents.
+
+    Parameters
+    ----------
+    path : Path-like
+        path of the data file, the manifest path adds a '.json' suffix
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest_path = Path(f"{self.path}.json")
+        self.manifest = None
+
+    def open(self, skim_info, source_paths):
+        """
+        Open the cache if it holds skim_info's skims read from source_paths.
+
+        Returns
+        -------
+        bool
+            whether the cache is valid and open
+        """
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            logger.info(f"compressed skim cache not found: {self.manifest_path}")
+            return False
+
+        if (
+            manifest.get("format") != COMPRESSED_SKIM_CACHE_FORMAT
+            or tuple(manifest["shape"]) != tuple(skim_info.skim_data_shape)
+            or manifest["dtype"] != skim_info.dtype_name
+            or not os.path.isfile(self.path)
+        ):
+            logger.info(f"ignoring incompatible compressed skim cache {self.path}")
+            return False
+
+        if not sources_match(manifest["sources"], source_paths):
+            logger.info(
+                f"ignoring compressed skim cache {self.path}, omx files have changed"
+            )
+            return False
+
+        self.manifest = manifest
+        return True
+
+    @property
+    def shape(self):
+        return tuple(self.manifest["shape"])
+
+    @property
+    def dtype(self):
+        return np.dtype(self.manifest["dtype"])
+
+    @property
+    def rows_per_chunk(self):
+        return self.manifest["rows_per_chunk"]
+
+    @property
+    def chunks_per_block(self):
+        return -(-self.shape[1] // self.rows_per_chunk)
+
+    def codec(self):
+        return get_codec(self.manifest["codec"])
+
+    @staticmethod
+    def rows_per_chunk_for(shape, dtype):
+        row_bytes = max(util.iprod(shape[2:]) * np.dtype(dtype).itemsize, 1)
+        return int(max(1, min(shape[1], COMPRESSED_CHUNK_BYTES // row_bytes)))
+
+    def write(self, skim_info, codec, source_paths, read_block):
+        """
+        Write the cache, one skim at a time.
+
+        Parameters
+        ----------
+        skim_info : SkimInfo
+        codec : str or dict
+            the skim_cache_compression setting
+        source_paths : Collection[Path-like]
+            omx files the skims are read from
+        read_block : Callable[[int], numpy.ndarray]
+            returns the 2D skim data of a block offset
+        """
+        # chunks are origin rows of a skim, in the row major skim layout
+        assert skim_dictionary.ROW_MAJOR_LAYOUT
+        shape = tuple(skim_info.skim_data_shape)
+        rows_per_chunk = self.rows_per_chunk_for(shape, skim_info.dtype_name)
+        compressor = get_codec(codec)
+
+        logger.info(
+            f"writing compressed skim cache {skim_info.skim_tag} {shape} to {self.path}"
+        )
+        t0 = time.time()
+        chunks = []
+        offset = 0
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for block in range(shape[0]):
+                data = np.ascontiguousarray(read_block(block))
+                for row in range(0, shape[1], rows_per_chunk):
+                    compressed = compressor.encode(data[row : row + rows_per_chunk])
+                    f.write(compressed)
+                    chunks.append((offset, len(compressed)))
+                    offset += len(compressed)
+        os.replace(tmp_path, self.path)
+
+        self.manifest = {
+            "format": COMPRESSED_SKIM_CACHE_FORMAT,
+            "skim_tag": skim_info.skim_tag,
+            "shape": shape,
+            "dtype": skim_info.dtype_name,
+            "rows_per_chunk": rows_per_chunk,
+            "codec": compressor.get_config(),
+            "chunks": chunks,
+            "sources": source_file_hashes(source_paths),
+        }
+        # the manifest is written last, so a partly written cache is never used
+        _write_json(self.manifest_path, self.manifest)
+
+        uncompressed = util.iprod(shape) * np.dtype(skim_info.dtype_name).itemsize
+        logger.info(
+            f"wrote compressed skim cache {skim_info.skim_tag} in "
+            f"{time.time() - t0:.1f} seconds, {util.GB(uncompressed)} compressed "
+            f"to {util.GB(offset)} ({uncompressed / max(offset, 1):.1f}x)"
+        )
+
+    def read_chunk(self, f, chunk, codec=None):
+        """
+        Return the decompressed rows of a chunk, read from open data file f.
+        """
+        offset, nbytes = self.manifest["chunks"][chunk]
+        f.seek(offset)
+        compressed = f.read(nbytes)
+        first_row = (chunk % self.chunks_per_block) * self.rows_per_chunk
+        rows = min(self.rows_per_chunk, self.shape[1] - first_row)
+        out = np.empty((rows,) + self.shape[2:], dtype=self.dtype)
+        (codec or self.codec()).decode(compressed, out=out)
+        return out
+
+    def read_into(self, skim_data, num_threads=None):
+        """
+        Decompress the whole cache into skim_data (e.g. a shared memory skim buffer).
+
+        Chunks are decompressed by a pool of threads, as the numcodecs codecs
+        release the GIL.
+        """
+        assert tuple(skim_data.shape) == self.shape
+        t0 = time.time()
+        num_chunks = len(self.manifest["chunks"])
+        num_threads = num_threads or min(8, os.cpu_count() or 1)
+        local = threading.local()
+
+        def read(chunk):
+            if not hasattr(local, "f"):
+                local.f = open(self.path, "rb")
+                local.codec = self.codec()
+            block, row_chunk = divmod(chunk, self.chunks_per_block)
+            row = row_chunk * self.rows_per_chunk
+            data = self.read_chunk(local.f, chunk, local.codec)
+            skim_data[block, row : row + len(data)] = data
+            return local.f
+
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            files = set(pool.map(read, range(num_chunks)))
+        for f in files:
+            f.close()
+
+        logger.info(
+            f"read compressed skim cache {self.path} "
+            f"{util.GB(skim_data.nbytes)} in {time.time() - t0:.1f} seconds"
+        )
+
+
+class CompressedSkimData:
+    """
+    3D ndarray quack-alike that reads skim values from a compressed skim cache.
+
+    Only the chunks of origin rows holding the values that are looked up are
+    decompressed, and the most recently used chunks are kept in memory (up to
+    COMPRESSED_CHUNK_CACHE_BYTES) for later lookups.
+    """
+
+    def __init__(self, cache, cache_bytes=COMPRESSED_CHUNK_CACHE_BYTES):
+        self.cache = cache
+        self.dtype = cache.dtype
+        self._shape = cache.shape
+        self._codec = cache.codec()
+        self._chunks = OrderedDict()
+        self._chunk_bytes = 0
+        self._cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self._shape
+
+    def _chunk(self, f, chunk):
+        data = self._chunks.get(chunk)
+        if data is None:
+            data = self.cache.read_chunk(f, chunk, self._codec)
+            self._chunks[chunk] = data
+            self._chunk_bytes += data.nbytes
+            while self._chunk_bytes > self._cache_bytes and len(self._chunks) > 1:
+                _, dropped = self._chunks.popitem(last=False)
+                self._chunk_bytes -= dropped.nbytes
+        else:
+            self._chunks.move_to_end(chunk)
+        return data
+
+    def __getitem__(self, indexes):
+        assert len(indexes) == 3, f"number of indexes ({len(indexes)}) should be 3"
+        block, orig, dest = np.broadcast_arrays(*indexes)
+        shape = block.shape
+        # negative indexes wrap around, as they do for numpy arrays
+        block = block.ravel().astype(np.int64) % self._shape[0]
+        orig = orig.ravel().astype(np.int64) % self._shape[1]
+        dest = dest.ravel().astype(np.int64) % self._shape[2]
+
+        rows_per_chunk = self.cache.rows_per_chunk
+        chunk_ids = block * self.cache.chunks_per_block + orig // rows_per_chunk
+        order = np.argsort(chunk_ids, kind="stable")
+        unique_chunks, starts = np.unique(chunk_ids[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        result = np.empty(len(order), dtype=self.dtype)
+        with self._lock, open(self.cache.path, "rb") as f:
+            for chunk, start, end in zip(unique_chunks, starts, ends):
+                i = order[start:end]
+                data = self._chunk(f, int(chunk))
+                result[i] = data[orig[i] % rows_per_chunk, dest[i]]
+        return result.reshape(shape)
@@ -17,6 +17,17 @@ from activitysim.core import config
 from activitysim.core import flow as __flow  # noqa: 401
 from activitysim.core import workflow
 from activitysim.core.input import read_input_file
+from activitysim.core.skim_cache import (
+    cache_is_valid,
+    cache_sources_path,
+    write_cache_sources,
+)
+from activitysim.core.skim_dictionary import (
+    SORTED_LOOKUP_MIN_SIZE,
+    origin_block_order,
+    scatter_sorted,
+)
+from activitysim.core.sparse_skims import SparseMazSkims
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +37,18 @@ POSITIONS_AS_DICT = True
 class SkimDataset:
     """
     A wrapper around xarray.Dataset containing skim data, with time period management.
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+    sorted_lookups : bool, default False
+        Gather the values of large lookups in origin order, see
+        the `sorted_skim_lookups` network setting.
     """
 
-    def __init__(self, dataset):
+    def __init__(self, dataset, sorted_lookups=False):
         self.dataset = dataset
+        self.sorted_lookups = sorted_lookups
         self.time_map = {
             j: i for i, j in enumerate(self.dataset.indexes["time_period"])
         }
@@ -75,7 +94,13 @@ class SkimDataset:
         -------
         DatasetWrapper
         """
-        return DatasetWrapper(self.dataset, orig_key, dest_key, time_map=self.time_map)
+        return DatasetWrapper(
+            self.dataset,
+            orig_key,
+            dest_key,
+            time_map=self.time_map,
+            sorted_lookups=self.sorted_lookups,
+        )
 
     def wrap_3d(self, orig_key, dest_key, dim3_key):
         """
@@ -90,7 +115,12 @@ class SkimDataset:
         DatasetWrapper
         """
         return DatasetWrapper(
-            self.dataset, orig_key, dest_key, dim3_key, time_map=self.time_map
+            self.dataset,
+            orig_key,
+            dest_key,
+            dim3_key,
+            time_map=self.time_map,
+            sorted_lookups=self.sorted_lookups,
         )
 
     def lookup(self, orig, dest, key):
@@ -135,13 +165,23 @@ class SkimDataset:
             else:
                 raise KeyError(key)
 
+        order = None
+        if self.sorted_lookups and len(orig) >= SORTED_LOOKUP_MIN_SIZE:
+            # gather origin by origin, then put values back in chooser order
+            order = origin_block_order(orig)
+            orig, dest = orig[order], dest[order]
+            positions = {k: v[order] for k, v in positions.items()}
+
         result = self.dataset.iat(
             **positions, _name=key
         )  # Dataset.iat as implemented by sharrow strips data encoding
 
         if some_missing:
             result[(orig < 0) | (dest < 0)] = np.nan
-        result = result.to_series()
+        if order is not None:
+            result = pd.Series(scatter_sorted(result.to_numpy(), order))
+        else:
+            result = result.to_series()
 
         if use_index is not None:
             result.index = use_index
@@ -170,9 +210,20 @@ class DatasetWrapper:
     time_map : Mapping, optional
         A mapping from time period index numbers to (more aggregate) time
         period names.
+    sorted_lookups : bool, default False
+        Gather the values of large lookups in origin order.
     """
 
-    def __init__(self, dataset, orig_key, dest_key, time_key=None, *, time_map=None):
+    def __init__(
+        self,
+        dataset,
+        orig_key,
+        dest_key,
+        time_key=None,
+        *,
+        time_map=None,
+        sorted_lookups=False,
+    ):
         """
         Mimics the SkimWrapper interface to allow legacy code to access data.
 
@@ -182,6 +233,8 @@ class DatasetWrapper:
         self.dest_key = dest_key
         self.time_key = time_key
         self.df = None
+        self.sorted_lookups = sorted_lookups
+        self._lookup_orders = {}  # origin sort order of df, by reverse flag
         if time_map is None:
             self.time_map = {
                 j: i for i, j in enumerate(self.dataset.indexes["time_period"])
@@ -240,6 +293,7 @@ class DatasetWrapper:
                 self.time_key in df
             ), f"time_key '{self.time_key}' not in df columns: {list(df.columns)}"
         self.df = df
+        self._lookup_orders = {}
 
         # TODO allow offsets if needed
         positions = {
@@ -343,6 +397,14 @@ class DatasetWrapper:
             else:
                 raise KeyError(key)
 
+        order = self._lookup_order(x, reverse)
+        if order is not None:
+            x = {k: np.asanyarray(v)[order] for k, v in x.items()}
+            result = self.dataset.iat(**x, _name=key)
+            return pd.Series(
+                scatter_sorted(result.to_numpy(), order), index=self.df.index
+            )
+
         result = self.dataset.iat(**x, _name=key)  # iat strips data encoding
         # if 'digital_encoding' in self.dataset[key].attrs:
         #     result = array_decode(result, self.dataset[key].attrs['digital_encoding'])
@@ -352,6 +414,25 @@ class DatasetWrapper:
         out.index = self.df.index
         return out
 
+    def _lookup_order(self, x, reverse):
+        """
+        Origin sort order of the positions, if lookups are sorted.
+
+        The order depends only on the df, so it is found once per direction
+        and reused for every skim looked up.
+        """
+        if not (
+            self.sorted_lookups
+            and isinstance(x, dict)
+            and len(self.df) >= SORTED_LOOKUP_MIN_SIZE
+        ):
+            return None
+        if reverse not in self._lookup_orders:
+            self._lookup_orders[reverse] = origin_block_order(
+                np.asanyarray(x[self.odim])
+            )
+        return self._lookup_orders[reverse]
+
     def reverse(self, key):
         """
         return skim value in reverse (d-o) direction
@@ -392,8 +473,9 @@ def _should_invalidate_cache_file(cache_filename, *source_filenames):
     """
     Check if a cache file should be invalidated.
 
-    It should be invalidated if any source file has a modification time
-    more recent than the cache file modification time.
+    It should be invalidated if it does not exist, or if the contents of any
+    source file differ from those recorded in the source manifest written
+    next to the cache file when it was created (or if there is no manifest).
 
     Parameters
     ----------
@@ -404,18 +486,7 @@ def _should_invalidate_cache_file(cache_filename, *source_filenames):
     -------
     bool
     """
-    from stat import ST_MTIME
-
-    try:
-        stat0 = os.stat(cache_filename)
-    except FileNotFoundError:
-        # cache file does not even exist
-        return True
-    for i in source_filenames:
-        stat1 = os.stat(i)
-        if stat0[ST_MTIME] < stat1[ST_MTIME]:
-            return True
-    return False
+    return not cache_is_valid(cache_filename, source_filenames)
 
 
 def _use_existing_backing_if_valid(backing, omx_file_paths, skim_tag):
@@ -431,10 +502,9 @@ def _use_existing_backing_if_valid(backing, omx_file_paths, skim_tag):
         and instead the backing string is used as the key to find
         the data in ephemeral shared memory.
     omx_file_paths : Collection[Path-like]
-        These are the original source files.  If the file modification
-        time for any of these files is more recent than the memmap,
-        the memmap files are invalid and will be deleted so they
-        can be rebuilt.
+        These are the original source files.  If the contents of any of
+        these files have changed since the memmap was written, the memmap
+        files are invalid and will be deleted so they can be rebuilt.
     skim_tag : str
         For error message reporting only
 
@@ -446,7 +516,7 @@ def _use_existing_backing_if_valid(backing, omx_file_paths, skim_tag):
     if backing.startswith("memmap:"):
         # when working with a memmap, check if the memmap file on disk
         # needs to be invalidated, because the source skims have been
-        # modified more recently.
+        # modified since it was written.
         if not _should_invalidate_cache_file(backing[7:], *omx_file_paths):
             try:
                 out = sh.Dataset.shm.from_shared_memory(backing, mode="r")
@@ -671,18 +741,19 @@ def load_sparse_maz_skims(
             if remapper is not None:
                 df.OMAZ = df.OMAZ.map(remapper.get)
                 df.DMAZ = df.DMAZ.map(remapper.get)
-            for colname in df.columns:
-                if colname in ["OMAZ", "DMAZ"]:
-                    continue
+            # sorts the od pairs by origin, and checks for duplicates
+            maz_to_maz = SparseMazSkims.from_tables([df])
+            omaz = maz_to_maz.origins()
+            for colname, values in zip(maz_to_maz.attributes, maz_to_maz.data):
                 max_blend_distance_i = max_blend_distance.get("DEFAULT", None)
                 max_blend_distance_i = max_blend_distance.get(
                     colname, max_blend_distance_i
                 )
                 dataset.redirection.sparse_blender(
                     colname,
-                    df.OMAZ,
-                    df.DMAZ,
-                    df[colname],
+                    omaz,
+                    maz_to_maz.dests,
+                    values,
                     max_blend_distance=max_blend_distance_i,
                     index=land_use_index,
                 )
@@ -751,26 +822,38 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
         d = _use_existing_backing_if_valid(backing, omx_file_paths, skim_tag)
     else:
         d = None  # skims are not stored in shared memory, so we need to load them
-    do_not_save_zarr = False
+    overwrite_zarr = False
 
     if d is None:
         time_periods = _dedupe_time_periods(network_los_preload)
         if zarr_file:
             logger.info(f"looking for zarr skims at {zarr_file}")
         if zarr_file and os.path.exists(zarr_file):
-            from .util import latest_file_modification_time
-
-            logger.info("found zarr skims, loading them")
-            d = sh.dataset.from_zarr_with_attr(zarr_file)
-            zarr_write_time = d.attrs.get("ZARR_WRITE_TIME", 0)
-            if zarr_write_time < latest_file_modification_time(omx_file_paths):
-                logger.warning("zarr skims older than omx, not using them")
-                do_not_save_zarr = True
-                d = None
+            if not os.path.exists(cache_sources_path(zarr_file)):
+                # zarr skims written before source manifests were recorded
+                # are checked against their write time, and then rebuilt
+                # or given a manifest
+                from .util import latest_file_modification_time
+
+                logger.info("found zarr skims, loading them")
+                d = sh.dataset.from_zarr_with_attr(zarr_file)
+                zarr_write_time = d.attrs.get("ZARR_WRITE_TIME", 0)
+                if zarr_write_time < latest_file_modification_time(omx_file_paths):
+                    logger.warning("zarr skims older than omx, rebuilding them")
+                    overwrite_zarr = True
+                    d = None
+                else:
+                    write_cache_sources(zarr_file, omx_file_paths)
+                    d = d.max_float_precision(max_float_precision)
+            elif _should_invalidate_cache_file(zarr_file, *omx_file_paths):
+                logger.warning("zarr skims not made from current omx, rebuilding them")
+                overwrite_zarr = True
             else:
+                logger.info("found zarr skims, loading them")
+                d = sh.dataset.from_zarr_with_attr(zarr_file)
                 d = d.max_float_precision(max_float_precision)
         if d is None:
-            if zarr_file and not do_not_save_zarr:
+            if zarr_file and not overwrite_zarr:
                 logger.info("did not find zarr skims, loading omx")
             omx_file_handles = [
                 openmatrix.open_file(f, mode="r") for f in omx_file_paths
@@ -802,8 +885,8 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
                         d = _apply_digital_encoding(d, zarr_digital_encoding)
                     logger.info(f"writing zarr skims to {zarr_file}")
                     d.attrs["ZARR_WRITE_TIME"] = time.time()
-                    if not do_not_save_zarr:
-                        d.to_zarr_with_attr(zarr_file)
+                    d.to_zarr_with_attr(zarr_file, mode="w" if overwrite_zarr else "w-")
+                    write_cache_sources(zarr_file, omx_file_paths)
 
         if skim_tag in ("taz", "maz"):
             # load sparse MAZ skims, if any
@@ -902,6 +985,8 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
                 [str(i) for i in omx_file_paths],
                 ignore=state.settings.omx_ignore_patterns,
             )
+        if backing.startswith("memmap:"):
+            write_cache_sources(backing[7:], omx_file_paths)
         for f in omx_file_handles:
             f.close()
         return d_shared_mem
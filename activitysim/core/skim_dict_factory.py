@@ -3,20 +3,93 @@
 # from builtins import int
 from __future__ import annotations
 
+import json
 import logging
 import multiprocessing
 import os
+import threading
+import time
 import warnings
 from abc import ABC
+from pathlib import Path
 
 import numpy as np
 import openmatrix as omx
 
 from activitysim.core import skim_dictionary, util
+from activitysim.core.skim_cache import CompressedSkimCache, CompressedSkimData
 
 logger = logging.getLogger(__name__)
 
 
+def read_omx_cores(omx_file_path, cores, skim_data):
+    """
+    Read skims from an omx file into skim_data.
+
+    Skims are read straight into their slot in skim_data, without an
+    intermediate array, when the slot is contiguous and has the same dtype as
+    the omx matrix.
+
+    Parameters
+    ----------
+    omx_file_path : str
+    cores : list of (omx_key, block_offset)
+    skim_data : numpy.ndarray
+        3D skim data
+
+    Returns
+    -------
+    int
+        number of bytes read
+    """
+    num_bytes = 0
+    with omx.open_file(omx_file_path, mode="r") as omx_file:
+        for omx_key, offset in cores:
+            logger.debug(
+                f"read_omx_cores file {omx_file_path} omx_key {omx_key} to offset {offset}"
+            )
+
+            if skim_dictionary.ROW_MAJOR_LAYOUT:
+                a = skim_data[offset, :, :]
+            else:
+                a = skim_data[:, :, offset]
+
+            omx_data = omx_file[omx_key]
+            if a.flags.c_contiguous and omx_data.dtype == a.dtype:
+                omx_data.read(out=a)
+            else:
+                # this will trigger omx readslice to read and copy data to skim_data's buffer
+                a[:] = omx_data[:]
+            num_bytes += a.nbytes
+
+    return num_bytes
+
+
+def _throughput(num_bytes, seconds):
+    return (
+        f"({util.GB(num_bytes)} in {seconds:.1f} seconds, "
+        f"{num_bytes / max(seconds, 1e-6) / 1e6:,.0f} MB/s)"
+    )
+
+
+# skim data in the shared skim buffer of omx reader processes
+_shared_skim_data = None
+
+
+def _init_omx_reader(skim_buffer, dtype_name, skim_data_shape):
+    global _shared_skim_data
+    _shared_skim_data = np.frombuffer(skim_buffer, dtype=np.dtype(dtype_name))[
+        : util.iprod(skim_data_shape)
+    ].reshape(skim_data_shape)
+
+
+def _read_omx_cores_to_shared_buffer(task):
+    omx_file_path, cores = task
+    t0 = time.time()
+    num_bytes = read_omx_cores(omx_file_path, cores, _shared_skim_data)
+    return omx_file_path, len(cores), num_bytes, time.time() - t0
+
+
 class SkimData(object):
     """
     A facade for 3D skim data exposing numpy indexing and shape
@@ -268,50 +341,103 @@ class AbstractSkimFactory(ABC):
             self.network_los.state.filesystem.get_cache_dir(), f"cached_{skim_tag}.mmap"
         )
 
+    def _compressed_skim_cache(self, skim_tag):
+        return CompressedSkimCache(
+            os.path.join(
+                self.network_los.state.filesystem.get_cache_dir(),
+                f"cached_{skim_tag}.zskims",
+            )
+        )
+
     def load_skim_info(self, state, skim_tag):
         return SkimInfo(state, skim_tag, self.network_los)
 
-    def _read_skims_from_omx(self, skim_info, skim_data):
+    def _omx_cores_by_file(self, skim_info, block_offsets=None):
         """
-        read skims from omx file into skim_data
+        list the (omx_key, block_offset) of the skims to read from each omx file
+
+        if block_offsets is given, only the skims at those offsets are listed
         """
+        if block_offsets is not None:
+            block_offsets = set(block_offsets)
 
-        skim_tag = skim_info.skim_tag
-        omx_keys = skim_info.omx_keys
-        omx_manifest = skim_info.omx_manifest  # dict mapping { omx_key: skim_name }
+        cores = {omx_file_path: [] for omx_file_path in skim_info.omx_file_paths}
+        for skim_key, omx_key in skim_info.omx_keys.items():
+            offset = skim_info.block_offsets[skim_key]
+            if block_offsets is None or offset in block_offsets:
+                cores[skim_info.omx_manifest[omx_key]].append((omx_key, offset))
 
-        for omx_file_path in skim_info.omx_file_paths:
+        return {path: file_cores for path, file_cores in cores.items() if file_cores}
 
-            num_skims_loaded = 0
+    def _read_skims_from_omx(self, skim_info, skim_data, block_offsets=None):
+        """
+        read skims from omx file into skim_data
+
+        if block_offsets is given, only the skims at those offsets are read
+        """
 
+        for omx_file_path, cores in self._omx_cores_by_file(
+            skim_info, block_offsets
+        ).items():
             logger.info(f"_read_skims_from_omx {omx_file_path}")
 
-            # read skims into skim_data
-            with omx.open_file(omx_file_path, mode="r") as omx_file:
-                for skim_key, omx_key in omx_keys.items():
+            t0 = time.time()
+            num_bytes = read_omx_cores(omx_file_path, cores, skim_data)
 
-                    if omx_manifest[omx_key] == omx_file_path:
+            logger.info(
+                f"_read_skims_from_omx loaded {len(cores)} skims from {omx_file_path} "
+                f"{_throughput(num_bytes, time.time() - t0)}"
+            )
 
-                        offset = skim_info.block_offsets[skim_key]
-                        logger.debug(
-                            f"_read_skims_from_omx file {omx_file_path} omx_key {omx_key} "
-                            f"skim_key {skim_key} to offset {offset}"
-                        )
+    def _read_skims_from_omx_in_parallel(
+        self, skim_info, skim_buffer, num_processes, block_offsets=None
+    ):
+        """
+        read skims from omx files into a shared skim_buffer with several processes
 
-                        if skim_dictionary.ROW_MAJOR_LAYOUT:
-                            a = skim_data[offset, :, :]
-                        else:
-                            a = skim_data[:, :, offset]
+        Each process reads a range of the skims of one omx file straight into
+        the shared buffer.  The omx files are read by processes rather than
+        threads because the HDF5 library is not thread safe.
+        """
+        tasks = []
+        for omx_file_path, cores in self._omx_cores_by_file(
+            skim_info, block_offsets
+        ).items():
+            # split each file into ranges of skims, so small numbers of files
+            # still keep all the processes busy
+            num_ranges = max(1, num_processes // len(skim_info.omx_file_paths))
+            for cores_range in np.array_split(np.arange(len(cores)), num_ranges):
+                if len(cores_range):
+                    tasks.append((omx_file_path, [cores[i] for i in cores_range]))
+        if not tasks:
+            return
 
-                        # this will trigger omx readslice to read and copy data to skim_data's buffer
-                        omx_data = omx_file[omx_key]
-                        a[:] = omx_data[:]
+        logger.info(
+            f"_read_skims_from_omx_in_parallel reading {skim_info.skim_tag} skims "
+            f"from {len(skim_info.omx_file_paths)} omx files in {len(tasks)} "
+            f"ranges with {num_processes} processes"
+        )
 
-                        num_skims_loaded += 1
+        t0 = time.time()
+        file_bytes = {}
+        with multiprocessing.Pool(
+            processes=min(num_processes, len(tasks)),
+            initializer=_init_omx_reader,
+            initargs=(skim_buffer, skim_info.dtype_name, skim_info.skim_data_shape),
+        ) as pool:
+            for omx_file_path, num_skims, num_bytes, seconds in pool.imap_unordered(
+                _read_omx_cores_to_shared_buffer, tasks
+            ):
+                logger.info(
+                    f"_read_skims_from_omx_in_parallel loaded {num_skims} skims "
+                    f"from {omx_file_path} {_throughput(num_bytes, seconds)}"
+                )
+                file_bytes[omx_file_path] = file_bytes.get(omx_file_path, 0) + num_bytes
 
-            logger.info(
-                f"_read_skims_from_omx loaded {num_skims_loaded} skims from {omx_file_path}"
-            )
+        logger.info(
+            f"_read_skims_from_omx_in_parallel loaded {skim_info.skim_tag} skims "
+            f"{_throughput(sum(file_bytes.values()), time.time() - t0)}"
+        )
 
     def _open_existing_readonly_memmap_skim_cache(self, skim_info):
         """
@@ -372,6 +498,31 @@ class AbstractSkimFactory(ABC):
         skim_data._mmap.close()
         del skim_data
 
+    def copy_omx_to_compressed_file(self, skim_info):
+        """
+        write a compressed skim cache straight from the omx files, one skim at a time
+        """
+        omx_cores = {
+            offset: (omx_file_path, omx_key)
+            for omx_file_path, cores in self._omx_cores_by_file(skim_info).items()
+            for omx_key, offset in cores
+        }
+        block = np.zeros((1,) + tuple(skim_info.omx_shape), dtype=skim_info.dtype_name)
+
+        def read_block(offset):
+            omx_file_path, omx_key = omx_cores[offset]
+            read_omx_cores(omx_file_path, [(omx_key, 0)], block)
+            return block[0]
+
+        cache = self._compressed_skim_cache(skim_info.skim_tag)
+        cache.write(
+            skim_info,
+            self.network_los.setting("skim_cache_compression"),
+            skim_info.omx_file_paths,
+            read_block,
+        )
+        return cache
+
 
 class NumpyArraySkimFactory(AbstractSkimFactory):
     def __init__(self, network_los):
@@ -404,7 +555,7 @@ class NumpyArraySkimFactory(AbstractSkimFactory):
         dtype = np.dtype(dtype_name)
 
         # multiprocessing.RawArray argument buffer_size must be int, not np.int64
-        buffer_size = util.iprod(skim_info.skim_data_shape)
+        buffer_size = self._buffer_size(skim_info)
 
         csz = buffer_size * dtype.itemsize
         logger.info(
@@ -428,6 +579,12 @@ class NumpyArraySkimFactory(AbstractSkimFactory):
 
         return buffer
 
+    def _buffer_size(self, skim_info):
+        """
+        number of elements in the skim buffer for skim_info
+        """
+        return util.iprod(skim_info.skim_data_shape)
+
     def _skim_data_from_buffer(self, skim_info, skim_buffer):
         """
         return a numpy ndarray using skim_buffer as backing store
@@ -443,12 +600,27 @@ class NumpyArraySkimFactory(AbstractSkimFactory):
         """
 
         dtype = np.dtype(skim_info.dtype_name)
-        assert len(skim_buffer) == util.iprod(skim_info.skim_data_shape)
-        skim_data = np.frombuffer(skim_buffer, dtype=dtype).reshape(
-            skim_info.skim_data_shape
-        )
+        assert len(skim_buffer) == self._buffer_size(skim_info)
+        skim_data = np.frombuffer(skim_buffer, dtype=dtype)[
+            : util.iprod(skim_info.skim_data_shape)
+        ].reshape(skim_info.skim_data_shape)
         return skim_data
 
+    def _read_skims_to_buffer(
+        self, skim_info, skim_buffer, skim_data, block_offsets=None
+    ):
+        """
+        read skims from omx files into skim_buffer, in parallel if it is shared
+        and the skim_read_processes setting is more than 1
+        """
+        num_processes = self.network_los.setting("skim_read_processes", 1)
+        if num_processes > 1 and not isinstance(skim_buffer, np.ndarray):
+            self._read_skims_from_omx_in_parallel(
+                skim_info, skim_buffer, num_processes, block_offsets=block_offsets
+            )
+        else:
+            self._read_skims_from_omx(skim_info, skim_data, block_offsets=block_offsets)
+
     def load_skims_to_buffer(self, skim_info, skim_buffer):
         """
         Load skims from disk store (omx or cache) into ram skim buffer (multiprocessing.RawArray or numpy.ndarray)
@@ -461,11 +633,18 @@ class NumpyArraySkimFactory(AbstractSkimFactory):
 
         read_cache = self.network_los.setting("read_skim_cache", False)
         write_cache = self.network_los.setting("write_skim_cache", False)
+        compression = self.network_los.setting("skim_cache_compression", None)
 
         skim_data = self._skim_data_from_buffer(skim_info, skim_buffer)
         assert skim_data.shape == skim_info.skim_data_shape
 
-        if read_cache:
+        if read_cache and compression:
+            # decompress the whole cache, if it is valid, into skim_buffer
+            cache = self._compressed_skim_cache(skim_info.skim_tag)
+            if cache.open(skim_info, skim_info.omx_file_paths):
+                cache.read_into(skim_data)
+                return
+        elif read_cache:
             # returns None if cache file not found
             cache_data = self._open_existing_readonly_memmap_skim_cache(skim_info)
 
@@ -478,9 +657,16 @@ class NumpyArraySkimFactory(AbstractSkimFactory):
                 return
 
         # read omx skims into skim_buffer (np array)
-        self._read_skims_from_omx(skim_info, skim_data)
-
-        if write_cache:
+        self._read_skims_to_buffer(skim_info, skim_buffer, skim_data)
+
+        if write_cache and compression:
+            self._compressed_skim_cache(skim_info.skim_tag).write(
+                skim_info,
+                compression,
+                skim_info.omx_file_paths,
+                lambda offset: skim_data[offset],
+            )
+        elif write_cache:
             cache_data = self._create_empty_writable_memmap_skim_cache(skim_info)
             np.copyto(cache_data, skim_data)
             cache_data._mmap.close()
@@ -584,7 +770,8 @@ class MemMapSkimFactory(AbstractSkimFactory):
     def get_skim_data(self, skim_tag, skim_info):
         """
         Read skim data from backing store and return it as a 3D ndarray quack-alike SkimData object
-        (either a JitMemMapSkimData or a memmap backed SkimData object)
+        (either a JitMemMapSkimData, a memmap backed SkimData object, or, if the
+        skim_cache_compression setting is given, a compressed skim cache backed one)
 
         Parameters
         ----------
@@ -601,6 +788,18 @@ class MemMapSkimFactory(AbstractSkimFactory):
             skim_tag
         )
 
+        if self.network_los.setting("skim_cache_compression", None):
+            # only the chunks of skims that are looked up are decompressed
+            cache = self._compressed_skim_cache(skim_tag)
+            if not cache.open(skim_info, skim_info.omx_file_paths):
+                cache = self.copy_omx_to_compressed_file(skim_info)
+            skim_data = SkimData(CompressedSkimData(cache))
+            logger.info(
+                f"get_skim_data {skim_tag} {type(skim_data).__name__} shape {skim_data.shape} "
+                f"from compressed skim cache {cache.path}"
+            )
+            return skim_data
+
         skim_cache_path = self._memmap_skim_data_path(skim_tag)
         if not os.path.isfile(skim_cache_path):
             self.copy_omx_to_mmap_file(skim_info)
@@ -618,3 +817,222 @@ class MemMapSkimFactory(AbstractSkimFactory):
         )
 
         return skim_data
+
+
+SKIM_USAGE_MANIFEST_FILE = "skim_usage_manifest.json"
+
+
+class SkimUsageManifest:
+    """
+    Skim keys looked up by each model step, kept across runs.
+
+    The manifest is a json file mapping each skim tag to a dict of the (base)
+    skim keys looked up by each model step.  Saving merges the manifest with
+    the file on disk, so the manifest accumulates the usage of all the
+    processes of a multiprocess run, and of runs of different model lists.
+    Delete the file to start over.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._usage = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                usage = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logger.warning(f"ignoring unreadable skim usage manifest {self.path}")
+            return {}
+        return usage if isinstance(usage, dict) else {}
+
+    def record(self, skim_tag, step_name, keys):
+        """Add skim keys looked up by step_name to the manifest."""
+        keys = {str(k[0] if isinstance(k, tuple) else k) for k in keys}
+        steps = self._usage.setdefault(skim_tag, {})
+        steps[step_name] = sorted(keys.union(steps.get(step_name, [])))
+
+    def step_usage(self, skim_tag, step_name=None):
+        """
+        Skim keys recorded for one step, or for all steps if step_name is None.
+
+        Returns
+        -------
+        set of str
+        """
+        steps = self._usage.get(skim_tag, {})
+        if step_name is not None:
+            return set(steps.get(step_name, []))
+        return set().union(*steps.values())
+
+    def save(self):
+        on_disk = self._read()
+        for skim_tag, steps in on_disk.items():
+            for step_name, keys in steps.items():
+                self.record(skim_tag, step_name, keys)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self._usage, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class LazySkimData(SkimData):
+    """
+    SkimData subclass that reads each skim from its omx file the first time it is accessed.
+
+    `loaded` has a flag for each skim (by block offset) that is set once the
+    skim is in skim_data.  When skim_data is in a shared buffer, so are the
+    flags, so skims read by one process are not read again by the others.
+    Once every skim is loaded, lookups no longer check the flags.
+    """
+
+    def __init__(self, skim_data, loaded, skim_info, skim_factory):
+        super().__init__(skim_data)
+        self.loaded = loaded
+        self.skim_info = skim_info
+        self.skim_factory = skim_factory
+        self._lock = threading.Lock()
+        self._all_loaded = bool(loaded.all())
+
+    def __getitem__(self, indexes):
+        if len(indexes) != 3:
+            raise ValueError(f"number of indexes ({len(indexes)}) should be 3")
+        if skim_dictionary.ROW_MAJOR_LAYOUT:
+            block_offsets = indexes[0]
+        else:
+            block_offsets = indexes[2]
+        # the offsets are only deduplicated when some skims are missing
+        if not self._all_loaded and not self.loaded[block_offsets].all():
+            self.load(np.unique(np.asanyarray(block_offsets)))
+        return self._skim_data[indexes]
+
+    def load(self, block_offsets):
+        """
+        Read the skims at block_offsets, unless they are already loaded.
+        """
+        with self._lock:
+            missing = [o for o in block_offsets if not self.loaded[o]]
+            if missing:
+                self.skim_factory._read_skims_from_omx(
+                    self.skim_info, self._skim_data, block_offsets=missing
+                )
+                self.loaded[missing] = 1
+            self._all_loaded = bool(self.loaded.all())
+
+
+class LazySkimFactory(NumpyArraySkimFactory):
+    """
+    Skim factory that reads skims from the omx files only as they are looked up.
+
+    A skim buffer is allocated for all the skims, as with the
+    NumpyArraySkimFactory, but only the working set of skims is read up front:
+    the skims that the skim usage manifest (see `SkimUsageManifest`) records
+    as looked up by earlier runs.  Any other skim is read from its omx file on
+    its first lookup.  Network_LOS.record_skim_usage adds the skims looked up
+    by each model step to the manifest, which is kept in the cache directory.
+
+    The single process skim buffer is zero filled, which the operating system
+    only backs with memory as skims are read into it.  Multiprocess shared
+    buffers are allocated in full, but only the working set is read before
+    the subprocesses start.  The skim caches (read_skim_cache and
+    write_skim_cache) are not used.
+    """
+
+    def __init__(self, network_los):
+        super().__init__(network_los)
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = SkimUsageManifest(
+                Path(self.network_los.state.filesystem.get_cache_dir()).joinpath(
+                    SKIM_USAGE_MANIFEST_FILE
+                )
+            )
+        return self._manifest
+
+    def working_set(self, skim_info):
+        """
+        Block offsets of the skims recorded in the skim usage manifest.
+
+        Returns
+        -------
+        list of int
+        """
+        keys = self.manifest.step_usage(skim_info.skim_tag)
+        return sorted(
+            offset
+            for skim_key, offset in skim_info.block_offsets.items()
+            if (skim_key[0] if isinstance(skim_key, tuple) else skim_key) in keys
+        )
+
+    def _buffer_size(self, skim_info):
+        # the skims are followed by a loaded flag for each skim
+        return util.iprod(skim_info.skim_data_shape) + skim_info.num_skims
+
+    def _loaded_flags_from_buffer(self, skim_info, skim_buffer):
+        dtype = np.dtype(skim_info.dtype_name)
+        return np.frombuffer(skim_buffer, dtype=dtype)[
+            util.iprod(skim_info.skim_data_shape) :
+        ]
+
+    def load_skims_to_buffer(self, skim_info, skim_buffer):
+        """
+        Load the working set of skims from the omx files into skim_buffer.
+
+        Parameters
+        ----------
+        skim_info: SkimInfo
+        skim_buffer: 1D buffer sized to hold all skims and their loaded flags
+        """
+        skim_data = self._skim_data_from_buffer(skim_info, skim_buffer)
+        loaded = self._loaded_flags_from_buffer(skim_info, skim_buffer)
+
+        block_offsets = self.working_set(skim_info)
+        logger.info(
+            f"load_skims_to_buffer {skim_info.skim_tag} preloading {len(block_offsets)} "
+            f"of {skim_info.num_skims} skims recorded in {self.manifest.path}"
+        )
+        if block_offsets:
+            self._read_skims_to_buffer(
+                skim_info, skim_buffer, skim_data, block_offsets=block_offsets
+            )
+            loaded[block_offsets] = 1
+
+    def get_skim_data(self, skim_tag, skim_info):
+        """
+        Return a LazySkimData object for the skims, with the working set loaded.
+
+        Parameters
+        ----------
+        skim_tag: str
+        skim_info: SkimInfo
+
+        Returns
+        -------
+        LazySkimData
+        """
+        data_buffers = self.network_los.state.get_injectable("data_buffers", None)
+        if data_buffers:
+            # the working set was loaded into the shared buffers by load_shared_data
+            skim_buffer = data_buffers[skim_tag]
+        else:
+            skim_buffer = self.allocate_skim_buffer(skim_info, shared=False)
+            self.load_skims_to_buffer(skim_info, skim_buffer)
+
+        skim_data = LazySkimData(
+            self._skim_data_from_buffer(skim_info, skim_buffer),
+            self._loaded_flags_from_buffer(skim_info, skim_buffer),
+            skim_info,
+            self,
+        )
+
+        logger.info(
+            f"get_skim_data {skim_tag} {type(skim_data).__name__} shape {skim_data.shape}"
+        )
+
+        return skim_data
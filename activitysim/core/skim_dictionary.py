@@ -19,6 +19,51 @@ NOT_IN_SKIM_NAN = np.nan
 
 ROW_MAJOR_LAYOUT = True
 
+# lookups of fewer od pairs than this are gathered in chooser order even when
+# sorted_skim_lookups is enabled, as they fit in cache anyway
+SORTED_LOOKUP_MIN_SIZE = 10000
+
+
+def _sort_key(a):
+    # numpy sorts 16 bit integers with a (stable, linear time) radix sort
+    if a.size and a.min() >= 0 and a.max() <= np.iinfo(np.uint16).max:
+        return a.astype(np.uint16)
+    return a
+
+
+def origin_block_order(orig, block_offsets=None):
+    """
+    Return the order that groups od pairs by skim block, then by origin.
+
+    Gathering skim values in this order reads each origin row of each skim
+    together, rather than jumping about the skim array in chooser order.
+
+    Parameters
+    ----------
+    orig : array of origin offsets
+    block_offsets : int or array of skim block offsets, optional
+
+    Returns
+    -------
+    numpy.ndarray of positions
+    """
+    orig = np.asanyarray(orig)
+    order = np.argsort(_sort_key(orig), kind="stable")
+    if block_offsets is not None and np.ndim(block_offsets):
+        block_offsets = np.asanyarray(block_offsets)[order]
+        order = order[np.argsort(_sort_key(block_offsets), kind="stable")]
+    return order
+
+
+def scatter_sorted(values, order):
+    """
+    Return values gathered in `order` back in their original order.
+    """
+    values = np.asanyarray(values)
+    result = np.empty_like(values)
+    result[order] = values
+    return result
+
 
 class OffsetMapper(object):
     """
@@ -166,6 +211,7 @@ class SkimDict:
         self.skim_tag = skim_tag
         self.skim_info = skim_info
         self.usage = set()  # track keys of skims looked up
+        self.step_usage = set()  # keys looked up since last recorded by model step
 
         try:
             self.time_label_dtype = pd.api.types.CategoricalDtype(
@@ -181,6 +227,11 @@ class SkimDict:
                 f"Cannot access state.network_settings.skim_time_periods.labels. SkimDict.time_label_dtype is not set"
             )
 
+        try:
+            self.sorted_lookups = state.network_settings.sorted_skim_lookups
+        except StateAccessError:
+            self.sorted_lookups = False
+
         self.offset_mapper = self._offset_mapper(
             state
         )  # (in function so subclass can override)
@@ -274,7 +325,22 @@ class SkimDict:
 
         mapped_orig = self.offset_mapper.map(orig)
         mapped_dest = self.offset_mapper.map(dest)
-        if ROW_MAJOR_LAYOUT:
+        if self.sorted_lookups and len(mapped_orig) >= SORTED_LOOKUP_MIN_SIZE:
+            # gather origin by origin, then put values back in chooser order
+            order = origin_block_order(mapped_orig, block_offsets)
+            sorted_orig = np.asanyarray(mapped_orig)[order]
+            sorted_dest = np.asanyarray(mapped_dest)[order]
+            sorted_blocks = (
+                np.asanyarray(block_offsets)[order]
+                if np.ndim(block_offsets)
+                else block_offsets
+            )
+            if ROW_MAJOR_LAYOUT:
+                result = self.skim_data[sorted_blocks, sorted_orig, sorted_dest]
+            else:
+                result = self.skim_data[sorted_orig, sorted_dest, sorted_blocks]
+            result = scatter_sorted(result, order)
+        elif ROW_MAJOR_LAYOUT:
             result = self.skim_data[block_offsets, mapped_orig, mapped_dest]
         else:
             result = self.skim_data[mapped_orig, mapped_dest, block_offsets]
@@ -322,6 +388,7 @@ class SkimDict:
         """
 
         self.usage.add(key)
+        self.step_usage.add(key)
 
         block_offset = self.skim_info.block_offsets.get(key)
         assert block_offset is not None, f"SkimDict lookup key '{key}' not in skims"
@@ -362,6 +429,7 @@ class SkimDict:
         """
 
         self.usage.add(key)  # should we keep usage stats by (key, dim3)?
+        self.step_usage.add(key)
 
         assert key in self.skim_dim3, f"3d skim key {key} not in skims."
 
@@ -625,7 +693,7 @@ class MazSkimDict(SkimDict):
     MazSkimDict provides a facade that allows skim-like lookup by maz orig,dest zone_id
     when there are often too many maz zones to create maz skims.
 
-    Dependencies: network_los.load_data must have already loaded: taz skim_dict, maz_to_maz_df, and maz_taz_df
+    Dependencies: network_los.load_data must have already loaded: taz skim_dict, maz_to_maz_skims, and maz_taz_df
 
     It performs lookups from a sparse list of maz-maz od pairs on selected attributes (e.g. WALKDIST)
     where accuracy for nearby od pairs is critical. And is backed by a fallback taz skim dict
@@ -634,7 +702,7 @@ class MazSkimDict(SkimDict):
 
     def __init__(self, state: workflow.State, skim_tag, network_los, taz_skim_dict):
         """
-        we need network_los because we have dependencies on network_los.load_data (e.g. maz_to_maz_df, maz_taz_df,
+        we need network_los because we have dependencies on network_los.load_data (e.g. maz_to_maz_skims, maz_taz_df,
         and the fallback taz skim_dict)
 
         We require taz_skim_dict as an explicit parameter to emphasize that we are piggybacking on taz_skim_dict's
@@ -685,10 +753,8 @@ class MazSkimDict(SkimDict):
 
         self.dtype = np.dtype(self.skim_info.dtype_name)
         self.base_keys = taz_skim_dict.skim_info.base_keys
-        if network_los.maz_to_maz_df is not None:
-            self.sparse_keys = list(
-                set(network_los.maz_to_maz_df.columns) - {"OMAZ", "DMAZ"}
-            )
+        if network_los.maz_to_maz_skims is not None:
+            self.sparse_keys = list(network_los.maz_to_maz_skims.attributes)
         else:
             self.sparse_keys = []
         self.sparse_key_usage = set()
@@ -767,7 +833,13 @@ class MazSkimDict(SkimDict):
         assert not (np.isnan(orig) | np.isnan(dest)).any()
 
         # we want values from mazpairs, where we have them
-        values = self.network_los.get_mazpairs(orig, dest, key)
+        # (along with the blend distance, if needed, from the same probe)
+        if max_blend_distance > 0 and blend_distance_skim_name != key:
+            values, distance = self.network_los.get_mazpairs(
+                orig, dest, [key, blend_distance_skim_name]
+            )
+        else:
+            values = distance = self.network_los.get_mazpairs(orig, dest, key)
 
         is_nan = np.isnan(values)
 
@@ -778,14 +850,6 @@ class MazSkimDict(SkimDict):
 
             backstop_values = super().lookup(orig, dest, key)
 
-            # get distance skim if a different key was specified by blend_distance_skim_name
-            if blend_distance_skim_name != key:
-                distance = self.network_los.get_mazpairs(
-                    orig, dest, blend_distance_skim_name
-                )
-            else:
-                distance = values
-
             # for distances less than max_blend_distance, we blend maz-maz and skim backstop values
             # shorter distances have less fractional backstop, and more maz-maz
             # beyond max_blend_distance, just use the skim values
@@ -0,0 +1,170 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+from functools import reduce
+
+import numba as nb
+import numpy as np
+import pandas as pd
+
+
+@nb.njit(nogil=True)
+def _sparse_lookup(origin_ids, indptr, dests, data, cols, orig, dest, out):
+    for n in range(orig.size):
+        p = np.searchsorted(origin_ids, orig[n])
+        j = -1
+        if p < origin_ids.size and origin_ids[p] == orig[n]:
+            lo = indptr[p]
+            hi = indptr[p + 1]
+            k = lo + np.searchsorted(dests[lo:hi], dest[n])
+            if k < hi and dests[k] == dest[n]:
+                j = k
+        for c in range(cols.size):
+            if j >= 0:
+                out[c, n] = data[cols[c], j]
+            else:
+                out[c, n] = np.nan
+
+
+class SparseMazSkims:
+    """
+    Compact store of sparse maz to maz skim attributes (e.g. WALKDIST)
+
+    The od pairs are stored as a CSR matrix by origin maz: for the origin
+    maz at position `p` of the sorted `origin_ids`, `indptr[p]` to
+    `indptr[p + 1]` is the range of its (sorted) destinations in `dests`,
+    and each attribute is a row of `data` aligned with `dests`.  Maz zone_ids
+    need not be dense.  A lookup finds each od pair with binary searches of
+    the origins and of the destinations of its origin, and returns any number
+    of attributes from that one probe.
+
+    Parameters
+    ----------
+    omaz, dmaz : array-like of int
+        maz zone_ids of the od pairs, which need not be sorted
+    attributes : Mapping[str, array-like]
+        attribute values of the od pairs
+    dtype : str or dtype, optional
+        dtype to store the attribute values as (e.g. the skim dtype)
+    """
+
+    def __init__(self, omaz, dmaz, attributes, dtype=None):
+        omaz = np.asanyarray(omaz)
+        dmaz = np.asanyarray(dmaz)
+        assert omaz.shape == dmaz.shape
+
+        if len(omaz) and (min(omaz.min(), dmaz.min()) < 0):
+            raise ValueError("negative maz zone_id in maz_to_maz table")
+        if len(omaz) and max(omaz.max(), dmaz.max()) >= (1 << 31):
+            raise ValueError("maz ceiling too high, will overflow int32")
+
+        order = np.lexsort((dmaz, omaz))
+        omaz = omaz[order].astype(np.int32)
+        self.dests = dmaz[order].astype(np.int32)
+        duplicated = (omaz[1:] == omaz[:-1]) & (self.dests[1:] == self.dests[:-1])
+        if duplicated.any():
+            n = np.flatnonzero(duplicated)[0]
+            raise ValueError(
+                f"duplicate od pair {omaz[n]}->{self.dests[n]} in maz_to_maz table"
+            )
+
+        self.origin_ids, counts = np.unique(omaz, return_counts=True)
+        self.indptr = np.zeros(self.origin_ids.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+        self.attributes = list(attributes)
+        if dtype is None:
+            dtype = np.result_type(*attributes.values()) if attributes else np.float32
+        self.data = np.empty((len(self.attributes), len(order)), dtype=dtype)
+        for i, values in enumerate(attributes.values()):
+            self.data[i] = np.asanyarray(values)[order]
+
+    @classmethod
+    def from_tables(cls, tables, dtype=None):
+        """
+        Build from maz_to_maz tables with OMAZ and DMAZ columns.
+
+        Tables with different od pairs are joined, and attributes of pairs
+        that are missing from a table are nan.
+
+        Parameters
+        ----------
+        tables : Collection[pandas.DataFrame]
+        dtype : str or dtype, optional
+
+        Returns
+        -------
+        SparseMazSkims
+        """
+        df = reduce(
+            lambda left, right: pd.merge(
+                left, right, on=["OMAZ", "DMAZ"], how="outer", validate="1:1"
+            ),
+            tables,
+        )
+        attributes = {
+            c: df[c].to_numpy() for c in df.columns if c not in ("OMAZ", "DMAZ")
+        }
+        return cls(df.OMAZ.to_numpy(), df.DMAZ.to_numpy(), attributes, dtype=dtype)
+
+    def __len__(self):
+        return self.dests.size
+
+    @property
+    def num_origins(self):
+        return self.indptr.size - 1
+
+    def origins(self):
+        """
+        Origin maz zone_id of each od pair, in stored order.
+        """
+        return np.repeat(self.origin_ids, np.diff(self.indptr))
+
+    def to_frame(self):
+        """
+        Return the od pairs and attributes as a DataFrame.
+
+        Returns
+        -------
+        pandas.DataFrame with OMAZ, DMAZ and attribute columns
+        """
+        df = pd.DataFrame({"OMAZ": self.origins(), "DMAZ": self.dests})
+        for name, values in zip(self.attributes, self.data):
+            df[name] = values
+        return df
+
+    def lookup(self, omaz, dmaz, attributes):
+        """
+        Look up attribute values of maz od pairs.
+
+        Parameters
+        ----------
+        omaz : array-like of orig maz zone_ids
+        dmaz : array-like of dest maz zone_ids
+        attributes : str or list of str
+
+        Returns
+        -------
+        numpy.ndarray
+            Values of od pairs that are not in the store are nan.  For a single
+            attribute, the values are 1-D, otherwise there is a row of values
+            for each attribute.
+        """
+        single = isinstance(attributes, str)
+        if single:
+            attributes = [attributes]
+        cols = np.array([self.attributes.index(a) for a in attributes], dtype=np.int64)
+
+        omaz = np.asanyarray(omaz, dtype=np.int64)
+        dmaz = np.asanyarray(dmaz, dtype=np.int64)
+        out_dtype = (
+            self.data.dtype
+            if np.issubdtype(self.data.dtype, np.floating)
+            else np.float64
+        )
+        out = np.empty((len(cols), omaz.size), dtype=out_dtype)
+        _sparse_lookup(
+            self.origin_ids, self.indptr, self.dests, self.data, cols, omaz, dmaz, out
+        )
+        return out[0] if single else out
@@ -182,3 +182,29 @@ def test_assign_variables_failing(state: workflow.State, capsys, data):
 
     # undefined variable should raise error
     assert "'undefined_variable' is not defined" in str(excinfo.value)
+
+
+def test_compile_expression():
+    code = assign.compile_expression("a + b")
+    assert assign.compile_expression("a + b") is code
+    assert eval(code, {}, {"a": 1, "b": 2}) == 3
+
+
+def test_eval_df_expression(data):
+    # df.eval names the values of a bare column name only in some pandas versions
+    pd.testing.assert_series_equal(
+        assign.eval_df_expression(data, "thing1"),
+        data.eval("thing1"),
+        check_names=False,
+    )
+    pd.testing.assert_series_equal(
+        assign.eval_df_expression(data, "thing1 * 2"), data.eval("thing1 * 2")
+    )
+
+    # resolvers take precedence over columns, as in df.eval
+    resolvers = [{"thing1": data.thing1 * 3}]
+    pd.testing.assert_series_equal(
+        assign.eval_df_expression(data, "thing1", resolvers=resolvers),
+        data.eval("thing1", resolvers=resolvers),
+        check_names=False,
+    )
@@ -0,0 +1,34 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+from ..flow import FlowCacheIndex
+
+
+def test_flow_cache_index(tmp_path):
+    index = FlowCacheIndex(tmp_path)
+    index.record("config", "AAAA", "school_location", "school.sample", False)
+    index.record("config", "AAAA", "school_location", "school.sample", True)
+    index.record("config", "BBBB", "workplace_location", "work.sample", False)
+    assert (index.memory_hits, index.cache_hits, index.misses) == (1, 0, 2)
+    assert list(index.flows("config", "school_location")) == ["AAAA"]
+    assert index.flows("other config") == {}
+    index.save()
+
+    # flows recorded by another process are merged when saving
+    other = FlowCacheIndex(tmp_path)
+    other.record("config", "CCCC", "tour_mode_choice", "mode", False)
+    other.save()
+    index.record("config", "DDDD", "trip_mode_choice", "mode", False)
+    index.save()
+
+    reloaded = FlowCacheIndex(tmp_path)
+    assert set(reloaded.flows("config")) == {"AAAA", "BBBB", "CCCC", "DDDD"}
+
+    # flows are only cache hits if their code is in the cache directory
+    assert not reloaded.flow_is_compiled("AAAA")
+    reloaded.record("config", "AAAA", "school_location", "school.sample", False)
+    tmp_path.joinpath("flow_AAAA").mkdir()
+    tmp_path.joinpath("flow_AAAA", "__init__.py").write_text("flow_hash = 'AAAA'\n")
+    reloaded.record("config", "AAAA", "school_location", "school.sample", False)
+    assert (reloaded.cache_hits, reloaded.misses) == (1, 1)
@@ -140,6 +140,105 @@ def test_make_choices_real_probs(utilities):
     )
 
 
+def test_utils_to_choices(utilities, test_data):
+    state = workflow.State().default_settings()
+    utils = utilities.copy()
+    choices, rands, probs, logsums = logit.utils_to_choices(state, utils)
+
+    pdt.assert_frame_equal(probs, test_data["probabilities"])
+    pdt.assert_series_equal(
+        choices,
+        pd.Series([1, 2], index=[0, 1]),
+        check_dtype=False,
+    )
+    pdt.assert_series_equal(
+        logsums, logit.utils_to_logsums(utilities), check_dtype=False
+    )
+    # utilities are not modified unless in_place
+    pdt.assert_frame_equal(utils, utilities)
+
+    choices2, rands2, probs2, logsums2 = logit.utils_to_choices(
+        state, utils, in_place=True
+    )
+    pdt.assert_series_equal(choices2, choices)
+    pdt.assert_frame_equal(utils, test_data["probabilities"])
+
+
+def test_utils_to_choices_matches_make_choices():
+    state = workflow.State().default_settings()
+    rng = np.random.default_rng(42)
+    utils = pd.DataFrame(rng.normal(size=(1000, 12)) * 3)
+    utils.iloc[:, 3] = -999
+    probs = logit.utils_to_probs(state, utils.copy(), trace_label=None)
+    choices, rands = logit.make_choices(state, probs)
+    choices2, rands2, probs2, logsums2 = logit.utils_to_choices(state, utils)
+
+    pdt.assert_frame_equal(probs2, probs)
+    pdt.assert_series_equal(choices2, choices, check_dtype=False)
+    assert (probs2[3] == 0).all()
+
+
+def test_utils_to_choices_without_probs():
+    state = workflow.State().default_settings()
+    rng = np.random.default_rng(42)
+    utils = pd.DataFrame(rng.normal(size=(1000, 12)) * 3)
+    utils.iloc[:, 3] = -999
+    original = utils.copy()
+    choices, rands, probs, logsums = logit.utils_to_choices(state, utils)
+    choices2, rands2, probs2, logsums2 = logit.utils_to_choices(
+        state, utils, in_place=True, want_probs=False
+    )
+
+    assert probs2 is None
+    pdt.assert_series_equal(choices2, choices)
+    pdt.assert_series_equal(logsums2, logsums)
+    # utilities are never modified without probs
+    pdt.assert_frame_equal(utils, original)
+
+
+def test_ragged_to_choices():
+    state = workflow.State().default_settings()
+    rng = np.random.default_rng(42)
+    counts = rng.integers(1, 12, size=500)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    utils = rng.normal(size=offsets[-1]) * 3
+    choosers = pd.DataFrame(index=pd.RangeIndex(len(counts)))
+
+    # same choices as padding with unavailable alternatives
+    padded = np.full((len(counts), counts.max()), -999.0)
+    for i, count in enumerate(counts):
+        padded[i, :count] = utils[offsets[i] : offsets[i + 1]]
+    padded = pd.DataFrame(padded, index=choosers.index)
+    probs, logsums = logit.utils_to_probs(state, padded, return_logsums=True)
+    choices, rands = logit.make_choices(state, probs)
+
+    positions, rands2, logsums2, zero_probs = logit.ragged_to_choices(
+        state, utils, offsets, choosers
+    )
+    pdt.assert_series_equal(positions, choices, check_dtype=False)
+    pdt.assert_series_equal(logsums2, logsums, check_dtype=False)
+    assert not zero_probs.any()
+    assert (positions < counts).all()
+
+
+def test_utils_to_choices_raises():
+    state = workflow.State().default_settings()
+    idx = pd.Index(name="household_id", data=[1, 2])
+    with pytest.raises(RuntimeError) as excinfo:
+        logit.utils_to_choices(
+            state,
+            pd.DataFrame([[1.0, 2.0, 3.0], [1.0, np.inf, 3.0]], index=idx),
+        )
+    assert "infinite exponentiated utilities" in str(excinfo.value)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        logit.utils_to_choices(
+            state,
+            pd.DataFrame([[1.0, 2.0, 3.0], [-np.inf, -np.inf, -np.inf]], index=idx),
+        )
+    assert "all probabilities are zero" in str(excinfo.value)
+
+
 @pytest.fixture(scope="module")
 def interaction_choosers():
     return pd.DataFrame({"attr": ["a", "b", "c", "b"]}, index=["w", "x", "y", "z"])
@@ -188,3 +287,257 @@ def test_interaction_dataset_sampled(interaction_choosers, interaction_alts):
 
     interacted, expected = interacted.align(expected, axis=1)
     pdt.assert_frame_equal(interacted, expected)
+
+
+def test_factorized_interaction_utilities():
+    from activitysim.core import interaction_simulate
+
+    state = workflow.State().default_settings()
+    choosers = pd.DataFrame(
+        {"income": [10, 20, 30, 40], "prop": [1, 2, 3, 4]}, index=["w", "x", "y", "z"]
+    )
+    alts = pd.DataFrame({"prop": [10, 20, 30], "size": [1, 5, 2]}, index=[1, 2, 3])
+    spec = pd.DataFrame(
+        {"coefficient": [0.5, -0.1, 0.01, 0.2, 1.0, 2.0]},
+        index=pd.Index(
+            [
+                "income > THRESHOLD",
+                "prop * 2",
+                "income * prop",
+                "@df.prop ** 0.5",
+                "size == 5",
+                "prop_chooser",
+            ],
+            name="Expression",
+        ),
+    )
+    locals_d = {"THRESHOLD": 25}
+
+    chooser_spec, alt_spec, interaction_spec = interaction_simulate.factorize_spec(
+        spec, choosers, alts, locals_d
+    )
+    assert list(chooser_spec.index) == ["income > THRESHOLD"]
+    assert list(alt_spec.index) == ["prop * 2", "size == 5"]
+    assert list(interaction_spec.index) == [
+        "income * prop",
+        "@df.prop ** 0.5",
+        "prop_chooser",
+    ]
+
+    interaction_df = logit.interaction_dataset(state, choosers, alts)
+    expected, _ = interaction_simulate.eval_interaction_utilities(
+        state, spec, interaction_df, locals_d, "test", None
+    )
+
+    chooser_utils, alt_utils = interaction_simulate.eval_factorized_utilities(
+        state, chooser_spec, alt_spec, choosers, alts, locals_d, "test"
+    )
+    utils, _ = interaction_simulate.eval_interaction_utilities(
+        state, interaction_spec, interaction_df, locals_d, "test", None
+    )
+    utils["utility"] += np.repeat(chooser_utils, len(alts)) + np.tile(
+        alt_utils.values, len(choosers)
+    )
+    pdt.assert_frame_equal(utils, expected)
+
+
+def test_precomputed_alternative_utilities():
+    from activitysim.core import interaction_simulate
+
+    class SkimWrapper:
+        def set_df(self, df):
+            pass
+
+    state = workflow.State().default_settings()
+    choosers = pd.DataFrame(
+        {"income": [10, 20, 30, 40], "prop": [1, 2, 3, 4]}, index=["w", "x", "y", "z"]
+    )
+    alts = pd.DataFrame({"prop": [10, 20, 30], "size": [1, 5, 2]}, index=[1, 2, 3])
+    spec = pd.DataFrame(
+        {"coefficient": [0.5, 0.2, 1.0, 2.0, 0.1, 0.3]},
+        index=pd.Index(
+            [
+                "size == 5",
+                "@df.prop ** 0.5",
+                "@np.log1p(df['size']) * SCALE # sharrow: np.log1p(size) * SCALE",
+                "@df.prop * df.income",
+                "@len(df) * df.size",
+                "@od_skims * df.size",
+            ],
+            name="Expression",
+        ),
+    )
+    locals_d = {"SCALE": 2.0, "od_skims": SkimWrapper()}
+
+    alt_spec, remaining_spec = interaction_simulate.split_alternative_spec(
+        spec, choosers, alts, locals_d
+    )
+    assert list(alt_spec.index) == list(spec.index[:3])
+    assert list(remaining_spec.index) == list(spec.index[3:])
+
+    remaining_spec = remaining_spec.iloc[:1]
+    spec = spec.iloc[:4]
+    interaction_df = logit.interaction_dataset(state, choosers, alts)
+    expected, _ = interaction_simulate.eval_interaction_utilities(
+        state, spec, interaction_df, locals_d, "test", None
+    )
+
+    alt_utils = interaction_simulate.eval_alternative_utilities(
+        state, alt_spec, alts, locals_d, "test"
+    )
+    utils, _ = interaction_simulate.eval_interaction_utilities(
+        state, remaining_spec, interaction_df, locals_d, "test", None
+    )
+    utils["utility"] += alt_utils.reindex(utils.index).values
+    pdt.assert_frame_equal(utils, expected)
+
+
+@pytest.mark.parametrize("factorize_interaction", [False, True])
+@pytest.mark.parametrize("precompute_alternatives", [False, True])
+def test_interaction_simulate_alternative_terms(
+    monkeypatch, factorize_interaction, precompute_alternatives
+):
+    from activitysim.core import interaction_simulate
+    from activitysim.core.configuration.base import ComputeSettings
+
+    state = workflow.State().default_settings()
+    choosers = pd.DataFrame(
+        {"income": [10, 20, 30, 40], "prop": [1, 2, 3, 4]},
+        index=pd.Index(["w", "x", "y", "z"], name="chooser_id"),
+    )
+    alts = pd.DataFrame(
+        {"prop": [10, 20, 30], "size": [1, 5, 2]},
+        index=pd.Index([1, 2, 3], name="alt_id"),
+    )
+    spec = pd.DataFrame(
+        {"coefficient": [0.5, 0.2, 0.1, 0.3, 0.01]},
+        index=pd.Index(
+            [
+                "income > THRESHOLD",
+                "size == 5",
+                "prop * 2",
+                "@np.log1p(df['size'])",
+                "@df.prop * df.income",
+            ],
+            name="Expression",
+        ),
+    )
+    locals_d = {"THRESHOLD": 25}
+
+    interaction_df = logit.interaction_dataset(state, choosers, alts)
+    expected, _ = interaction_simulate.eval_interaction_utilities(
+        state, spec, interaction_df, locals_d, "test", None
+    )
+    expected = expected.utility.to_numpy().reshape(len(choosers), len(alts))
+
+    utilities = []
+    utils_to_probs = logit.utils_to_probs
+
+    def record_utils_to_probs(state, utils, *args, **kwargs):
+        utilities.append(utils.to_numpy().copy())
+        return utils_to_probs(state, utils, *args, **kwargs)
+
+    monkeypatch.setattr(logit, "utils_to_probs", record_utils_to_probs)
+    choices = interaction_simulate.interaction_simulate(
+        state,
+        choosers,
+        alts,
+        spec,
+        locals_d=locals_d,
+        compute_settings=ComputeSettings(
+            factorize_interaction=factorize_interaction,
+            precompute_alternatives=precompute_alternatives,
+        ),
+    )
+
+    assert len(choices) == len(choosers)
+    np.testing.assert_allclose(np.concatenate(utilities), expected)
+
+
+def test_nested_logit_probabilities():
+    from activitysim.core import simulate
+
+    state = workflow.State().default_settings()
+    nest_spec = {
+        "name": "root",
+        "coefficient": 1.0,
+        "alternatives": [
+            {
+                "name": "AUTO",
+                "coefficient": 0.72,
+                "alternatives": [
+                    "DRIVEALONE",
+                    {
+                        "name": "SHARED",
+                        "coefficient": 0.5,
+                        "alternatives": ["SHARED2", "SHARED3"],
+                    },
+                ],
+            },
+            {
+                "name": "NONMOTORIZED",
+                "coefficient": 0.72,
+                "alternatives": ["WALK", "BIKE"],
+            },
+            "TAXI",
+        ],
+    }
+    alts = ["WALK", "DRIVEALONE", "SHARED2", "SHARED3", "BIKE", "TAXI"]
+    rng = np.random.default_rng(0)
+    raw_utilities = pd.DataFrame(
+        rng.normal(size=(200, len(alts))), columns=alts, index=pd.RangeIndex(200)
+    )
+    # a fully unavailable nest, and a mostly unavailable chooser
+    raw_utilities.loc[::3, ["WALK", "BIKE"]] = -999
+    raw_utilities.loc[5, alts[1:]] = -999
+
+    nested_exp_utilities = simulate.compute_nested_exp_utilities(
+        raw_utilities, nest_spec
+    )
+    nested_probabilities = simulate.compute_nested_probabilities(
+        state, nested_exp_utilities, nest_spec, trace_label=None
+    )
+    spec = pd.DataFrame(columns=alts)
+    expected = simulate.compute_base_probabilities(
+        nested_probabilities, nest_spec, spec
+    )
+
+    probs, logsums = logit.nested_logit_probabilities(state, raw_utilities, nest_spec)
+
+    pdt.assert_frame_equal(probs, expected)
+    npt_logsums = np.log(nested_exp_utilities.root).values
+    np.testing.assert_allclose(logsums.values, npt_logsums)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+
+    # flattened nest tree is cached
+    assert logit.flatten_nest_spec(nest_spec, alts) is logit.flatten_nest_spec(
+        nest_spec, alts
+    )
+
+
+def test_alias_sample():
+    from activitysim.core import choosing, interaction_sample
+
+    weights = np.array([0.0, 1.0, 3.0, 0.0, 6.0])
+    probs = weights / weights.sum()
+
+    # the alias table gives each alternative its probability
+    prob, alias = choosing.alias_table(weights)
+    n_alts = len(weights)
+    table_probs = prob / n_alts
+    np.add.at(table_probs, alias, (1.0 - prob) / n_alts)
+    np.testing.assert_allclose(table_probs, probs)
+
+    state = workflow.State().default_settings()
+    choosers = pd.DataFrame(index=pd.Index(range(100), name="person_id"))
+    alts = pd.DataFrame(index=pd.Index([10, 20, 30, 40, 50], name="zone_id"))
+    choices = interaction_sample.alias_sample(
+        state, choosers, alts, weights, sample_size=50, alt_col_name="alt_dest"
+    )
+
+    assert list(choices.columns) == ["alt_dest", "prob", "pick_count"]
+    assert set(choices.alt_dest) <= {20, 30, 50}
+    assert (choices.groupby(level=0).pick_count.sum() == 50).all()
+    np.testing.assert_allclose(
+        choices.prob, probs[choices.alt_dest.values // 10 - 1], rtol=1e-6
+    )
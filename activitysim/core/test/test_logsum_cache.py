@@ -0,0 +1,106 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+
+from ..logsum_cache import LogsumCache, logsum_key_columns
+
+
+class SkimWrapper:
+    def __init__(self, orig_key, dest_key, dim3_key):
+        self.orig_key = orig_key
+        self.dest_key = dest_key
+        self.dim3_key = dim3_key
+
+
+def test_logsum_key_columns():
+    choosers = pd.DataFrame(
+        {
+            "origin": [1, 2],
+            "destination": [3, 4],
+            "out_period": ["AM", "PM"],
+            "income": [10, 20],
+            "person_id": [5, 6],
+        }
+    )
+    spec = pd.DataFrame(
+        {"DRIVE": [1.0, 2.0]},
+        index=pd.Index(["income > 15", "@odt_skims['TIME']"], name="Expression"),
+    )
+    skims = {"odt_skims": SkimWrapper("origin", "destination", "out_period")}
+
+    assert logsum_key_columns(choosers, spec, {}, skims) == [
+        "origin",
+        "destination",
+        "out_period",
+        "income",
+    ]
+
+    # the same columns drop_unused_columns keeps
+    choosers["in_period"] = ["EA", "EV"]
+    choosers["trip_period"] = ["AM", "AM"]
+    assert logsum_key_columns(choosers, spec, {"timeframe": "trip"}) == [
+        "income",
+        "trip_period",
+    ]
+    assert logsum_key_columns(
+        choosers, spec, sharrow_enabled=True, protect_columns=["person_id"]
+    ) == ["out_period", "income", "person_id", "in_period"]
+
+
+def test_logsum_cache(tmp_path):
+    spec = pd.DataFrame({"DRIVE": [1.0]}, index=pd.Index(["income"], name="Expression"))
+    cache = LogsumCache(4, cache_dir=tmp_path, fingerprint="skims")
+    skims = SkimWrapper("origin", "destination", "out_period")
+    namespace = cache.namespace(spec, None, {"coef": 1.0, "skims": skims})
+    assert namespace == cache.namespace(
+        spec, None, {"coef": 1.0, "skims": SkimWrapper(*skims.__dict__.values())}
+    )
+    assert namespace != cache.namespace(spec, None, {"coef": 2.0, "skims": skims})
+    assert namespace != cache.namespace(spec, None, {"coef": 1.0})
+    assert namespace != cache.namespace(
+        spec, None, {"coef": 1.0, "skims": SkimWrapper("origin", "destination", None)}
+    )
+    assert namespace != cache.namespace(
+        spec, None, {"coef": 1.0, "skims": skims}, ["income"]
+    )
+    table = pd.Series([1.0, 2.0])
+    assert cache.namespace(spec, None, {"table": table}) != cache.namespace(
+        spec, None, {"table": table * 2}
+    )
+
+    choosers = pd.DataFrame({"origin": [1, 1, 2], "income": [10, 10, 20]})
+    keys = cache.row_keys(choosers)
+    assert keys[0] == keys[1]
+
+    found, logsums = cache.get(namespace, keys)
+    assert not found.any()
+    cache.put(namespace, keys, [0.5, 0.5, 1.5])
+    found, logsums = cache.get(namespace, keys[::-1])
+    assert found.all()
+    npt.assert_array_equal(logsums, [1.5, 0.5, 0.5])
+    assert len(cache) == 2
+
+    # least recently used namespaces are saved and evicted first
+    other = cache.namespace(spec, None, {"coef": 2.0})
+    cache.put(other, np.arange(3, dtype=np.uint64), [1.0, 2.0, 3.0])
+    assert len(cache) == 3
+    found, _ = cache.get(namespace, keys)
+    assert found.all()
+    cache.put(other, np.arange(3, 6, dtype=np.uint64), [4.0, 5.0, 6.0])
+    assert len(cache) == 4
+    found, logsums = cache.get(other, np.arange(6, dtype=np.uint64))
+    npt.assert_array_equal(found, [False, False, True, True, True, True])
+
+    # later runs reload saved logsums
+    cache.flush()
+    reloaded = LogsumCache(10, cache_dir=tmp_path, fingerprint="skims")
+    found, logsums = reloaded.get(namespace, keys)
+    assert found.all()
+    npt.assert_array_equal(logsums, [0.5, 0.5, 1.5])
+    found, logsums = reloaded.get(other, np.arange(6, dtype=np.uint64))
+    assert found.all()
+    npt.assert_array_equal(logsums, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
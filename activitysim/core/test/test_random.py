@@ -127,3 +127,57 @@ def test_channel():
     npt.assert_almost_equal(np.asanyarray(rands).flatten(), test1_expected_rands2)
 
     rng.end_step("test_step")
+
+
+def test_counter_based_channel():
+    persons = pd.DataFrame(
+        {
+            "household_id": np.repeat(np.arange(500), 2),
+        },
+        index=np.arange(1000) + 1,
+    )
+    persons.index.name = "person_id"
+
+    rng = random.Random(counter_based=True)
+    rng.begin_step("test_step")
+    rng.add_channel("persons", persons)
+
+    rands = rng.random_for_df(persons, n=2)
+    assert rands.shape == (1000, 2)
+    assert (rands >= 0).all() and (rands < 1).all()
+    assert abs(rands.mean() - 0.5) < 0.05
+
+    # draws for a row depend only on the row, not on which other rows are in df
+    subset = persons.iloc[::-3]
+    rands_sub = rng.random_for_df(subset)
+    rng.end_step("test_step")
+
+    rng.begin_step("test_step")
+    rands2 = rng.random_for_df(persons, n=2)
+    npt.assert_array_equal(rands, rands2)
+    rands_all = rng.random_for_df(persons)
+    npt.assert_array_equal(
+        rands_sub, rands_all[persons.index.get_indexer(subset.index)]
+    )
+
+    # subsequent calls advance the stream
+    rands3 = rng.random_for_df(persons)
+    assert not np.allclose(rands3, rands_all)
+
+    choices = rng.choice_for_df(persons, np.arange(10, 20), 5, replace=False)
+    choices = choices.reshape(1000, 5)
+    assert choices.min() >= 10 and choices.max() < 20
+    assert all(len(np.unique(c)) == 5 for c in choices)
+
+    normals = rng.normal_for_df(persons, mu=10, sigma=2)
+    assert normals.shape == (1000,)
+    assert abs(normals.mean() - 10) < 0.5
+    assert abs(normals.std() - 2) < 0.5
+
+    rng.end_step("test_step")
+
+    # a different step gives different streams
+    rng.begin_step("test_step2")
+    rands4 = rng.random_for_df(persons, n=2)
+    assert not np.allclose(rands4, rands)
+    rng.end_step("test_step2")
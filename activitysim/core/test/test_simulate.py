@@ -11,6 +11,7 @@ import pandas.testing as pdt
 import pytest
 
 from activitysim.core import simulate, workflow
+from activitysim.core.configuration.base import ComputeSettings
 
 
 @pytest.fixture
@@ -92,3 +93,239 @@ def test_simple_simulate_chunked(state, data, spec):
     )
     expected = pd.Series([1, 1, 1], index=data.index)
     pdt.assert_series_equal(choices, expected, check_dtype=False)
+
+
+def test_simple_simulate_fused_logit(state, data, spec):
+
+    state.settings.check_for_variability = False
+
+    choices = simulate.simple_simulate(
+        state,
+        choosers=data,
+        spec=spec,
+        nest_spec=None,
+        compute_settings=ComputeSettings(fused_logit=True),
+    )
+    expected = pd.Series([1, 1, 1], index=data.index)
+    pdt.assert_series_equal(choices, expected, check_dtype=False)
+
+
+def test_simple_simulate_nested_fused_logit(state, data, spec):
+
+    state.settings.check_for_variability = False
+    nest_spec = {
+        "name": "root",
+        "coefficient": 1.0,
+        "alternatives": [
+            {"name": "nest", "coefficient": 0.5, "alternatives": ["alt0", "alt1"]}
+        ],
+    }
+
+    expected = simulate.simple_simulate(
+        state,
+        choosers=data,
+        spec=spec,
+        nest_spec=nest_spec,
+        want_logsums=True,
+        locals_d={},
+        trace_label="nested",
+    )
+    choices = simulate.simple_simulate(
+        state,
+        choosers=data,
+        spec=spec,
+        nest_spec=nest_spec,
+        want_logsums=True,
+        locals_d={},
+        trace_label="nested",
+        compute_settings=ComputeSettings(fused_logit=True),
+    )
+    pdt.assert_frame_equal(choices, expected)
+
+
+def test_eval_utilities_accumulate(state, data, spec):
+
+    from activitysim.core import chunk
+
+    with chunk.chunk_log(state, "test", base=True) as chunk_sizer:
+        expected = simulate.eval_utilities(state, spec, data, chunk_sizer=chunk_sizer)
+        utilities = simulate.eval_utilities(
+            state,
+            spec,
+            data,
+            chunk_sizer=chunk_sizer,
+            compute_settings=ComputeSettings(accumulate_utilities=True),
+        )
+    pdt.assert_frame_equal(utilities, expected)
+
+
+def test_eval_utilities_sparse_availability(state, data, spec):
+
+    from activitysim.core import chunk
+
+    # alt1 is unavailable to the first two choosers, whose other alt1 terms
+    # add up to about 200, so a -999 term would not be enough to rule it out
+    unavailable = pd.DataFrame(
+        [[0.0, -9999.0]],
+        index=pd.Index(["thing2 == 4"], name=spec.index.name),
+        columns=spec.columns,
+    )
+    spec = pd.concat([spec, unavailable])
+    npt.assert_array_equal(
+        simulate.unavailability_rows(spec.values), [False] * 4 + [True]
+    )
+
+    with chunk.chunk_log(state, "test", base=True) as chunk_sizer:
+        expected = simulate.eval_utilities(state, spec, data, chunk_sizer=chunk_sizer)
+        utilities = simulate.eval_utilities(
+            state,
+            spec,
+            data,
+            chunk_sizer=chunk_sizer,
+            compute_settings=ComputeSettings(
+                accumulate_utilities=True, sparse_availability=True
+            ),
+        )
+
+    available = expected > simulate.ALT_LOSER_UTIL
+    assert not available.alt1.iloc[:2].any()
+    pdt.assert_frame_equal(utilities[available], expected[available])
+    assert (utilities[~available] <= simulate.ALT_LOSER_UTIL).sum().sum() == 2
+
+
+def test_simple_simulate_by_segment(state, data, spec):
+
+    state.settings.check_for_variability = False
+
+    # spec with a coefficient name in each cell, segment "b" prefers the other alt
+    names = [[f"coef_{i}_{j}" for j in range(spec.shape[1])] for i in range(len(spec))]
+    spec_names = pd.DataFrame(names, index=spec.index, columns=spec.columns)
+    coefficients = dict(zip(np.ravel(names), spec.values.ravel()))
+    segment_coefficients = {
+        "a": coefficients,
+        "b": {k: -v for k, v in coefficients.items()},
+    }
+    data["segment"] = ["a", "b", "a"]
+
+    choices = simulate.simple_simulate_by_segment(
+        state,
+        choosers=data,
+        spec=spec_names,
+        nest_spec=None,
+        segment_column="segment",
+        segment_coefficients=segment_coefficients,
+        trace_label="test",
+    )
+    expected = pd.Series([1, 0, 1], index=data.index)
+    pdt.assert_series_equal(choices, expected, check_dtype=False)
+
+    choices = simulate.simple_simulate_by_segment(
+        state,
+        choosers=data,
+        spec=spec_names,
+        nest_spec=None,
+        segment_column="segment",
+        segment_coefficients=segment_coefficients,
+        want_logsums=True,
+        trace_label="test",
+    )
+    pdt.assert_series_equal(
+        choices.choice, expected, check_dtype=False, check_names=False
+    )
+    sign = np.where(data.segment == "a", 1, -1)
+    utilities = simulate.eval_variables(state, spec.index, data).values @ spec.values
+    npt.assert_allclose(
+        choices.logsum, np.log(np.exp(sign[:, None] * utilities).sum(axis=1))
+    )
+
+    nest_spec = {
+        "name": "root",
+        "coefficient": 1.0,
+        "alternatives": [
+            {"name": "nest", "coefficient": 0.5, "alternatives": ["alt0", "alt1"]}
+        ],
+    }
+    choices = simulate.simple_simulate_by_segment(
+        state,
+        choosers=data,
+        spec=spec_names,
+        nest_spec=nest_spec,
+        segment_column="segment",
+        segment_coefficients=segment_coefficients,
+        want_logsums=True,
+        locals_d={},
+        trace_label="test",
+    )
+    for segment, segment_spec in segment_coefficients.items():
+        rows = data.segment == segment
+        expected = simulate.simple_simulate(
+            state,
+            choosers=data[rows],
+            spec=simulate.eval_coefficients(state, spec_names, segment_spec, None),
+            nest_spec=nest_spec,
+            want_logsums=True,
+            locals_d={},
+            trace_label="test",
+        )
+        pdt.assert_series_equal(choices.logsum[rows], expected.logsum)
+
+
+def test_eval_utilities_float32(state, data, spec):
+
+    from activitysim.core import chunk
+
+    with chunk.chunk_log(state, "test", base=True) as chunk_sizer:
+        expected = simulate.eval_utilities(state, spec, data, chunk_sizer=chunk_sizer)
+        for accumulate in (False, True):
+            utilities = simulate.eval_utilities(
+                state,
+                spec,
+                data,
+                chunk_sizer=chunk_sizer,
+                compute_settings=ComputeSettings(
+                    precision="float32", accumulate_utilities=accumulate
+                ),
+            )
+            assert (utilities.dtypes == np.float32).all()
+            pdt.assert_frame_equal(utilities, expected, check_dtype=False, rtol=1e-6)
+
+    nest_spec = {
+        "name": "root",
+        "coefficient": 1.0,
+        "alternatives": [
+            {"name": "nest", "coefficient": 0.5, "alternatives": ["alt0", "alt1"]}
+        ],
+    }
+    raw_utilities = (expected / 100).astype(np.float32)
+    nested = simulate.compute_nested_exp_utilities(raw_utilities, nest_spec)
+    assert (nested.dtypes == np.float64).all()
+    nested32 = simulate.compute_nested_exp_utilities(
+        raw_utilities, nest_spec, ComputeSettings(precision="float32")
+    )
+    assert (nested32.dtypes == np.float32).all()
+    pdt.assert_frame_equal(nested32, nested, check_dtype=False, rtol=1e-5)
+
+
+def test_simple_simulate_logsums_cache(state, data, spec):
+
+    from activitysim.core.logsum_cache import LogsumCache
+
+    expected = simulate.simple_simulate_logsums(state, data, spec, None)
+
+    state.settings.logsum_cache_size = 100
+    state.add_injectable("logsum_cache", LogsumCache(100))
+    logsums = simulate.simple_simulate_logsums(state, data, spec, None)
+    pdt.assert_series_equal(logsums, expected)
+    assert len(state.get_injectable("logsum_cache")) > 0
+
+    # logsums can depend on any chooser column when unused columns are kept
+    state.add_injectable("logsum_cache", LogsumCache(100))
+    logsums = simulate.simple_simulate_logsums(
+        state,
+        data,
+        spec,
+        None,
+        compute_settings=ComputeSettings(drop_unused_columns=False),
+    )
+    pdt.assert_series_equal(logsums, expected)
+    assert len(state.get_injectable("logsum_cache")) == 0
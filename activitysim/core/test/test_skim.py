@@ -2,6 +2,8 @@
 # See full license in LICENSE.txt.
 from __future__ import annotations
 
+import os
+
 import numpy as np
 import numpy.testing as npt
 import pandas as pd
@@ -91,3 +93,182 @@ def test_3dskims(data):
     pdt.assert_series_equal(
         skims3d["SOV"], pd.Series([12, 930, 47], index=[0, 1, 2]), check_dtype=False
     )
+
+
+def test_sorted_lookups(data, monkeypatch):
+    monkeypatch.setattr(skim_dictionary, "SORTED_LOOKUP_MIN_SIZE", 1)
+
+    skim_data = np.stack([data, data * 10])
+
+    skim_info = FakeSkimInfo()
+    skim_info.block_offsets = {("SOV", "AM"): 0, ("SOV", "PM"): 1}
+    skim_info.omx_shape = data.shape
+    skim_info.dtype_name = "int"
+
+    skim_dict = skim_dictionary.SkimDict(
+        workflow.State().default_settings(), "taz", skim_info, skim_data
+    )
+    skim_dict.offset_mapper.set_offset_int(0)  # default is -1
+    skim_dict.sorted_lookups = True
+
+    orig = np.array([9, 1, 4, 1, 9, 0])
+    dest = np.array([3, 2, 7, 5, 0, 8])
+    period = np.array(["PM", "AM", "AM", "PM", "AM", "PM"])
+    npt.assert_array_equal(
+        skim_dict.lookup(orig, dest, ("SOV", "AM")), [93, 12, 47, 15, 90, 8]
+    )
+    npt.assert_array_equal(
+        skim_dict.lookup_3d(orig, dest, period, "SOV"), [930, 12, 47, 150, 90, 80]
+    )
+
+    order = skim_dictionary.origin_block_order(orig, np.array([1, 0, 0, 1, 0, 1]))
+    npt.assert_array_equal(order, [1, 2, 4, 5, 3, 0])
+
+
+def test_lazy_skims(data, tmp_path):
+    from activitysim.core.skim_dict_factory import LazySkimData, SkimUsageManifest
+
+    source = np.stack([data, data * 10])
+
+    class FakeSkimFactory:
+        def __init__(self):
+            self.reads = []
+
+        def _read_skims_from_omx(self, skim_info, skim_data, block_offsets=None):
+            self.reads.append(list(block_offsets))
+            for offset in block_offsets:
+                skim_data[offset] = source[offset]
+
+    skim_info = FakeSkimInfo()
+    skim_info.block_offsets = {"AM": 0, "PM": 1}
+    skim_info.omx_shape = (10, 10)
+    skim_info.dtype_name = "int"
+
+    skim_factory = FakeSkimFactory()
+    skim_data = LazySkimData(
+        np.zeros(source.shape, dtype=int), np.zeros(2), skim_info, skim_factory
+    )
+    skim_dict = skim_dictionary.SkimDict(
+        workflow.State().default_settings(), "taz", skim_info, skim_data
+    )
+    skim_dict.offset_mapper.set_offset_int(0)  # default is -1
+    skims = skim_dict.wrap("taz_l", "taz_r")
+    skims.set_df(pd.DataFrame({"taz_l": [1, 9, 4], "taz_r": [2, 3, 7]}))
+
+    # skims are read on their first lookup only
+    npt.assert_array_equal(skims["PM"], [120, 930, 470])
+    npt.assert_array_equal(skims["PM"], [120, 930, 470])
+    assert skim_factory.reads == [[1]]
+    assert not skim_data._all_loaded
+    npt.assert_array_equal(skims["AM"], [12, 93, 47])
+    assert skim_factory.reads == [[1], [0]]
+    assert skim_data._all_loaded
+
+    manifest = SkimUsageManifest(tmp_path.joinpath("skim_usage_manifest.json"))
+    manifest.record("taz", "school_location", skim_dict.step_usage)
+    manifest.save()
+    other = SkimUsageManifest(manifest.path)
+    other.record("taz", "tour_mode_choice", [("SOV", "AM"), "DIST"])
+    other.save()
+    manifest.save()
+
+    reloaded = SkimUsageManifest(manifest.path)
+    assert reloaded.step_usage("taz", "school_location") == {"AM", "PM"}
+    assert reloaded.step_usage("taz") == {"AM", "PM", "SOV", "DIST"}
+    assert reloaded.step_usage("maz") == set()
+
+
+def test_read_omx_cores(tmp_path):
+    import openmatrix as omx
+
+    from activitysim.core.skim_dict_factory import read_omx_cores
+
+    omx_file_path = str(tmp_path.joinpath("skims.omx"))
+    source = np.arange(200, dtype=np.float32).reshape((2, 10, 10))
+    with omx.open_file(omx_file_path, mode="w") as omx_file:
+        omx_file["DIST"] = source[0]
+        omx_file["TIME"] = source[1]
+
+    # read straight into the skim buffer, or copied if the dtypes differ
+    for dtype in (np.float32, np.float64):
+        skim_data = np.zeros((3, 10, 10), dtype=dtype)
+        num_bytes = read_omx_cores(omx_file_path, [("TIME", 0), ("DIST", 2)], skim_data)
+        assert num_bytes == 2 * skim_data[0].nbytes
+        npt.assert_array_equal(skim_data[0], source[1])
+        npt.assert_array_equal(skim_data[1], 0)
+        npt.assert_array_equal(skim_data[2], source[0])
+
+
+def test_sparse_maz_skims():
+    from activitysim.core.sparse_skims import SparseMazSkims
+
+    walk = pd.DataFrame(
+        {"OMAZ": [40000, 3, 3, 1], "DMAZ": [2, 40000, 1, 3], "WALK": [9, 4, 2, 1]}
+    )
+    bike = pd.DataFrame({"OMAZ": [3, 1], "DMAZ": [1, 1], "BIKE": [0.5, 0.25]})
+    skims = SparseMazSkims.from_tables([walk, bike], dtype="float32")
+
+    assert len(skims) == 5
+    assert skims.num_origins == 3
+    npt.assert_array_equal(skims.origin_ids, [1, 3, 40000])
+    npt.assert_array_equal(skims.dests[: skims.indptr[2]], [1, 3, 1, 40000])
+    npt.assert_array_equal(skims.origins(), [1, 1, 3, 3, 40000])
+
+    orig = np.array([3, 1, 40000, 2, 3, 50000])
+    dest = np.array([40000, 3, 2, 2, 1, 1])
+    npt.assert_array_equal(
+        skims.lookup(orig, dest, "WALK"), [4, 1, 9, np.nan, 2, np.nan]
+    )
+    walk_and_bike = skims.lookup(orig, dest, ["WALK", "BIKE"])
+    assert walk_and_bike.shape == (2, 6)
+    npt.assert_array_equal(
+        walk_and_bike[1], [np.nan, np.nan, np.nan, np.nan, 0.5, np.nan]
+    )
+
+    with pytest.raises(ValueError):
+        SparseMazSkims([1, 1], [2, 2], {"WALK": [1, 2]})
+
+
+def test_compressed_skim_cache(tmp_path, monkeypatch):
+    pytest.importorskip("numcodecs")
+    from activitysim.core import skim_cache
+
+    # small chunks, so each skim is split into several of them
+    monkeypatch.setattr(skim_cache, "COMPRESSED_CHUNK_BYTES", 3 * 10 * 4)
+
+    source = np.arange(300, dtype=np.float32).reshape((3, 10, 10))
+    omx_file_path = tmp_path.joinpath("skims.omx")
+    omx_file_path.write_bytes(b"omx skims")
+
+    skim_info = FakeSkimInfo()
+    skim_info.skim_tag = "taz"
+    skim_info.skim_data_shape = source.shape
+    skim_info.dtype_name = "float32"
+
+    cache = skim_cache.CompressedSkimCache(tmp_path.joinpath("cached_taz.zskims"))
+    assert not cache.open(skim_info, [omx_file_path])
+    cache.write(skim_info, "zstd", [omx_file_path], lambda offset: source[offset])
+    assert cache.chunks_per_block == 4
+
+    reopened = skim_cache.CompressedSkimCache(cache.path)
+    assert reopened.open(skim_info, [omx_file_path])
+    skim_data = np.zeros_like(source)
+    reopened.read_into(skim_data)
+    npt.assert_array_equal(skim_data, source)
+
+    # lookups only decompress the chunks they touch
+    compressed = skim_cache.CompressedSkimData(reopened)
+    orig = np.array([9, 0, 4, 9])
+    dest = np.array([1, 2, 3, 4])
+    npt.assert_array_equal(compressed[2, orig, dest], source[2, orig, dest])
+    assert sorted(compressed._chunks) == [8, 9, 11]
+    block = np.array([0, 1, 2, 0])
+    npt.assert_array_equal(compressed[block, orig, dest], source[block, orig, dest])
+
+    # a changed source file invalidates the cache, a touched one does not
+    os.utime(omx_file_path, ns=(0, 0))
+    assert skim_cache.CompressedSkimCache(cache.path).open(skim_info, [omx_file_path])
+    omx_file_path.write_bytes(b"new omx skims")
+    assert not skim_cache.CompressedSkimCache(cache.path).open(
+        skim_info, [omx_file_path]
+    )
@@ -640,16 +640,18 @@ def zarr_file_modification_time(zarr_dir: Path):
     return t
 
 
-def drop_unused_columns(
-    choosers,
+def used_chooser_columns(
     spec,
     locals_d,
-    custom_chooser,
+    custom_chooser=None,
     sharrow_enabled=False,
     additional_columns=None,
 ):
     """
-    Drop unused columns from the chooser table, based on the spec and custom_chooser function.
+    Names of the chooser columns that evaluating spec can use.
+
+    These are the columns kept by `drop_unused_columns`.  The set may also
+    hold names that are not chooser columns (and None).
     """
     # keep only variables needed for spec
     import re
@@ -702,6 +704,28 @@ def drop_unused_columns(
         custom_chooser_lines = inspect.getsource(custom_chooser)
         unique_variables_in_spec.update(re.findall(pattern, custom_chooser_lines))
 
+    return unique_variables_in_spec
+
+
+def drop_unused_columns(
+    choosers,
+    spec,
+    locals_d,
+    custom_chooser,
+    sharrow_enabled=False,
+    additional_columns=None,
+):
+    """
+    Drop unused columns from the chooser table, based on the spec and custom_chooser function.
+    """
+    unique_variables_in_spec = used_chooser_columns(
+        spec,
+        locals_d,
+        custom_chooser,
+        sharrow_enabled=sharrow_enabled,
+        additional_columns=additional_columns,
+    )
+
     logger.info("Dropping unused variables in chooser table")
 
     logger.info(
@@ -298,6 +298,14 @@ class Runner(StateAccessor):
 
         logger.info(f"#run_model running step {step_name}")
 
+        if self._obj.settings.sharrow:
+            # import the compiled flows recorded for this step by earlier runs
+            from activitysim.core import flow
+
+            flow.flow_cache_index(self._obj).preload(
+                flow.flow_config_key(self._obj), model_name
+            )
+
         # these values are cached in the runner object itself, not in the context.
         self.step_name = step_name
         self.checkpoint = checkpoint
@@ -362,6 +370,16 @@ class Runner(StateAccessor):
             self._obj.add_injectable("step_args", None)
 
             self._obj.rng().end_step(model_name)
+            if "logsum_cache" in self._obj:
+                self._obj.get("logsum_cache").flush()
+            if "network_los" in self._obj:
+                self._obj.get("network_los").record_skim_usage(model_name)
+            if self._obj.settings.sharrow:
+                from activitysim.core import flow
+
+                flow_index = flow.flow_cache_index(self._obj)
+                flow_index.save()
+                flow_index.report()
             if self.checkpoint:
                 self._obj.checkpoint.add(model_name)
             else:
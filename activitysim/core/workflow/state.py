@@ -180,14 +180,17 @@ class State:
     def _initialize_prng(self, base_seed=None):
         from activitysim.core.random import Random
 
-        self._context["prng"] = Random()
-        if base_seed is None:
-            try:
-                self.settings
-            except StateAccessError:
+        counter_based = False
+        try:
+            self.settings
+        except StateAccessError:
+            if base_seed is None:
                 base_seed = 0
-            else:
+        else:
+            if base_seed is None:
                 base_seed = self.settings.rng_base_seed
+            counter_based = self.settings.rng_counter_based
+        self._context["prng"] = Random(counter_based=counter_based)
         self._context["prng"].set_base_seed(base_seed)
 
     def import_extensions(self, ext: str | Iterable[str] = None, append=True) -> None: